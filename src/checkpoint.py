@@ -0,0 +1,71 @@
+"""
+Checkpoints of a training run.
+
+A checkpoint holds everything needed to continue a run exactly where it was:
+the evaluated population and its costs, the best configuration so far, the generation,
+the state of the random generator, the fitness cache and the training parameters.
+It is a single compressed npz file.
+"""
+
+import numpy as np
+import json
+import os
+
+CHECKPOINT_INTERVAL = 10  # generations between checkpoints
+
+# parameters that may differ between the run that wrote a checkpoint and the run resuming it
+RESUMABLE_PARAMETERS = ('generations', 'workers', 'cache_size', 'cache_file', 'patience', 'tolerance',
+                        'min_diversity', 'time_budget', 'checkpoint_file', 'checkpoint_interval', 'resume')
+
+
+def save(path, parameters, generation, group_values, cost_array, best_gen, cost_temp, stalled, elapsed,
+         random_state, cache_keys, cache_costs, **arrays):
+    """
+    Write a checkpoint, the old checkpoint is only replaced when the new one is complete.
+    Extra arrays (like the samples of the surrogate) are stored under their keyword.
+    """
+    name, keys, position, has_gauss, cached_gaussian = random_state
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as checkpoint_file:
+        np.savez_compressed(checkpoint_file,
+                            parameters=json.dumps(parameters, sort_keys=True, default=str),
+                            generation=generation,
+                            group_values=group_values,
+                            cost_array=cost_array,
+                            best_gen=best_gen,
+                            cost_temp=cost_temp,
+                            stalled=stalled,
+                            elapsed=elapsed,
+                            random_name=name,
+                            random_keys=keys,
+                            random_position=position,
+                            random_has_gauss=has_gauss,
+                            random_cached_gaussian=cached_gaussian,
+                            cache_keys=cache_keys,
+                            cache_costs=cache_costs,
+                            **arrays)
+    os.replace(temporary, path)
+
+
+def load(path, parameters):
+    """
+    Read a checkpoint as a dict, raises a ValueError when it was written with other training parameters.
+    The random state is returned in the form of np.random.get_state.
+    """
+    with np.load(path) as saved:
+        checkpoint = {name: saved[name] for name in saved.files}
+
+    saved_parameters = json.loads(str(checkpoint['parameters']))
+    current_parameters = json.loads(json.dumps(parameters, sort_keys=True, default=str))
+    for name in set(saved_parameters) | set(current_parameters):
+        if name not in RESUMABLE_PARAMETERS and saved_parameters.get(name) != current_parameters.get(name):
+            raise ValueError(f'checkpoint {path} was written with another value for {name}')
+
+    checkpoint['random_state'] = (str(checkpoint.pop('random_name')), checkpoint.pop('random_keys'),
+                                  int(checkpoint.pop('random_position')), int(checkpoint.pop('random_has_gauss')),
+                                  float(checkpoint.pop('random_cached_gaussian')))
+    checkpoint['generation'] = int(checkpoint['generation'])
+    checkpoint['cost_temp'] = float(checkpoint['cost_temp'])
+    checkpoint['stalled'] = int(checkpoint['stalled'])
+    checkpoint['elapsed'] = float(checkpoint['elapsed'])
+    return checkpoint
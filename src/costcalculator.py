@@ -1,16 +1,15 @@
 
 import numpy as np
-from simulator import Simulator
-from location import Location
-from windturbine import Windturbine
 import numba
 from numba import jit
+# the compiled storage kernels live next to the evaluator kernels that call them
+from evaluator import get_storage_fast, get_storage_batch
 
 """
 jit is used to optimize functions.
 Storage calculation is a long loop hence jit is applied.
 """
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def get_storage(declining, storage, cumulative_array):
     while np.any(declining) and storage < np.max(cumulative_array):
             lowest = np.min(cumulative_array[declining])
@@ -21,6 +20,24 @@ def get_storage(declining, storage, cumulative_array):
             declining = declining[new_start:]
     return storage
 
+def get_storage_linear(declining, cumulative_array):
+    """
+    Same result as get_storage in a fixed number of passes over the array (O(hours)).
+    get_storage repeatedly cuts the array at the last lowest declining hour and takes the
+    highest value before it. Those cut points are the declining hours that are lower than every
+    declining hour after them, so the storage is the largest rise from any hour up to the next cut point.
+    """
+    if not np.any(declining) or np.max(cumulative_array) <= 0:
+        return 0
+    # lowest declining value from every hour to the end
+    masked = np.where(declining, cumulative_array, np.inf)
+    suffix_min = np.minimum.accumulate(masked[::-1])[::-1]
+    cut = declining & (cumulative_array < np.append(suffix_min[1:], np.inf))
+    ends = np.flatnonzero(cut)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    peaks = np.maximum.reduceat(cumulative_array[:ends[-1] + 1], starts)
+    return max(0, np.max(peaks - cumulative_array[ends]))
+
 class CostCalculator():
     """
         class to calculate the cost of a configuration
@@ -54,7 +71,7 @@ class CostCalculator():
                 surplus_array = np.concatenate((surplus_array[new_start:], surplus_array[:new_start]), axis=0)
                 cumulative_array = np.cumsum(surplus_array)
             declining = surplus_array < 0
-            storage = get_storage(declining, storage, cumulative_array)
+            storage = get_storage_fast(declining, cumulative_array)
 
         # windturbine calculation
         # Max power * number of turbines * cost per kw
@@ -73,6 +90,35 @@ class CostCalculator():
 
         return cost
         
+    def calculate_cost_batch(self, power_matrix, sp_sm_vector, turbines_vector):
+        """
+        calculate_cost for a whole population at once.
+        power_matrix is a (population, hours) array, sp_sm_vector and turbines_vector have one value per configuration.
+        """
+        surplus_matrix = np.asarray(power_matrix) - self.target_kw
+        cumulative_matrix = np.cumsum(surplus_matrix, axis=1)
+        total = cumulative_matrix[:, -1]
+        total_surplus = np.where(total > 0, total, 0)
+        shortage = np.where(total < 0, -total, 0)
+        storage = get_storage_batch(surplus_matrix, cumulative_matrix)
+
+        # windturbine calculation
+        # Max power * number of turbines * cost per kw
+        wm_cost = self.turbine_power * np.asarray(turbines_vector) * self.wt_cost_per_kw
+
+        # Check which cost is requested.
+        if self.train_by_price:
+            cost = np.asarray(sp_sm_vector) * self.sp_cost_per_sm + \
+                   wm_cost + \
+                   storage * self.st_cost_per_kwh + \
+                   shortage * self.shortage_cost 
+        else:
+            cost = shortage * self.shortage_cost + \
+                   total_surplus * self.surplus_cost_per_kw + \
+                   storage * self.st_cost_per_kwh
+
+        return cost
+
     def get_stats(self, kwh_array, sp_sm, turbines):
         surplus_array = kwh_array - self.target_kw
         cumulative_array = np.cumsum(surplus_array)
@@ -86,7 +132,7 @@ class CostCalculator():
                 surplus_array = np.concatenate((surplus_array[new_start:], surplus_array[:new_start]), axis=0)
                 cumulative_array = np.cumsum(surplus_array)
             declining = surplus_array < 0
-            storage = get_storage(declining, storage, cumulative_array)
+            storage = get_storage_fast(declining, cumulative_array)
 
         wm_cost = self.turbine_power * turbines * self.wt_cost_per_kw
 
@@ -113,7 +159,20 @@ class CostCalculator():
         return stat_dict
 
 
+def check_storage(n_trials=1000, n_hours=8760, seed=0):
+    """Cross-check get_storage_linear and get_storage_fast against get_storage on random inputs."""
+    rng = np.random.default_rng(seed)
+    for trial in range(n_trials):
+        surplus_array = rng.normal(rng.normal(0, 1), 10, rng.integers(1, n_hours))
+        cumulative_array = np.cumsum(surplus_array)
+        declining = surplus_array < 0
+        expected = get_storage(declining, 0, cumulative_array.copy())
+        for storage in (get_storage_linear(declining, cumulative_array), get_storage_fast(declining, cumulative_array)):
+            if not np.isclose(storage, expected, rtol=1e-9, atol=1e-6):
+                raise AssertionError(f'trial {trial}: expected storage {expected}, got {storage}')
+    return n_trials
+
+
 if __name__ == '__main__':
 
-    simulator = Simulator(Location('volkel'),'2018', Windturbine(5))
-    calculator = Costcalculator(160, 400, 6000, 1000000, 1070)
\ No newline at end of file
+    print(f'{check_storage()} random storage checks passed')
@@ -0,0 +1,525 @@
+"""
+Fused evaluation of a whole population, from genome to cost.
+
+The solar transposition, wind power and cost calculation are done in one compiled
+loop per configuration, running in parallel over the population. It uses the
+precomputed solar geometry and wind profile of the Simulator, so no (population, hours)
+temporaries are created. Several weather years of a site can be evaluated in the same loop,
+the angle of incidence is calculated once and used for every year.
+"""
+
+import numpy as np
+import numba
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from numba import jit, prange
+from simulator import Simulator
+from windturbine import Windturbine
+from location import Location
+
+CHUNKS_PER_WORKER = 4  # smaller chunks balance the load and make cancelling faster
+CANCEL_POLL = 0.1  # seconds between checks for a cancelled evaluation
+BLOCKS_PER_THREAD = 4  # blocks of rows per thread in the kernels, every block allocates its work arrays once
+
+# how the costs of a multi-year evaluation are combined into one
+AGGREGATE_MEAN = 0
+AGGREGATE_MAX = 1
+AGGREGATE_PERCENTILE = 2
+AGGREGATES = {'mean': AGGREGATE_MEAN, 'max': AGGREGATE_MAX, 'percentile': AGGREGATE_PERCENTILE}
+
+# numba only checks the source file of a cached kernel itself, not of the kernels it calls. Every
+# kernel that calls another one lives in the same file, so changing one compiles all its callers again.
+
+
+@jit(nopython=True, cache=True)
+def get_storage_fast(declining, cumulative_array):
+    """Compiled version of costcalculator.get_storage_linear"""
+    n_hours = cumulative_array.shape[0]
+    if n_hours == 0 or np.max(cumulative_array) <= 0:
+        return 0.0
+    # mark the cut points from right to left
+    cut = np.zeros(n_hours, dtype=np.bool_)
+    lowest = np.inf
+    for i in range(n_hours - 1, -1, -1):
+        if declining[i] and cumulative_array[i] < lowest:
+            lowest = cumulative_array[i]
+            cut[i] = True
+    # largest rise from the highest point to the next cut point
+    storage = 0.0
+    peak = -np.inf
+    for i in range(n_hours):
+        peak = max(peak, cumulative_array[i])
+        if cut[i]:
+            storage = max(storage, peak - cumulative_array[i])
+            peak = -np.inf
+    return storage
+
+
+
+@jit(nopython=True, cache=True)
+def get_storage_rotated(surplus_array, cumulative_array):
+    """
+    Storage of one configuration as in calculate_cost: no storage when there is a shortage,
+    otherwise the year is rotated to start after the last hour with a negative cumulative surplus.
+    """
+    n_hours = surplus_array.shape[0]
+    if cumulative_array[-1] < 0:
+        return 0.0
+    new_start = 0
+    for i in range(n_hours - 1, -1, -1):
+        if cumulative_array[i] < 0:
+            new_start = i + 1
+            break
+    rotated = np.empty(n_hours)
+    rotated[:n_hours - new_start] = surplus_array[new_start:]
+    rotated[n_hours - new_start:] = surplus_array[:new_start]
+    return get_storage_fast(rotated < 0, np.cumsum(rotated))
+
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def get_storage_batch(surplus_matrix, cumulative_matrix):
+    """Storage for every row (configuration) of a (population, hours) surplus array, rows in parallel."""
+    population = surplus_matrix.shape[0]
+    storage = np.zeros(population)
+    for row in prange(population):
+        storage[row] = get_storage_rotated(surplus_matrix[row], cumulative_matrix[row])
+    return storage
+
+
+@jit(nopython=True, cache=True)
+def configuration_cost(power, sp_sm, n_turbines, wind_profile, target_kw, sp_cost_per_sm, turbine_power,
+                       wt_cost_per_kw, st_cost_per_kwh, shortage_cost, surplus_cost_per_kw, train_by_price):
+    """Cost of one configuration from its solar power (W) and number of turbines."""
+    n_hours = power.shape[0]
+
+    # add the wind power and compare with the demand
+    surplus = np.empty(n_hours)
+    for t in range(n_hours):
+        surplus[t] = (power[t] / 1000 + wind_profile[t] * n_turbines) - target_kw
+    cumulative = np.cumsum(surplus)
+
+    total = cumulative[-1]
+    total_surplus = total if total > 0 else 0.0
+    shortage = -total if total < 0 else 0.0
+    storage = get_storage_rotated(surplus, cumulative)
+
+    # same cost as CostCalculator.calculate_cost
+    if train_by_price:
+        return sp_sm * sp_cost_per_sm + \
+               turbine_power * n_turbines * wt_cost_per_kw + \
+               storage * st_cost_per_kwh + \
+               shortage * shortage_cost
+    return shortage * shortage_cost + \
+           total_surplus * surplus_cost_per_kw + \
+           storage * st_cost_per_kwh
+
+
+@jit(nopython=True, cache=True)
+def solar_power(configuration, n_configs, inc_a, inc_b, inc_c, inc_d, inc_e, cos_zenith, f1, f2, dni,
+                dhi_isotropic, dhi_dni, sp_eff, gref, power, cai):
+    """
+    Solar power (W) of one genome for every year and its total area, same steps as
+    Simulator.calc_solar_batch. The sun position (inc_a to inc_e, cos_zenith) is the same for every
+    year, the sky model and weather (f1 to dhi_dni) are (years, hours) arrays. The power is written
+    into the (years, hours) array power, cai is an (n_configs, hours) work array.
+    """
+    n_years, n_hours = dni.shape
+    cos_beta = np.empty(n_configs)
+    sin_beta = np.empty(n_configs)
+    sp_area = np.empty(n_configs)
+    sp_sm = 0.0
+
+    # angle of incidence of every panel configuration, shared by all years
+    for i in range(n_configs):
+        sp_area[i] = configuration[3 * i]
+        cos_beta[i] = np.cos(np.deg2rad(configuration[3 * i + 1]))
+        sin_beta[i] = np.sin(np.deg2rad(configuration[3 * i + 1]))
+        cos_gamma = np.cos(np.deg2rad(configuration[3 * i + 2]))
+        sin_gamma = np.sin(np.deg2rad(configuration[3 * i + 2]))
+        sp_sm += sp_area[i]
+
+        for t in range(n_hours):
+            cai[i, t] = (inc_a[t] * cos_beta[i]
+                         - inc_b[t] * (sin_beta[i] * cos_gamma)
+                         + inc_c[t] * cos_beta[i]
+                         + inc_d[t] * (sin_beta[i] * cos_gamma)
+                         + inc_e[t] * (sin_beta[i] * sin_gamma))
+            if cai[i, t] < 0:
+                cai[i, t] = 0.0
+
+    # one pass over the weather of every year for all configurations
+    for y in range(n_years):
+        for t in range(n_hours):
+            total = 0.0
+            for i in range(n_configs):
+                dti = dhi_isotropic[y, t] * (1 + cos_beta[i]) / 2 + (cai[i, t] / cos_zenith[t]) * f1[y, t] + \
+                      f2[y, t] * sin_beta[i]
+                if dti < 0:
+                    dti = 0.0
+
+                dsti = cai[i, t] * dni[y, t]
+                if dsti < 0:
+                    dsti = 0.0
+
+                gti = dti + dsti + 0.5 * gref * dhi_dni[y, t] * (1 - cos_beta[i])
+
+                total += (gti * (sp_eff / 100)) * sp_area[i]
+            power[y, t] = total
+
+    return sp_sm
+
+
+@jit(nopython=True, cache=True)
+def aggregate_years(values, aggregate, percentile):
+    """Combine the values of the years with AGGREGATE_MEAN, AGGREGATE_MAX or AGGREGATE_PERCENTILE."""
+    if values.shape[0] == 1:
+        return values[0]
+    if aggregate == AGGREGATE_MAX:
+        return np.max(values)
+    if aggregate == AGGREGATE_PERCENTILE:
+        return np.percentile(values, percentile)
+    return np.mean(values)
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def evaluate_population(group_values, n_configs, inc_a, inc_b, inc_c, inc_d, inc_e, cos_zenith, f1, f2, dni,
+                        dhi_isotropic, dhi_dni, wind_profile, sp_eff, gref, target_kw, sp_cost_per_sm,
+                        turbine_power, wt_cost_per_kw, st_cost_per_kwh, shortage_cost, surplus_cost_per_kw,
+                        train_by_price, optimize_turbines, turbines_min, turbines_max, aggregate, percentile,
+                        n_blocks):
+    """
+    Cost of every row of group_values. The weather arrays and wind_profile are (years, hours),
+    the costs of the years are combined with aggregate_years. With optimize_turbines the number of
+    turbines in the genome is ignored and every number in [turbines_min, turbines_max] is tried on
+    the same solar power. The rows are divided over n_blocks blocks (see block_count).
+    Returns the cost and the number of turbines it belongs to.
+    """
+    population = group_values.shape[0]
+    n_years, n_hours = dni.shape
+    cost = np.zeros(population)
+    turbines = np.zeros(population, dtype=np.int64)
+
+    # the rows are divided over blocks so the work arrays are allocated once per block instead of per row
+    for block in prange(n_blocks):
+        power = np.empty((n_years, n_hours))
+        cai = np.empty((n_configs, n_hours))
+        year_costs = np.empty(n_years)
+        for row in range(block, population, n_blocks):
+            sp_sm = solar_power(group_values[row], n_configs, inc_a, inc_b, inc_c, inc_d, inc_e, cos_zenith,
+                                f1, f2, dni, dhi_isotropic, dhi_dni, sp_eff, gref, power, cai)
+            evaluate_turbines(row, power, sp_sm, group_values, wind_profile, target_kw, sp_cost_per_sm,
+                              turbine_power, wt_cost_per_kw, st_cost_per_kwh, shortage_cost, surplus_cost_per_kw,
+                              train_by_price, optimize_turbines, turbines_min, turbines_max, aggregate, percentile,
+                              year_costs, cost, turbines)
+
+    return cost, turbines
+
+
+@jit(nopython=True, cache=True)
+def evaluate_turbines(row, power, sp_sm, group_values, wind_profile, target_kw, sp_cost_per_sm, turbine_power,
+                      wt_cost_per_kw, st_cost_per_kwh, shortage_cost, surplus_cost_per_kw, train_by_price,
+                      optimize_turbines, turbines_min, turbines_max, aggregate, percentile, year_costs, cost,
+                      turbines):
+    """Cost of one row of evaluate_population from its solar power, written into cost and turbines."""
+    n_years = power.shape[0]
+    if optimize_turbines:
+        first = turbines_min
+        last = turbines_max
+    else:
+        first = int(group_values[row, -1])
+        last = first
+
+    for n_turbines in range(first, last + 1):
+        # storage and shortage never lower the cost (of any year), so more turbines can not be cheaper from here on
+        if optimize_turbines and train_by_price and n_turbines > first and \
+                sp_sm * sp_cost_per_sm + turbine_power * n_turbines * wt_cost_per_kw >= cost[row]:
+            break
+        for y in range(n_years):
+            year_costs[y] = configuration_cost(power[y], sp_sm, n_turbines, wind_profile[y], target_kw,
+                                               sp_cost_per_sm, turbine_power, wt_cost_per_kw, st_cost_per_kwh,
+                                               shortage_cost, surplus_cost_per_kw, train_by_price)
+        n_cost = aggregate_years(year_costs, aggregate, percentile)
+        if n_turbines == first or n_cost < cost[row]:
+            cost[row] = n_cost
+            turbines[row] = n_turbines
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def evaluate_objectives(group_values, n_configs, inc_a, inc_b, inc_c, inc_d, inc_e, cos_zenith, f1, f2, dni,
+                        dhi_isotropic, dhi_dni, wind_profile, sp_eff, gref, target_kw, sp_cost_per_sm,
+                        turbine_power, wt_cost_per_kw, aggregate, percentile, n_blocks):
+    """
+    Investment (euro), storage (kWh) and shortage (kWh) of every row of group_values as (population, 3),
+    storage and shortage of the years are combined with aggregate_years.
+    """
+    population = group_values.shape[0]
+    n_years, n_hours = dni.shape
+    objectives = np.zeros((population, 3))
+
+    for block in prange(n_blocks):
+        power = np.empty((n_years, n_hours))
+        cai = np.empty((n_configs, n_hours))
+        storage = np.empty(n_years)
+        shortage = np.empty(n_years)
+        surplus = np.empty(n_hours)
+        for row in range(block, population, n_blocks):
+            sp_sm = solar_power(group_values[row], n_configs, inc_a, inc_b, inc_c, inc_d, inc_e, cos_zenith,
+                                f1, f2, dni, dhi_isotropic, dhi_dni, sp_eff, gref, power, cai)
+            objectives[row] = row_objectives(power, sp_sm, int(group_values[row, -1]), wind_profile, target_kw,
+                                             sp_cost_per_sm, turbine_power, wt_cost_per_kw, aggregate,
+                                             percentile, storage, shortage, surplus)
+
+    return objectives
+
+
+@jit(nopython=True, cache=True)
+def row_objectives(power, sp_sm, n_turbines, wind_profile, target_kw, sp_cost_per_sm, turbine_power,
+                   wt_cost_per_kw, aggregate, percentile, storage, shortage, surplus):
+    """Investment, storage and shortage of one row of evaluate_objectives from its solar power."""
+    n_years, n_hours = power.shape
+    for y in range(n_years):
+        for t in range(n_hours):
+            surplus[t] = (power[y, t] / 1000 + wind_profile[y, t] * n_turbines) - target_kw
+        cumulative = np.cumsum(surplus)
+        storage[y] = get_storage_rotated(surplus, cumulative)
+        shortage[y] = -cumulative[-1] if cumulative[-1] < 0 else 0.0
+
+    return np.array([sp_sm * sp_cost_per_sm + turbine_power * n_turbines * wt_cost_per_kw,
+                     aggregate_years(storage, aggregate, percentile),
+                     aggregate_years(shortage, aggregate, percentile)])
+
+
+def block_count(population):
+    """
+    Number of blocks the kernels divide a population over. Computed outside the kernels,
+    numba can not cache a kernel that asks for the number of threads itself.
+    """
+    return min(population, numba.get_num_threads() * BLOCKS_PER_THREAD)
+
+
+def stack_years(simulators, turbine_height):
+    """
+    The solar geometry and wind profile of the simulators of one site as arguments for the kernels:
+    the sun position of the first simulator and (years, hours) arrays of the sky model and weather.
+    Raises a ValueError when the years do not have the same hours.
+    """
+    first = simulators[0].solar_geometry
+    for simulator in simulators[1:]:
+        geometry = simulator.solar_geometry
+        if not all(np.array_equal(getattr(first, name), getattr(geometry, name))
+                   for name in ('inc_a', 'inc_b', 'inc_c', 'inc_d', 'inc_e', 'cos_zenith')):
+            raise ValueError(f'the hours of year {simulator.year} do not match those of year {simulators[0].year}')
+
+    def stacked(name):
+        return np.stack([getattr(simulator.solar_geometry, name) for simulator in simulators])
+
+    return (first.inc_a, first.inc_b, first.inc_c, first.inc_d, first.inc_e, first.cos_zenith,
+            stacked('f1'), stacked('f2'), stacked('dni'), stacked('dhi_isotropic'), stacked('dhi_dni'),
+            np.stack([simulator.wind_profile(turbine_height) for simulator in simulators]))
+
+
+class PopulationEvaluator():
+    """
+    Class for calculating the cost of every configuration in a population.
+    A row of the population holds n_configs * (area, angle, orientation) followed by the number of turbines.
+    With simulators (one per year of the same site) every configuration is evaluated on all years
+    and the costs are combined with aggregate ('mean', 'max' or 'percentile' with percentile).
+    """
+    def __init__(self, simulator, cost_calculator, n_configs, turbine_height, sp_eff, gref=0, turbines_range=None,
+                 simulators=None, aggregate='mean', percentile=90):
+        self.simulator = simulator
+        self.cost_calculator = cost_calculator
+        self.n_configs = n_configs
+        self.turbine_height = turbine_height
+        self.sp_eff = sp_eff
+        self.gref = gref
+        # (min, max) number of turbines to choose the cheapest from, None to use the number in the genome
+        self.turbines_range = turbines_range
+        self.simulators = simulators if simulators else [simulator]
+        self.aggregate = AGGREGATES[aggregate]
+        self.percentile = float(percentile)
+        self._weather = None
+
+    def weather(self):
+        """The arguments of the kernels from inc_a up to wind_profile, stacked once"""
+        if self._weather is None:
+            self._weather = stack_years(self.simulators, self.turbine_height)
+        return self._weather
+
+    def evaluate(self, group_values):
+        """
+        Returns the cost of every row, with turbines_range the chosen number of turbines
+        is written into the last column of group_values.
+        """
+        calculator = self.cost_calculator
+        turbines_min, turbines_max = self.turbines_range if self.turbines_range else (0, 0)
+        cost, turbines = evaluate_population(np.ascontiguousarray(group_values, dtype=np.float64), self.n_configs,
+                                   *self.weather(),
+                                   float(self.sp_eff), float(self.gref), float(calculator.target_kw),
+                                   float(calculator.sp_cost_per_sm), float(calculator.turbine_power),
+                                   float(calculator.wt_cost_per_kw), float(calculator.st_cost_per_kwh),
+                                   float(calculator.shortage_cost), float(calculator.surplus_cost_per_kw),
+                                   bool(calculator.train_by_price), self.turbines_range is not None,
+                                   int(np.ceil(turbines_min)), int(turbines_max), self.aggregate, self.percentile,
+                                   block_count(group_values.shape[0]))
+        if self.turbines_range:
+            group_values[:, -1] = turbines
+        return cost
+
+    def evaluate_objectives(self, group_values):
+        """Investment, storage and shortage of every row as a (population, 3) array."""
+        calculator = self.cost_calculator
+        return evaluate_objectives(np.ascontiguousarray(group_values, dtype=np.float64), self.n_configs,
+                                   *self.weather(),
+                                   float(self.sp_eff), float(self.gref), float(calculator.target_kw),
+                                   float(calculator.sp_cost_per_sm), float(calculator.turbine_power),
+                                   float(calculator.wt_cost_per_kw), self.aggregate, self.percentile,
+                                   block_count(group_values.shape[0]))
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# evaluator of a pool worker process, created once by _init_worker
+_worker_evaluator = None
+_worker_memory = None
+
+
+def _init_worker(memory_name, shape, dtype, simulator_args, cost_args, n_configs, turbine_height, sp_eff, gref,
+                 turbines_range, years, aggregate, percentile):
+    """Attach to the shared (years, hours) weather data and build a warmed up evaluator in a pool worker."""
+    from costcalculator import CostCalculator  # costcalculator imports the storage kernels from here
+    global _worker_evaluator, _worker_memory
+    # the pool already runs one process per core
+    numba.set_num_threads(1)
+
+    _worker_memory = shared_memory.SharedMemory(name=memory_name)
+    weather = np.ndarray(shape, dtype=dtype, buffer=_worker_memory.buf)
+
+    location, _, turbine_type, latitude, longitude, terrain_factor = simulator_args
+    simulators = [Simulator(Location(location), year, Windturbine(turbine_type), latitude=latitude,
+                            longitude=longitude, terrain_factor=terrain_factor, weather=weather[index])
+                  for index, year in enumerate(years)]
+    cost_calculator = CostCalculator(*cost_args, windturbine=Windturbine(turbine_type))
+    _worker_evaluator = PopulationEvaluator(simulators[0], cost_calculator, n_configs, turbine_height, sp_eff, gref,
+                                            turbines_range, simulators, aggregate, percentile)
+    _worker_evaluator.evaluate(np.zeros((1, n_configs * 3 + 1)))
+
+
+def _evaluate_chunk(group_values):
+    return _worker_evaluator.evaluate(group_values), group_values[:, -1]
+
+
+def _evaluate_objectives_chunk(group_values):
+    return _worker_evaluator.evaluate_objectives(group_values)
+
+
+class PoolEvaluator():
+    """
+    Evaluates the population in chunks on a pool of worker processes.
+    The weather data is put in shared memory once, every worker builds its own Simulator and
+    CostCalculator on top of it. simulator_args = (location, year, turbine_type, latitude, longitude,
+    terrain_factor), cost_args are the positional arguments of CostCalculator without the windturbine.
+    simulators, aggregate and percentile are those of PopulationEvaluator.
+    """
+    def __init__(self, simulator, simulator_args, cost_args, n_configs, turbine_height, sp_eff, workers, gref=0,
+                 turbines_range=None, simulators=None, aggregate='mean', percentile=90):
+        self.simulator = simulator
+        self.simulator_args = simulator_args
+        self.cost_args = cost_args
+        self.n_configs = n_configs
+        self.turbine_height = turbine_height
+        self.sp_eff = sp_eff
+        self.workers = workers
+        self.gref = gref
+        self.turbines_range = turbines_range
+        self.simulators = simulators if simulators else [simulator]
+        self.aggregate = aggregate
+        self.percentile = percentile
+        self.executor = None
+        self.futures = []  # chunks of the running evaluation
+        self.memory = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    def _start(self):
+        weather = np.stack([simulator.import_data for simulator in self.simulators])
+        self.memory = shared_memory.SharedMemory(create=True, size=weather.nbytes)
+        np.ndarray(weather.shape, dtype=weather.dtype, buffer=self.memory.buf)[:] = weather
+
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(self.memory.name, weather.shape, weather.dtype,
+                                                      self.simulator_args, self.cost_args, self.n_configs,
+                                                      self.turbine_height, self.sp_eff, self.gref,
+                                                      self.turbines_range,
+                                                      [simulator.year for simulator in self.simulators],
+                                                      self.aggregate, self.percentile))
+
+    def _map(self, function, group_values):
+        """Runs function on chunks of group_values in the pool, returns the chunks and their results."""
+        chunks = np.array_split(group_values, min(len(group_values), self.workers * CHUNKS_PER_WORKER))
+        with self.lock:
+            if self.cancelled:
+                return None
+            if self.executor is None:
+                self._start()
+            futures = [self.executor.submit(function, chunk) for chunk in chunks]
+            self.futures = futures
+
+        # wait in short steps so a cancel from another thread is noticed right away
+        not_done = futures
+        while not_done:
+            if self.cancelled:
+                return None
+            _, not_done = wait(not_done, timeout=CANCEL_POLL)
+        return chunks, [future.result() for future in futures]
+
+    def evaluate(self, group_values):
+        """Returns the cost array, or None when the evaluation was cancelled."""
+        result = self._map(_evaluate_chunk, group_values)
+        if result is None:
+            return None
+
+        # the chunks are views, so the chosen number of turbines ends up in group_values
+        chunks, results = result
+        for chunk, (_, turbines) in zip(chunks, results):
+            chunk[:, -1] = turbines
+        return np.concatenate([cost for cost, _ in results])
+
+    def evaluate_objectives(self, group_values):
+        """Returns the (population, 3) objectives array, or None when the evaluation was cancelled."""
+        result = self._map(_evaluate_objectives_chunk, group_values)
+        if result is None:
+            return None
+        return np.concatenate(result[1])
+
+    def _cancel_futures(self):
+        # shutdown(cancel_futures=True) needs Python 3.9, a future that already runs is not cancelled
+        for future in self.futures:
+            future.cancel()
+        self.futures = []
+
+    def cancel(self):
+        """Stop the evaluation, chunks that did not start yet are dropped."""
+        with self.lock:
+            self.cancelled = True
+            if self.executor is not None:
+                self._cancel_futures()
+                self.executor.shutdown(wait=False)
+
+    def close(self):
+        with self.lock:
+            if self.executor is not None:
+                # after a cancel the chunks still running are not waited for
+                self._cancel_futures()
+                self.executor.shutdown(wait=not self.cancelled)
+                self.executor = None
+            if self.memory is not None:
+                self.memory.close()
+                self.memory.unlink()
+                self.memory = None
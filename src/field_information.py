@@ -14,6 +14,8 @@ def field_info(name):
             'demand':'Constand power demand in kW.',
             'generations':'Number of generations the algorithm has to achieve the optimal configuration. Increasing this will result is longer training but more accurate results.',
             'pool_size':'Number of configurations tried in each generation. Increasing this will result in longer training times but more variation thus better outcome after each generation.',
+            'optimizer':'Search method used for training. GA = genetic algorithm, DE = differential evolution, CMA-ES = covariance matrix adaptation evolution strategy. CMA-ES usually needs the fewest generations.',
+            'separate_process':'Train in a separate process. The window stays responsive during training and stop ends the training immediately.',
             'mutation_rate':'Percentage with which the algorithm varies each independant configuration. Avoid number smaller than 50 because this could lead to local minima.',
             'solar_panel_price':'Price of the solar panels in Euro per square meter. Increasing the price will lead to less solar panels used.',
             'wind_turbine_price':'Price of the wind turbine in Euro per kW. For this the maximum power of the turbine is used. Increasing the price will lead to less wind turbines used.',
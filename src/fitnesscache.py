@@ -0,0 +1,121 @@
+"""
+Cache of the cost of already evaluated configurations.
+
+A genome is quantized before it is used as a key: the area, angle and orientation are
+rounded to a resolution and the number of turbines is truncated to an integer like the
+evaluation does. Genomes that fall in the same bin share one evaluation.
+"""
+
+import numpy as np
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+CACHE_SIZE = 200000  # maximum number of cached genomes
+AREA_RESOLUTION = 1  # m^2
+ANGLE_RESOLUTION = 0.01  # degrees, used for the angle and the orientation
+
+
+def fingerprint(**inputs):
+    """Hash of everything that influences the cost, used to check if a saved cache belongs to a run."""
+    text = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class FitnessCache():
+    """
+    LRU cache from quantized genome to cost. A genome holds n_configs * (area, angle, orientation)
+    followed by the number of turbines. When path is given the cache is loaded from and saved to
+    that file, but only reused when the saved fingerprint matches.
+    """
+    def __init__(self, n_configs, max_size=CACHE_SIZE, area_resolution=AREA_RESOLUTION,
+                 angle_resolution=ANGLE_RESOLUTION, path=None, fingerprint=None):
+        self.n_configs = n_configs
+        self.max_size = max_size
+        self.resolution = np.array([area_resolution, angle_resolution, angle_resolution] * n_configs, dtype=np.float64)
+        self.path = path
+        self.fingerprint = fingerprint
+        self.costs = OrderedDict()
+
+        # counters of the last lookup and of the whole run
+        self.hits = 0
+        self.misses = 0
+        self.total_hits = 0
+        self.total_misses = 0
+
+        if self.path and os.path.exists(self.path):
+            self.load()
+
+    def keys(self, group_values):
+        """Quantized genomes of a population as (population, features) integers."""
+        keys = np.empty(group_values.shape, dtype=np.int64)
+        keys[:, :-1] = np.round(group_values[:, :-1] / self.resolution)
+        keys[:, -1] = group_values[:, -1].astype(int)
+        return keys
+
+    def evaluate(self, group_values, evaluator):
+        """
+        Cost of every row of group_values, only the genomes that are not in the cache are given to the evaluator.
+        Returns None when the evaluator was cancelled.
+        """
+        keys = [key.tobytes() for key in self.keys(group_values)]
+        cost_array = np.empty(len(keys))
+
+        # rows with an unknown genome, duplicates within the population are evaluated once
+        missing = {}
+        for row, key in enumerate(keys):
+            cost = self.costs.get(key)
+            if cost is None:
+                missing.setdefault(key, []).append(row)
+            else:
+                self.costs.move_to_end(key)
+                cost_array[row] = cost
+
+        self.misses = len(missing)
+        self.hits = len(keys) - self.misses
+        self.total_hits += self.hits
+        self.total_misses += self.misses
+
+        if missing:
+            first_rows = [rows[0] for rows in missing.values()]
+            new_costs = evaluator.evaluate(group_values[first_rows])
+            if new_costs is None:
+                return None
+            for (key, rows), cost in zip(missing.items(), new_costs):
+                cost_array[rows] = cost
+                self.costs[key] = float(cost)
+            while len(self.costs) > self.max_size:
+                self.costs.popitem(last=False)
+
+        return cost_array
+
+    def info(self):
+        return {'cache_hits': self.hits, 'cache_misses': self.misses, 'cache_size': len(self.costs)}
+
+    def state(self):
+        """Keys (as (entries, features) integers) and costs of the cache, oldest first."""
+        n_features = self.resolution.shape[0] + 1
+        keys = np.frombuffer(b''.join(self.costs.keys()), dtype=np.int64).reshape(-1, n_features)
+        return keys, np.array(list(self.costs.values()), dtype=np.float64)
+
+    def restore(self, keys, costs):
+        self.costs.clear()
+        for key, cost in zip(keys, costs):
+            self.costs[key.tobytes()] = float(cost)
+        while len(self.costs) > self.max_size:
+            self.costs.popitem(last=False)
+
+    def save(self):
+        if not self.path:
+            return
+        keys, costs = self.state()
+        with open(self.path, 'wb') as cache_file:
+            np.savez(cache_file, keys=keys, costs=costs, resolution=self.resolution, fingerprint=str(self.fingerprint))
+
+    def load(self):
+        with np.load(self.path) as saved:
+            if str(saved['fingerprint']) != str(self.fingerprint) or \
+                    not np.array_equal(saved['resolution'], self.resolution):
+                return
+            self.restore(saved['keys'], saved['costs'])
@@ -1,7 +1,6 @@
 """contains class to create new populations"""
 
 import numpy as np
-from copy import copy
 
 
 class GeneticAlgorithm():
@@ -28,12 +27,17 @@ class GeneticAlgorithm():
         population[mask] = mutated[mask]
 
     def _calculate_difference(self, array):
+        """relative difference with the average of the fittest, for every row of array at once"""
         difference_array = np.abs(self.average_array - array)
-        mask = difference_array != 0
-        difference_array[mask] = difference_array[mask] / np.maximum(
-            np.abs(self.average_array[mask]),
-            np.abs(array[mask]))
-        return np.mean(difference_array)
+        scale = np.maximum(np.abs(self.average_array), np.abs(array))
+        np.divide(difference_array, scale, out=difference_array, where=difference_array != 0)
+        return np.mean(difference_array, axis=-1)
+
+    def diversity(self, population, cost):
+        """mean relative difference of the population with the average of the fittest"""
+        best_selected = population[cost.argsort()[:self.n_optimal_to_select]]
+        self.average_array = np.mean(best_selected, axis=0)
+        return np.mean(self._calculate_difference(population))
 
     def _select_and_mate(self, population, cost):
         population_size, n_features = population.shape
@@ -47,7 +51,7 @@ class GeneticAlgorithm():
         self.average_array = np.mean(best_selected, axis=0)
         # select remaining
         remaining = population[self.n_optimal_to_select:]
-        differences = np.array(list(map(self._calculate_difference, remaining)))
+        differences = self._calculate_difference(remaining)
         # sort remaining by difference (low to high)
         remaining = remaining[differences.argsort()]
         # select most different of the remaining
@@ -59,17 +63,11 @@ class GeneticAlgorithm():
         parents = np.concatenate((best_selected, different_selected, randomly_selected), axis=0)
         n_parents = parents.shape[0]
         # make new generation
-        new_population = np.zeros_like(population)
-        for i in range(population_size):
-            # select parents
-            parent1 = parents[np.random.randint(n_parents)]
-            parent2 = parents[np.random.randint(n_parents)]
-            # combine to make child
-            child = copy(parent1)
-            mask = np.random.rand(n_features) > 0.5
-            child[mask] = parent2[mask]
-            # assign child to new population
-            new_population[i] = child
+        # select two parents for every child
+        parent_index = np.random.randint(n_parents, size=(population_size, 2))
+        # combine to make children, a feature comes from the second parent where the mask is set
+        mask = np.random.rand(population_size, n_features) > 0.5
+        new_population = np.where(mask, parents[parent_index[:, 1]], parents[parent_index[:, 0]])
         if self.keep_best:
             new_population[0] = best_selected[0]
         return new_population
@@ -78,7 +76,7 @@ class GeneticAlgorithm():
         """make a new population using the old population(2d array) and the cost(1d array)"""
         new_population = self._select_and_mate(population, cost)
         if self.keep_best:
-            best = new_population[0, :]
+            best = new_population[0, :].copy()
         self._mutate(new_population)
         if self.keep_best:
             new_population[0] = best
@@ -98,7 +96,7 @@ class GeneticAlgorithm():
 
 # example code to test the algorithm
 if __name__ == '__main__':
-    genetic_algorithm = GeneticAlgorith(10, 50, 6, 2, 2, True)
+    genetic_algorithm = GeneticAlgorithm(10, 50, 6, 2, 2, True)
     population = np.array([
         [0, 0],
         [0, 1],
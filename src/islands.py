@@ -0,0 +1,168 @@
+"""
+Island model for the Trainer.
+
+The population is split over a number of islands that evolve independently in their own
+process. Every migration_interval generations each island sends its best individuals to the
+next island in a ring, where they replace the worst ones. The Trainer in the main process
+collects the progress of all islands and reports the global best. The islands are started with
+spawn, forking a process with running threads (the GUI, numba) is not safe.
+"""
+
+import numpy as np
+import numba
+import os
+import queue
+import time
+import multiprocessing
+import optimizers
+
+MIGRATION_INTERVAL = 5  # generations between migrations
+N_MIGRANTS = 2  # individuals sent to the next island
+POLL_TIMEOUT = 0.1  # seconds between checks for a stop request
+
+# options of the Trainer the islands do not support, with their value when not used
+UNSUPPORTED = {'patience': None, 'min_diversity': None, 'checkpoint_file': None, 'surrogate_fraction': None}
+
+
+def check_parameters(parameters):
+    """Raise a ValueError when parameters (the arguments of a Trainer) use an option islands do not support"""
+    used = [name for name, unused in UNSUPPORTED.items() if parameters[name] != unused]
+    if used:
+        raise ValueError(f'{", ".join(used)} can not be used with n_islands > 1')
+
+
+def _receive(inbox, stop_event):
+    """Wait for the migrants of the previous island, returns None when the training was stopped."""
+    while not inbox.poll(POLL_TIMEOUT):
+        if stop_event.is_set():
+            return None
+    return inbox.recv()
+
+
+def run_island(parameters, island, seed, threads, inbox, outbox, progress, stop_event):
+    """Evolve the population of one island, runs in its own process."""
+    from train import Trainer
+
+    np.random.seed(seed)
+    numba.set_num_threads(threads)
+    trainer = Trainer(None, **parameters)
+    group_values = trainer.random_population()
+    lowest_allowed, highest_allowed = trainer.limits(group_values)
+    optimizer = optimizers.create(trainer.optimizer_name, trainer.genetic_algorithm, group_values,
+                                  lowest_allowed[0], highest_allowed[0])
+    group_values = optimizer.ask()
+    last_generation = trainer.generations - 1
+
+    for generation in range(trainer.generations):
+        if stop_event.is_set():
+            break
+        cost_array = trainer.evaluate(group_values)
+        progress.put((island, generation, trainer.genetic_algorithm.get_best(group_values, cost_array),
+                      np.min(cost_array), trainer.info()))
+
+        if generation == last_generation:
+            break
+
+        # exchange the best individuals with the neighbouring islands
+        if (generation + 1) % trainer.migration_interval == 0:
+            order = cost_array.argsort()
+            outbox.send((group_values[order[:trainer.n_migrants]], cost_array[order[:trainer.n_migrants]]))
+            migrants = _receive(inbox, stop_event)
+            if migrants is None:
+                break
+            worst = order[-len(migrants[0]):]
+            group_values[worst], cost_array[worst] = migrants
+
+        optimizer.tell(group_values, cost_array)
+        group_values = optimizer.ask()
+
+    trainer.fitness_cache.save()
+    progress.put((island, None, None, None, None))
+
+
+def train_islands(trainer):
+    """
+    Train with trainer.n_islands islands, the population of trainer is divided over them.
+    Returns the best individuals (best first) of the best generation of the best island, like a
+    training with one population. When an island process fails the other islands are stopped and
+    trainer.stop_reason tells which island failed.
+    """
+    from train import ALL_GENERATIONS_DONE
+
+    n_islands = trainer.n_islands
+    parameters = dict(trainer.parameters, n_islands=1, workers=None, cache_file=None,
+                      group_size=max(trainer.group_size // n_islands, 1))
+    threads = max(1, (os.cpu_count() or 1) // n_islands)
+
+    context = multiprocessing.get_context('spawn')
+    # ring of pipes, island i sends to island i + 1
+    pipes = [context.Pipe(duplex=False) for _ in range(n_islands)]
+    progress = context.Queue()
+    stop_event = context.Event()
+    seeds = np.random.randint(2 ** 31, size=n_islands)
+    processes = []
+    for island in range(n_islands):
+        inbox = pipes[island][0]
+        outbox = pipes[(island + 1) % n_islands][1]
+        process = context.Process(target=run_island, daemon=True,
+                                  args=(parameters, island, seeds[island], threads, inbox, outbox,
+                                        progress, stop_event))
+        process.start()
+        processes.append(process)
+
+    best_genomes = [None] * n_islands
+    best_costs = np.full(n_islands, np.inf)
+    reported = {}
+    hits = {}
+    misses = {}
+    finished = 0
+    trainer.stop_reason = ALL_GENERATIONS_DONE
+    start = time.perf_counter()
+    while finished < n_islands:
+        if trainer.stopped:
+            stop_event.set()
+        if trainer.time_budget is not None and not stop_event.is_set() and \
+                time.perf_counter() - start >= trainer.time_budget:
+            trainer.stop_reason = f'time budget of {trainer.time_budget} s used'
+            stop_event.set()
+        try:
+            island, generation, best, cost, info = progress.get(timeout=POLL_TIMEOUT)
+        except queue.Empty:
+            # the neighbours of a failed island would wait for its migrants forever
+            failed = [island for island, process in enumerate(processes) if process.exitcode not in (None, 0)]
+            if failed:
+                trainer.stop_reason = f'island {failed[0]} failed with exit code {processes[failed[0]].exitcode}'
+                stop_event.set()
+                for process in processes:
+                    process.terminate()
+                break
+            if not any(process.is_alive() for process in processes):
+                break
+            continue
+        if generation is None:
+            finished += 1
+            continue
+
+        if cost < best_costs[island]:
+            best_costs[island] = cost
+            best_genomes[island] = best
+
+        # report when every island finished this generation
+        reported[generation] = reported.get(generation, 0) + 1
+        hits[generation] = hits.get(generation, 0) + info['cache_hits']
+        misses[generation] = misses.get(generation, 0) + info['cache_misses']
+        if reported[generation] == n_islands and trainer.parent and not trainer.stopped:
+            event_data = [best_genomes[int(np.argmin(best_costs))][0], generation,
+                          {'cache_hits': hits.pop(generation), 'cache_misses': misses.pop(generation),
+                           'island_costs': best_costs.copy()}]
+            trainer.parent.gendone(event_data)
+
+    for process in processes:
+        process.join()
+
+    if trainer.stopped:
+        trainer.stop_reason = 'stopped'
+        return None
+    if trainer.parent:
+        trainer.parent.traindone(trainer.stop_reason)
+    return best_genomes[int(np.argmin(best_costs))]
@@ -1,18 +1,29 @@
-import pandas as pd
+import csv
 import numpy as np
 import os
 
+def location_names():
+    """NAME of every location in Data/locations.csv, in file order"""
+    with open('Data' + os.sep + 'locations.csv', newline='') as locations_file:
+        return [row['NAME'] for row in csv.DictReader(locations_file)]
+
 class Location():
     """Class for getting location information"""
     def __init__(self, name):
-        self.loc_data = pd.read_csv('Data' + os.sep + 'locations.csv', index_col=0, header=0)
+        # csv module instead of pandas, so creating a location does not import pandas
+        with open('Data' + os.sep + 'locations.csv', newline='') as locations_file:
+            self.loc_data = list(csv.DictReader(locations_file))
         self.name = name.upper()
-        self.latitude = self.loc_data.LAT[self.loc_data.NAME == self.name].values[0]
-        self.longitude = self.loc_data.LON[self.loc_data.NAME == self.name].values[0]
-        self.altitude = self.loc_data.ALT[self.loc_data.NAME == self.name].values[0]
-        self.stn = self.loc_data.STN[self.loc_data.NAME == self.name].values[0]
-        self.terrain = self.loc_data.Terrain[self.loc_data.NAME == self.name].values[0]
-        self.years = self.loc_data.Years[self.loc_data.NAME == self.name].values[0]
+        rows = [row for row in self.loc_data if row['NAME'] == self.name]
+        if not rows:
+            raise ValueError(f'unknown location {name}')
+        row = rows[0]
+        self.latitude = float(row['LAT'])
+        self.longitude = float(row['LON'])
+        self.altitude = float(row['ALT'])
+        self.stn = int(row['STN'])
+        self.terrain = float(row['Terrain'])
+        self.years = row['Years']  # one digit per year, keep the leading zeros
 
     def get_years(self):
         perfect_years = ['1998', '1999', '2000', '2001', '2002',
@@ -0,0 +1,215 @@
+"""
+Optimizers for the Trainer.
+
+Every optimizer works on a population matrix (population, features) with an ask/tell interface:
+ask() returns the population to evaluate, tell(population, cost) gives it the costs of that population.
+The state needed to continue a run is returned by state_dict() and restored with load_state_dict().
+kept_rows() gives the rows of the last ask() that are kept from the previous population (elitism).
+All random numbers come from np.random, so a checkpoint of its state makes a run reproducible.
+"""
+
+import numpy as np
+
+DE_WEIGHT = 0.8  # differential weight F
+DE_CROSSOVER = 0.9  # crossover probability CR
+CMA_SIGMA = 0.3  # initial step size, the search space is scaled to [0, 1]
+
+
+class GeneticOptimizer():
+    """The GeneticAlgorithm as optimizer, values outside the limits are truncated."""
+    def __init__(self, genetic_algorithm, population, lowest, highest):
+        self.genetic_algorithm = genetic_algorithm
+        self.population = population
+        self.lowest = lowest
+        self.highest = highest
+        self.kept = np.empty(0, dtype=int)
+
+    def ask(self):
+        return self.population
+
+    def tell(self, population, cost):
+        population = self.genetic_algorithm.generate_new_population(population, cost)
+        # remove illegal values
+        population = np.minimum(population, self.highest)
+        population = np.maximum(population, self.lowest)
+        self.population = population
+        # the first row holds the best of the previous population
+        if self.genetic_algorithm.keep_best:
+            self.kept = np.arange(1)
+
+    def kept_rows(self):
+        return self.kept
+
+    def state_dict(self):
+        return {}
+
+    def load_state_dict(self, state):
+        pass
+
+
+class DifferentialEvolution():
+    """
+    DE/rand/1/bin: every individual gets a trial vector x_r1 + F * (x_r2 - x_r3) crossed with itself,
+    the trial replaces the individual when it is not more expensive.
+    """
+    def __init__(self, population, lowest, highest, weight=DE_WEIGHT, crossover=DE_CROSSOVER):
+        self.population = population
+        self.cost = None
+        self.lowest = lowest
+        self.highest = highest
+        self.weight = weight
+        self.crossover = crossover
+
+    def _donors(self):
+        """three different donors for every individual, none of them the individual itself"""
+        population_size = self.population.shape[0]
+        own = np.arange(population_size)[:, None]
+        donors = np.random.randint(population_size - 1, size=(population_size, 3))
+        donors += donors >= own
+        invalid = (donors[:, 0] == donors[:, 1]) | (donors[:, 0] == donors[:, 2]) | (donors[:, 1] == donors[:, 2])
+        while np.any(invalid) and population_size > 3:
+            redraw = np.random.randint(population_size - 1, size=(np.count_nonzero(invalid), 3))
+            redraw += redraw >= own[invalid]
+            donors[invalid] = redraw
+            invalid = (donors[:, 0] == donors[:, 1]) | (donors[:, 0] == donors[:, 2]) | (donors[:, 1] == donors[:, 2])
+        return donors
+
+    def ask(self):
+        if self.cost is None:
+            return self.population.copy()
+        population_size, n_features = self.population.shape
+        donors = self._donors()
+        mutant = self.population[donors[:, 0]] + self.weight * (self.population[donors[:, 1]] - self.population[donors[:, 2]])
+        # crossover, at least one feature of every trial comes from the mutant
+        mask = np.random.rand(population_size, n_features) < self.crossover
+        mask[np.arange(population_size), np.random.randint(n_features, size=population_size)] = True
+        trial = np.where(mask, mutant, self.population)
+        return np.clip(trial, self.lowest, self.highest)
+
+    def tell(self, population, cost):
+        if self.cost is None:
+            self.population = population.copy()
+            self.cost = cost.copy()
+            return
+        better = cost <= self.cost
+        self.population[better] = population[better]
+        self.cost[better] = cost[better]
+
+    def kept_rows(self):
+        # every trial is a new vector, the survivors are not asked again
+        return np.empty(0, dtype=int)
+
+    def state_dict(self):
+        state = {'population': self.population}
+        if self.cost is not None:
+            state['cost'] = self.cost
+        return state
+
+    def load_state_dict(self, state):
+        self.population = state['population'].copy()
+        self.cost = state['cost'].copy() if 'cost' in state else None
+
+
+class CMAES():
+    """
+    Covariance matrix adaptation evolution strategy, (mu/mu_w, lambda) with the default parameters
+    of Hansen's tutorial. The search space is scaled to [0, 1] with the limits, samples outside of it
+    are truncated and the update uses the truncated samples.
+    """
+    def __init__(self, population, lowest, highest, sigma=CMA_SIGMA):
+        self.lowest = lowest
+        self.span = highest - lowest
+        self.scale = np.where(highest > lowest, self.span, 1)
+        self.population_size, n = population.shape
+        self.n = n
+
+        # selection and recombination
+        self.mu = self.population_size // 2
+        weights = np.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = weights / np.sum(weights)
+        self.mueff = 1 / np.sum(self.weights ** 2)
+
+        # adaptation
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0, np.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chi_n = np.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+        # start in the middle of the given population
+        self.mean = np.mean(self._scaled(population), axis=0)
+        self.sigma = sigma
+        self.covariance = np.eye(n)
+        self.path_c = np.zeros(n)
+        self.path_s = np.zeros(n)
+        self.generation = 0
+        self._decompose()
+
+    def _scaled(self, population):
+        return (population - self.lowest) / self.scale
+
+    def _decompose(self):
+        self.covariance = (self.covariance + self.covariance.T) / 2
+        eigenvalues, self.basis = np.linalg.eigh(self.covariance)
+        self.deviations = np.sqrt(np.maximum(eigenvalues, 1e-20))
+        self.inverse_sqrt = self.basis @ np.diag(1 / self.deviations) @ self.basis.T
+
+    def ask(self):
+        z = np.random.randn(self.population_size, self.n)
+        samples = self.mean + self.sigma * (z * self.deviations) @ self.basis.T
+        # a feature with equal limits stays at its limit
+        return self.lowest + np.clip(samples, 0, 1) * self.span
+
+    def tell(self, population, cost):
+        n = self.n
+        self.generation += 1
+        selected = self._scaled(population)[np.argsort(cost)[:self.mu]]
+        old_mean = self.mean
+        self.mean = self.weights @ selected
+        step = (self.mean - old_mean) / self.sigma
+
+        # evolution paths
+        self.path_s = (1 - self.cs) * self.path_s + np.sqrt(self.cs * (2 - self.cs) * self.mueff) * (self.inverse_sqrt @ step)
+        norm_s = np.linalg.norm(self.path_s)
+        hsig = norm_s / np.sqrt(1 - (1 - self.cs) ** (2 * self.generation)) / self.chi_n < 1.4 + 2 / (n + 1)
+        self.path_c = (1 - self.cc) * self.path_c + hsig * np.sqrt(self.cc * (2 - self.cc) * self.mueff) * step
+
+        # covariance matrix and step size
+        steps = (selected - old_mean) / self.sigma
+        self.covariance = (1 - self.c1 - self.cmu) * self.covariance + \
+                          self.c1 * (np.outer(self.path_c, self.path_c) + (1 - hsig) * self.cc * (2 - self.cc) * self.covariance) + \
+                          self.cmu * (steps.T * self.weights) @ steps
+        self.sigma *= np.exp((self.cs / self.damps) * (norm_s / self.chi_n - 1))
+        self._decompose()
+
+    def kept_rows(self):
+        # every generation is sampled anew
+        return np.empty(0, dtype=int)
+
+    def state_dict(self):
+        return {'mean': self.mean, 'sigma': np.array(self.sigma), 'covariance': self.covariance,
+                'path_c': self.path_c, 'path_s': self.path_s, 'generation': np.array(self.generation)}
+
+    def load_state_dict(self, state):
+        self.mean = state['mean'].copy()
+        self.sigma = float(state['sigma'])
+        self.covariance = state['covariance'].copy()
+        self.path_c = state['path_c'].copy()
+        self.path_s = state['path_s'].copy()
+        self.generation = int(state['generation'])
+        self._decompose()
+
+
+OPTIMIZERS = {'GA': 'Genetic algorithm', 'DE': 'Differential evolution', 'CMA-ES': 'CMA-ES'}
+
+
+def create(name, genetic_algorithm, population, lowest, highest):
+    """Optimizer by name (a key of OPTIMIZERS), starting from population."""
+    if name == 'GA':
+        return GeneticOptimizer(genetic_algorithm, population, lowest, highest)
+    if name == 'DE':
+        return DifferentialEvolution(population, lowest, highest)
+    if name == 'CMA-ES':
+        return CMAES(population, lowest, highest)
+    raise ValueError(f'unknown optimizer {name}, choose from {", ".join(OPTIMIZERS)}')
@@ -0,0 +1,205 @@
+"""
+Multi-objective training (NSGA-II).
+
+Instead of one cost the configurations are compared on three objectives: the investment
+in solar panels and turbines (euro), the storage needed (kWh) and the yearly shortage (kWh).
+The result is a Pareto front, every configuration on it is only beaten on one objective
+by paying more on another, so different price weightings can be explored from one run.
+"""
+
+import numpy as np
+import time
+from fitnesscache import CACHE_SIZE, AREA_RESOLUTION, ANGLE_RESOLUTION
+
+OBJECTIVES = ('investment', 'storage', 'shortage')
+CROSSOVER_ETA = 15  # distribution index of the simulated binary crossover
+MUTATION_ETA = 20  # distribution index of the polynomial mutation
+DOMINANCE_BLOCK = 256  # rows compared with the population at once, limits the memory to a (block, population) array
+
+# options of the Trainer a Pareto training does not support, with their value when not used
+UNSUPPORTED = {'checkpoint_file': None, 'cache_size': CACHE_SIZE, 'cache_file': None, 'optimize_turbines': False,
+               'area_resolution': AREA_RESOLUTION, 'angle_resolution': ANGLE_RESOLUTION, 'n_islands': 1,
+               'optimizer': 'GA', 'surrogate_fraction': None, 'patience': None}
+
+
+def check_parameters(parameters):
+    """Raise a ValueError when parameters (the arguments of a Trainer) use an option train_pareto does not support"""
+    used = [name for name, unused in UNSUPPORTED.items() if parameters[name] != unused]
+    if used:
+        raise ValueError(f'{", ".join(used)} can not be used with pareto')
+
+
+def dominates(objectives, rows):
+    """(rows, population) array, [i, j] is True when row rows[i] dominates row j"""
+    compared = objectives[rows]
+    not_worse = np.ones((compared.shape[0], objectives.shape[0]), dtype=np.bool_)
+    better = np.zeros_like(not_worse)
+    # one objective at a time, no (rows, population, objectives) temporaries
+    for objective in range(objectives.shape[1]):
+        not_worse &= compared[:, objective, None] <= objectives[None, :, objective]
+        better |= compared[:, objective, None] < objectives[None, :, objective]
+    return not_worse & better
+
+
+def dominated_count(objectives, rows):
+    """For every row of objectives the number of rows in rows that dominate it, compared in blocks of rows"""
+    count = np.zeros(objectives.shape[0], dtype=np.int64)
+    for start in range(0, rows.shape[0], DOMINANCE_BLOCK):
+        count += np.count_nonzero(dominates(objectives, rows[start:start + DOMINANCE_BLOCK]), axis=0)
+    return count
+
+
+def non_dominated_sort(objectives):
+    """Pareto rank of every row, 0 is the non dominated front. NaN counts as the worst value."""
+    objectives = np.where(np.isnan(objectives), np.inf, objectives)
+    count = dominated_count(objectives, np.arange(objectives.shape[0]))
+    rank = np.full(objectives.shape[0], -1)
+
+    front = np.flatnonzero(count == 0)
+    current = 0
+    while front.size:
+        rank[front] = current
+        # remove the front, rows that were only dominated by it form the next front
+        count -= dominated_count(objectives, front)
+        front = np.flatnonzero((count == 0) & (rank < 0))
+        current += 1
+    return rank
+
+
+def crowding_distance(objectives, rank):
+    """Crowding distance of every row within its front, the extremes of a front get infinity."""
+    objectives = np.where(np.isnan(objectives), np.inf, objectives)
+    distance = np.zeros(objectives.shape[0])
+    for values in objectives.T:
+        order = np.lexsort((values, rank))
+        sorted_values = values[order]
+        sorted_rank = rank[order]
+
+        # first and last member of every front in the sorted order
+        new_front = sorted_rank[1:] != sorted_rank[:-1]
+        first = np.concatenate(([True], new_front))
+        last = np.concatenate((new_front, [True]))
+        starts = np.flatnonzero(first)
+        ends = np.flatnonzero(last)
+        with np.errstate(invalid='ignore'):
+            span = np.repeat(sorted_values[ends] - sorted_values[starts], ends - starts + 1)
+            gap = np.zeros_like(sorted_values)
+            gap[1:-1] = sorted_values[2:] - sorted_values[:-2]
+        contribution = np.divide(gap, span, out=np.zeros_like(gap), where=(span > 0) & np.isfinite(span))
+        contribution[first | last] = np.inf
+        distance[order] += contribution
+    return distance
+
+
+class NSGA2():
+    """
+    NSGA-II with binary tournament selection, simulated binary crossover and polynomial mutation.
+    ask/tell like the optimizers in optimizers.py, tell takes (population, 3) objectives instead of a cost.
+    """
+    def __init__(self, population, lowest, highest, crossover_eta=CROSSOVER_ETA, mutation_eta=MUTATION_ETA):
+        self.population = population
+        self.objectives = None
+        self.lowest = lowest
+        self.scale = np.where(highest > lowest, highest - lowest, 1)
+        self.highest = highest
+        self.crossover_eta = crossover_eta
+        self.mutation_eta = mutation_eta
+        self.mutation_chance = 1 / population.shape[1]
+
+    def _tournament(self, size):
+        """indices of the winners of size binary tournaments, lower rank and then larger distance wins"""
+        contestants = np.random.randint(self.population.shape[0], size=(size, 2))
+        first, second = contestants[:, 0], contestants[:, 1]
+        first_wins = (self.rank[first] < self.rank[second]) | \
+                     ((self.rank[first] == self.rank[second]) & (self.distance[first] >= self.distance[second]))
+        return np.where(first_wins, first, second)
+
+    def ask(self):
+        if self.objectives is None:
+            return self.population.copy()
+        population_size, n_features = self.population.shape
+        parent1 = self.population[self._tournament(population_size)]
+        parent2 = self.population[self._tournament(population_size)]
+
+        # simulated binary crossover, every feature is crossed with a chance of 0.5
+        u = np.random.rand(population_size, n_features)
+        beta = np.where(u <= 0.5, (2 * u) ** (1 / (self.crossover_eta + 1)),
+                        (1 / (2 * (1 - u))) ** (1 / (self.crossover_eta + 1)))
+        child = 0.5 * ((1 + beta) * parent1 + (1 - beta) * parent2)
+        child = np.where(np.random.rand(population_size, n_features) < 0.5, child, parent1)
+
+        # polynomial mutation
+        u = np.random.rand(population_size, n_features)
+        delta = np.where(u < 0.5, (2 * u) ** (1 / (self.mutation_eta + 1)) - 1,
+                         1 - (2 * (1 - u)) ** (1 / (self.mutation_eta + 1)))
+        mutate = np.random.rand(population_size, n_features) < self.mutation_chance
+        child = child + mutate * delta * self.scale
+
+        return np.clip(child, self.lowest, self.highest)
+
+    def tell(self, population, objectives):
+        """Keep the best of the parents and the new population by rank and crowding distance."""
+        if self.objectives is not None:
+            population = np.concatenate((self.population, population))
+            objectives = np.concatenate((self.objectives, objectives))
+        rank = non_dominated_sort(objectives)
+        distance = crowding_distance(objectives, rank)
+        keep = np.lexsort((-distance, rank))[:self.population.shape[0]]
+
+        self.population = population[keep]
+        self.objectives = objectives[keep]
+        self.rank = rank[keep]
+        self.distance = distance[keep]
+
+    def front(self):
+        """Genomes and objectives of the non dominated configurations."""
+        on_front = self.rank == 0
+        return self.population[on_front], self.objectives[on_front]
+
+
+def weighted_cost(objectives, cost_calculator):
+    """The single cost of CostCalculator (train by price) from the objectives"""
+    return objectives[:, 0] + objectives[:, 1] * cost_calculator.st_cost_per_kwh + \
+           objectives[:, 2] * cost_calculator.shortage_cost
+
+
+def train_pareto(trainer):
+    """
+    Train the Pareto front with the settings of trainer.
+    Returns the genomes of the front sorted by weighted cost (cheapest first),
+    trainer.pareto_front holds the genomes and the (front, 3) objectives in the same order.
+    """
+    group_values = trainer.random_population()
+    lowest_allowed, highest_allowed = trainer.limits(group_values)
+    optimizer = NSGA2(group_values, lowest_allowed[0], highest_allowed[0])
+    start = time.perf_counter()
+
+    for generation in range(trainer.generations):
+        group_values = optimizer.ask()
+        objectives = trainer.evaluator.evaluate_objectives(group_values)
+
+        #quit when gui calls stop
+        if trainer.stopped:
+            trainer.stop_reason = 'stopped'
+            trainer.evaluator.close()
+            return None
+        optimizer.tell(group_values, objectives)
+
+        genomes, front_objectives = optimizer.front()
+        order = np.argsort(weighted_cost(front_objectives, trainer.cost_calculator))
+        trainer.pareto_front = (genomes[order], front_objectives[order])
+
+        if trainer.parent:
+            event_data = [genomes[order[0]], generation, {'front_size': genomes.shape[0]}]
+            trainer.parent.gendone(event_data)
+
+        # quit when done
+        trainer.stop_reason = trainer.check_stop(generation, 0, optimizer.population,
+                                                 weighted_cost(optimizer.objectives, trainer.cost_calculator), start)
+        if trainer.stop_reason:
+            break
+
+    trainer.evaluator.close()
+    if trainer.parent:
+        trainer.parent.traindone(trainer.stop_reason)
+    return trainer.pareto_front[0]
@@ -0,0 +1,179 @@
+"""
+Graphs of a simulation or training result, for the SimTab and TrainTab.
+
+PlotData calculates every plotted series of a result once: the daily means, the cumulative
+energies and the storage trace, numba is only imported to compile the storage trace the first
+time it is needed. ResultPlot keeps one axes per graph on the figure with
+persistent lines, a new result only replaces the data of the lines and switching graphs only
+changes which axes is visible. Hourly series are decimated to the width of the axes in pixels,
+with the minimum and maximum of every pixel, so the lines look the same with far fewer points.
+"""
+
+import numpy as np
+
+ORANGE = '#FF9900'
+GREEN = '#23BF00'
+BLUE = '#4287F5'
+
+# the graphs in the order of the previous and next buttons, lines are (PlotData attribute, color, label)
+PLOTS = ({'title': 'Power output for {}', 'xlabel': 'Days', 'ylabel': 'kW', 'hourly': False, 'legend': True,
+          'lines': (('daily_total', GREEN, 'Total'), ('daily_demand', 'red', 'Demand'))},
+         {'title': 'Split power output for {}', 'xlabel': 'Days', 'ylabel': 'kW', 'hourly': False, 'legend': True,
+          'lines': (('daily_solar', ORANGE, 'Solar'), ('daily_wind', BLUE, 'Wind'),
+                    ('daily_demand', 'red', 'Demand'))},
+         {'title': 'Ratio\'s of power sources {}', 'pie': True},
+         {'title': 'Split energy for {}', 'xlabel': 'Hours', 'ylabel': 'kWh', 'hourly': True, 'legend': True,
+          'lines': (('total_energy', GREEN, 'Total '), ('wind_energy', BLUE, 'Wind '),
+                    ('solar_energy', ORANGE, 'Solar '), ('demand_energy', 'red', 'Demand'))},
+         {'title': 'Power from storage {}', 'xlabel': 'Hours', 'ylabel': 'kW', 'hourly': True, 'legend': False,
+          'lines': (('storage_charge', GREEN, 'Storage'),), 'shortages': True})
+
+_compiled_storage_trace = None  # storage_trace compiled by numba, see compiled_storage_trace
+
+
+def storage_trace(surplus, storage):
+    """
+    Charge of a storage of size storage for every hour, starting full. The year is run twice
+    and the second run is returned, so the start of the year follows from its end.
+    Returns the charge (hours + 1) and whether the storage was empty (a shortage) at every point.
+    """
+    n_hours = surplus.shape[0]
+    charge = np.empty(n_hours + 1)
+    shortage = np.zeros(n_hours + 1, dtype=np.bool_)
+    level = storage
+    for run in range(2):
+        charge[0] = level
+        shortage[:] = False
+        for t in range(n_hours):
+            level += surplus[t]
+            if level > storage:
+                level = storage
+            elif level < 0:
+                level = 0.0
+                shortage[t + 1] = True
+            charge[t + 1] = level
+    return charge, shortage
+
+
+def compiled_storage_trace():
+    """storage_trace compiled with numba (loaded from the numba cache), numba is imported at the first call"""
+    global _compiled_storage_trace
+    if _compiled_storage_trace is None:
+        from numba import jit
+        _compiled_storage_trace = jit(nopython=True, cache=True)(storage_trace)
+    return _compiled_storage_trace
+
+
+def decimate(values, width):
+    """
+    x and y of a line through values with at most 2 * width points: the minimum and the maximum
+    of every bucket of values, in the order they occur. Short series are returned as they are.
+    """
+    n_values = values.shape[0]
+    if width <= 0 or n_values <= 2 * width:
+        return np.arange(n_values), values
+
+    # equal buckets, the last one is padded with the last value
+    size = -(-n_values // width)
+    n_buckets = -(-n_values // size)
+    padded = np.empty(n_buckets * size)
+    padded[:n_values] = values
+    padded[n_values:] = values[-1]
+    buckets = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    lowest = np.minimum(np.argmin(buckets, axis=1) + offsets, n_values - 1)
+    highest = np.minimum(np.argmax(buckets, axis=1) + offsets, n_values - 1)
+
+    x = np.column_stack((np.minimum(lowest, highest), np.maximum(lowest, highest))).ravel()
+    return x, values[x]
+
+
+class PlotData():
+    """The series of every graph of one result (kW and kWh per hour), calculated once."""
+    def __init__(self, calendar, solar_power, wind_power, demand, solar_energy, wind_energy, storage):
+        total_power = solar_power + wind_power
+        self.daily_total = calendar.daily_mean(total_power)
+        self.daily_solar = calendar.daily_mean(solar_power)
+        self.daily_wind = calendar.daily_mean(wind_power)
+        self.daily_demand = calendar.daily_mean(demand)
+
+        self.solar_energy = solar_energy
+        self.wind_energy = wind_energy
+        self.total_energy = solar_energy + wind_energy
+        self.demand_energy = np.cumsum(demand)
+
+        self.pie = (solar_energy[-1], wind_energy[-1], storage)
+        self.storage_charge, shortage = compiled_storage_trace()(np.asarray(total_power - demand, dtype=np.float64),
+                                                                 float(storage))
+        self.shortage_hours = np.flatnonzero(shortage)
+
+
+class ResultPlot():
+    """
+    The graphs of a tab on a matplotlib figure. show draws one graph of a PlotData, every graph has
+    its own axes that is created the first time it is shown and only updated for a new result.
+    """
+    def __init__(self, figure):
+        self.figure = figure
+        self.axes = {}
+        self.lines = {}
+        self.markers = {}
+        self.drawn = {}  # (data, title) shown by every axes
+        self.shown = None
+
+    def clear(self):
+        """Hide the graphs until the next show"""
+        for axes in self.axes.values():
+            axes.set_visible(False)
+        self.drawn = {}
+        self.shown = None
+        self.figure.canvas.draw_idle()
+
+    def show(self, plot, data, title):
+        """Show graph number plot (index in PLOTS) of data, title is the location and year."""
+        if plot not in self.axes:
+            self.axes[plot] = self.figure.add_subplot(111, label=f'plot {plot}')
+        if self.shown is not None and self.shown != plot:
+            self.axes[self.shown].set_visible(False)
+
+        drawn = self.drawn.get(plot)
+        if drawn is None or drawn[0] is not data or drawn[1] != title:
+            self.update(plot, data, title)
+            self.drawn[plot] = (data, title)
+        self.axes[plot].set_visible(True)
+        self.shown = plot
+        self.figure.canvas.draw_idle()
+
+    def update(self, plot, data, title):
+        spec = PLOTS[plot]
+        axes = self.axes[plot]
+        if spec.get('pie'):
+            # the wedges and labels depend on the sizes, a pie is cheap to draw again
+            axes.clear()
+            axes.pie(data.pie, labels=('Solar', 'Wind', 'Storage'), autopct='%1.1f%%', colors=[ORANGE, BLUE, GREEN])
+            axes.set_title(spec['title'].format(title))
+            axes.axis('equal')
+            axes.set_frame_on(False)
+            return
+
+        if plot not in self.lines:
+            self.lines[plot] = [axes.plot([], [], color=color, alpha=0.5, label=label)[0]
+                                for name, color, label in spec['lines']]
+            if spec.get('shortages'):
+                self.markers[plot] = axes.plot([], [], 'o', color='red', markersize=3, linestyle='')[0]
+            axes.set_xlabel(spec['xlabel'])
+            axes.set_ylabel(spec['ylabel'])
+            if spec['legend']:
+                axes.legend(loc='upper left')
+            axes.set_frame_on(True)
+
+        width = int(axes.get_window_extent().width)
+        for line, (name, color, label) in zip(self.lines[plot], spec['lines']):
+            values = getattr(data, name)
+            line.set_data(*(decimate(values, width) if spec['hourly'] else (np.arange(values.shape[0]), values)))
+        if plot in self.markers:
+            self.markers[plot].set_data(data.shortage_hours, np.zeros(data.shortage_hours.shape[0]))
+
+        axes.set_title(spec['title'].format(title))
+        axes.relim()
+        axes.autoscale(tight=True)
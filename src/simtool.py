@@ -1,15 +1,15 @@
 import wx
 from windturbine import Windturbine
 from simulator import Simulator
-from train import Trainer
 from field_information import field_info
 import numpy as np
-import pandas as pd
 import os
-import xlsxwriter as xlw
 import threading
-from costcalculator import CostCalculator
-from location import Location
+import startup
+from plotting import PlotData, ResultPlot
+from location import Location, location_names
+from optimizers import OPTIMIZERS
+from simtool_api import read_defaults
 import matplotlib
 matplotlib.use('WXAgg')
 
@@ -29,10 +29,7 @@ myEVT_GENDONE = wx.NewEventType()
 EVT_GENDONE = wx.PyEventBinder(myEVT_GENDONE, 1)
 
 MAX_PLOTS = 4 #increase or decrease depending on number of graphs
-
-ORANGE = '#FF9900'
-GREEN = '#23BF00'
-BLUE = '#4287F5'
+POLL_INTERVAL = 100 # ms between checks for progress of a training process
 
 class GenDoneEvent(wx.PyCommandEvent):
     """
@@ -62,28 +59,108 @@ class SaveDoneEvent(wx.PyCommandEvent):
 
 class TrainWorker(threading.Thread):
     """
-    Class for threading a Trainer object. Ensures GUI is not blocked
+    Class for threading a Trainer object. Ensures GUI is not blocked.
+    The series of the best configuration are calculated in this thread. When several generations
+    finish before the GUI handled the last event, only the latest one is kept and shown.
     """
     def __init__(self, parent, params):
         threading.Thread.__init__(self, daemon=True)
         self.parent = parent
 
+        # imported here, the training modules are not needed to show the window
+        from train import Trainer
         self.trainer = Trainer(self, **params)
+        self.simulator = self.trainer.simulator
+
+        # latest finished generation, pending while the GUI did not take it yet
+        self.lock = threading.Lock()
+        self.latest = None
+        self.pending = False
 
     def run(self):
         self.trainer.train()
 
     def stop(self):
-        self.trainer.stopped = True
+        self.trainer.stop()
 
     def gendone(self, data):
-        evt = GenDoneEvent(myEVT_GENDONE, -1, data)
+        genome, generation, info = data
+        config = genome.astype(int)
+        latest = (config, generation, info, self.trainer.result(config))
+        with self.lock:
+            self.latest = latest
+            if self.pending:
+                return
+            self.pending = True
+        evt = GenDoneEvent(myEVT_GENDONE, -1, self)
         wx.PostEvent(self.parent, evt)
 
+    def take_latest(self):
+        """(config, generation, info, result) of the latest generation, None when it was already taken"""
+        with self.lock:
+            latest = self.latest
+            self.latest = None
+            self.pending = False
+        return latest
+
     def traindone(self, info):
         evt = TrainDoneEvent(myEVT_TRAINDONE, -1, info)
         wx.PostEvent(self.parent, evt)
 
+class ProcessTrainWorker():
+    """
+    Runs the Trainer in a separate process (see trainprocess.py), so the GUI keeps the GIL.
+    The progress is polled with a timer, the events and take_latest are the same as for TrainWorker.
+    Stopping terminates the training immediately.
+    """
+    def __init__(self, parent, params):
+        from trainprocess import TrainProcess
+        self.parent = parent
+        self.process = TrainProcess(params)
+        self.latest = None
+
+        # simulator for the calendar of the graphs, the training has its own
+        self.simulator = Simulator(Location(params['location']), params['year'], Windturbine(params['turbine_type']),
+                                   latitude=params['latitude'], longitude=params['longitude'],
+                                   terrain_factor=params['terrain_factor'])
+
+        self.timer = wx.Timer()
+        self.timer.Bind(wx.EVT_TIMER, self.poll)
+
+    def start(self):
+        self.process.start()
+        self.timer.Start(POLL_INTERVAL)
+
+    def stop(self):
+        self.timer.Stop()
+        self.process.stop()
+
+    def poll(self, event):
+        alive = self.process.is_alive()
+        for kind, data in self.process.poll():
+            if kind == 'gendone':
+                self.latest = data
+                evt = GenDoneEvent(myEVT_GENDONE, -1, self)
+                wx.PostEvent(self.parent, evt)
+            else:
+                self.timer.Stop()
+                evt = TrainDoneEvent(myEVT_TRAINDONE, -1, data)
+                wx.PostEvent(self.parent, evt)
+                return
+        # the process ended without reporting the end of the training
+        if not alive:
+            self.timer.Stop()
+            evt = TrainDoneEvent(myEVT_TRAINDONE, -1, 'training process ended unexpectedly')
+            wx.PostEvent(self.parent, evt)
+
+    def take_latest(self):
+        """(config, generation, info, result) of the latest generation, None when it was already taken"""
+        latest = self.latest
+        self.latest = None
+        if latest is not None:
+            self.process.next()
+        return latest
+
 class FileWriter(threading.Thread):
     """
     Class for writing simulation/training data into a xlsx file.
@@ -121,20 +198,22 @@ class FileWriter(threading.Thread):
 
         data = {'P_wt':P_wt,'E_wt':E_wt, 'P_sp':P_sp, 'E_sp':E_sp, 'P_tot':P_tot,
                 'E_tot':E_tot}
-        dataAvg = {'P_wt':np.mean(np.reshape(P_wt[:8760], (365,24)), axis=1),
-                   'E_wt':np.mean(np.reshape(E_wt[:8760], (365,24)), axis=1), 
-                   'P_sp':np.mean(np.reshape(P_sp[:8760], (365,24)), axis=1), 
-                   'E_sp':np.mean(np.reshape(E_sp[:8760], (365,24)), axis=1), 
-                   'P_tot':np.mean(np.reshape(P_tot[:8760], (365,24)), axis=1), 
-                   'E_tot':np.mean(np.reshape(E_tot[:8760], (365,24)), axis=1)}
+        calendar = sim.calendar
+        dataAvg = {'P_wt':calendar.daily_mean(P_wt),
+                   'E_wt':calendar.daily_mean(E_wt), 
+                   'P_sp':calendar.daily_mean(P_sp), 
+                   'E_sp':calendar.daily_mean(E_sp), 
+                   'P_tot':calendar.daily_mean(P_tot), 
+                   'E_tot':calendar.daily_mean(E_tot)}
         if self.demand:
             P_dem = np.array([self.demand for i in range(len(P_wt))])
             E_dem = np.cumsum(P_dem)
             data['P_dem'] = P_dem
             data['E_dem'] = E_dem
-            dataAvg['P_dem'] =np.mean(np.reshape(P_dem[:8760], (365,24)), axis=1)
-            dataAvg['E_dem'] =np.mean(np.reshape(E_dem[:8760], (365,24)), axis=1)
+            dataAvg['P_dem'] =calendar.daily_mean(P_dem)
+            dataAvg['E_dem'] =calendar.daily_mean(E_dem)
 
+        from costcalculator import CostCalculator
         calculator = CostCalculator(self.sp_price, self.st_price, self.demand, self.short_price, self.wt_price, 
                  self.surp_price, train_by_price=True, windturbine=Windturbine(self.turbine_type))
         stats = calculator.get_stats(P_tot, np.sum(self.solarfeatures[0::3]), self.windfeatures[0])
@@ -145,7 +224,8 @@ class FileWriter(threading.Thread):
         wx.PostEvent(self.parent, evt)
 
     def write_data(self, data, dataAvg, stats):
-        
+        import xlsxwriter as xlw
+
         data_file = xlw.Workbook(self.path)
         bold = data_file.add_format({'bold': True})
         money = data_file.add_format({'num_format': '€#,##0'})
@@ -467,7 +547,7 @@ class SimTab(wx.Panel):
         wx.Panel.__init__(self, parent)
 
         # Populate the locations list with all available locations
-        self.locations = [i.lower().capitalize() for i in pd.read_csv(f'Data{os.sep}locations.csv',index_col=0,header=0).NAME.values]
+        self.locations = [i.lower().capitalize() for i in location_names()]
         self.location_obj = None # Object containing all location data
         self.location = None # Just the location name
 
@@ -477,32 +557,35 @@ class SimTab(wx.Panel):
         self.latitude = 0
         self.longitude = 0
 
-        # Default prices
-        self.sp_price = 160
-        self.wt_price = 1070
-        self.st_price = 400
-
-        # Default configurations
-        self.sp_area_1 = 10000
-        self.sp_area_2 = 10000
-        self.sp_area_3 = 10000
-        self.sp_area_4 = 10000
-        self.sp_or_1 = -5
-        self.sp_or_2 = -10
-        self.sp_or_3 = 10
-        self.sp_or_4 = 5
-        self.sp_ang_1 = 15
-        self.sp_ang_2 = 15
-        self.sp_ang_3 = 15
-        self.sp_ang_4 = 15
-        self.sp_eff = 16
-
-        self.wt_height = 100
-        self.n_wt = 7
+        # Default prices and configurations, the command line uses the same file
+        defaults = read_defaults(f'config{os.sep}defaults{os.sep}sim_defaults.csv')
+        self.sp_price = defaults['sp_price']
+        self.wt_price = defaults['wt_price']
+        self.st_price = defaults['st_price']
+        self.shortage_price = defaults['shortage_price']
+        self.surplus_price = defaults['surplus_price']
+
+        self.sp_area_1 = defaults['sp_area_1']
+        self.sp_area_2 = defaults['sp_area_2']
+        self.sp_area_3 = defaults['sp_area_3']
+        self.sp_area_4 = defaults['sp_area_4']
+        self.sp_or_1 = defaults['sp_or_1']
+        self.sp_or_2 = defaults['sp_or_2']
+        self.sp_or_3 = defaults['sp_or_3']
+        self.sp_or_4 = defaults['sp_or_4']
+        self.sp_ang_1 = defaults['sp_ang_1']
+        self.sp_ang_2 = defaults['sp_ang_2']
+        self.sp_ang_3 = defaults['sp_ang_3']
+        self.sp_ang_4 = defaults['sp_ang_4']
+        self.sp_eff = defaults['sp_eff']
+
+        self.wt_height = defaults['wt_height']
+        self.n_wt = defaults['n_wt']
         self.terrain_factor = 0
 
         # Iterator for cycling graphs
         self.plot_iter = 0
+        self.plot_data = None # PlotData of the shown result
 
         # Variables holding the power and energy outputs
         self.solar_power = None
@@ -514,7 +597,7 @@ class SimTab(wx.Panel):
 
         # REMOVE!
         self.demand = None
-        self.demand_input = 6000
+        self.demand_input = defaults['demand']
 
         self.power_surplus = 0
         self.power_shortage = 0
@@ -636,8 +719,8 @@ class SimTab(wx.Panel):
         self.simulate_button.Bind(wx.EVT_BUTTON, self.on_simulate_clicked)
         
         self.figure = Figure()
-        self.axes = self.figure.add_subplot(111)
         self.canvas = FigureCanvas(self, -1, self.figure)
+        self.result_plot = ResultPlot(self.figure)
 
         graph_button_sizer = wx.BoxSizer(wx.HORIZONTAL)
         graph_button_sizer.AddMany([(self.previousgraph_button, 0, wx.ALL), (self.nextgraph_button, 0, wx.ALL),
@@ -699,11 +782,14 @@ class SimTab(wx.Panel):
 
     # Simulate when button is clicked
     def on_simulate_clicked(self, event):
+        # costcalculator imports numba, the warm-up thread has usually loaded it by now
+        from costcalculator import CostCalculator
         try:
             turbine = Windturbine(self.wt_type_choice.GetString(self.wt_type_choice.GetCurrentSelection()))
             self.simulator = Simulator(self.location_obj, self.year_choice.GetString(self.year_choice.GetCurrentSelection()), 
                               turbine, latitude=self.latitude, longitude=self.longitude)
-            self.cost_calculator = CostCalculator(self.sp_price, self.st_price, self.demand_input, 0, self.wt_price, 0, True, windturbine=turbine)
+            self.cost_calculator = CostCalculator(self.sp_price, self.st_price, self.demand_input, self.shortage_price,
+                                                  self.wt_price, self.surplus_price, True, windturbine=turbine)
         except:
             wx.MessageBox('Please make sure you enter\na location, a year and a windturbine type', 'Input error', wx.OK)
             return
@@ -715,7 +801,6 @@ class SimTab(wx.Panel):
         self.total_power = self.wind_power + self.solar_power
         self.total_energy = self.wind_energy + self.solar_energy
 
-        self.demand_input = 6000
         self.demand = np.full(len(self.total_power), self.demand_input)
 
         
@@ -729,6 +814,8 @@ class SimTab(wx.Panel):
         self.win_cost = stats['wind_cost']
         self.stor_cost = stats['storage_cost']
 
+        self.plot_data = PlotData(self.simulator.calendar, self.solar_power, self.wind_power, self.demand,
+                                  self.solar_energy, self.wind_energy, self.power_storage)
         self.draw()
 
     # Cycle previous graph when button is clicked
@@ -751,76 +838,10 @@ class SimTab(wx.Panel):
     
     # Draw graph
     def draw(self):
-
-        self.axes.clear() # Clear axes first
-
-        # Check which graph is currently chosen and plot it
-        if self.plot_iter == 0:
-            self.axes.plot(np.mean(np.reshape(self.total_power[:8760], (365,24)), axis=1),
-                                   color=GREEN, alpha=0.5, label='Total')
-            self.axes.plot(np.mean(np.reshape(self.demand[:8760], (365,24)), axis=1), 
-                                   color='red', alpha=0.5, label='Demand')
-            self.axes.set_xlabel('Days')
-            self.axes.set_ylabel('kW')
-            self.axes.set_title(f'Power output for {self.location} {self.year_choice.GetString(self.year_choice.GetSelection())}')
-            self.axes.legend(loc='upper left')
-            self.axes.set_frame_on(True)
-            self.axes.axis('tight')
-        if self.plot_iter == 1:
-            self.axes.plot(np.mean(np.reshape(self.solar_power[:8760], (365,24)), axis=1), 
-                                   color=ORANGE, alpha=0.5, label='Solar')
-            self.axes.plot(np.mean(np.reshape(self.wind_power[:8760], (365,24)), axis=1), 
-                                   color=BLUE, alpha=0.5, label='Wind')
-            self.axes.plot(np.mean(np.reshape(self.demand[:8760], (365,24)), axis=1), 
-                                   color='red', alpha=0.5, label='Demand')
-            self.axes.set_xlabel('Days')
-            self.axes.set_ylabel('kW')
-            self.axes.set_title(f'Split power output for {self.location} {self.year_choice.GetString(self.year_choice.GetSelection())}')
-            self.axes.legend(loc='upper left')
-            self.axes.set_frame_on(True)
-            self.axes.axis('tight')
-        if self.plot_iter == 2:
-            labels = 'Solar', 'Wind', 'Storage'
-            sizes =  self.solar_energy[-1], self.wind_energy[-1], self.power_storage
-            self.axes.pie(sizes, labels=labels, autopct='%1.1f%%', colors=[ORANGE, BLUE, GREEN])
-            self.axes.set_title(f'Ratio\'s of power sources {self.location} {self.year_choice.GetString(self.year_choice.GetSelection())}')
-            self.axes.axis('equal')
-            self.axes.set_frame_on(False)
-        if self.plot_iter == 3:
-            self.axes.plot(self.total_energy, color=GREEN, alpha=0.5, label ='Total ')
-            self.axes.plot(self.wind_energy, color=BLUE, alpha=0.5, label='Wind ')
-            self.axes.plot(self.solar_energy, color=ORANGE, alpha=0.5, label='Solar ')
-            self.axes.plot(np.cumsum(self.demand), color='red', alpha=0.5, label='Demand')
-            self.axes.set_xlabel('Hours')
-            self.axes.set_ylabel('kWh')
-            self.axes.set_title(f'Split energy for {self.location} {self.year_choice.GetString(self.year_choice.GetSelection())}')
-            self.axes.legend(loc='upper left')
-            self.axes.set_frame_on(True)
-            self.axes.axis('tight')
-        if self.plot_iter == 4:
-            power =  self.total_power - self.demand_input
-            for x in range(2) :
-                if x == 0 :
-                    batterycharge = [self.power_storage]
-                else:
-                    batterycharge = [batterycharge[-1]]
-                Powershortage = []
-                for I in power :
-                    batterycharge.append(batterycharge[-1] + I)
-                    if self.power_storage < batterycharge[-1]: 
-                        batterycharge[-1] = self.power_storage
-                    elif(0 > batterycharge[-1]) :
-                        batterycharge[-1] = 0
-                        Powershortage.append(len(batterycharge)-1)
-            self.axes.plot(batterycharge, color=GREEN, alpha=0.5, label='Storage')
-            if len(Powershortage) == 0:
-                self.axes.scatter(np.zeros(len(Powershortage)), Powershortage, color='red')
-            self.axes.set_xlabel('Hours')
-            self.axes.set_ylabel('kW')
-            self.axes.set_title(f'Power from storage {self.location} {self.year_choice.GetString(self.year_choice.GetSelection())}')
-            self.axes.set_frame_on(True)
-            self.axes.axis('tight')
-        self.canvas.draw()
+        if self.plot_data is None:
+            return
+        self.result_plot.show(self.plot_iter, self.plot_data,
+                              f'{self.location} {self.year_choice.GetString(self.year_choice.GetSelection())}')
 
     # When a location is picked from dropdown, call update location information
     def on_location_picked(self, event):
@@ -878,7 +899,7 @@ class SimTab(wx.Panel):
                   'windfeatures':windfeatures,'solarfeatures':solarfeatures,'sp_eff':self.sp_eff,
                   'wt_type':self.wt_type_choice.GetString(self.wt_type_choice.GetCurrentSelection()), 
                   'sp_price': self.sp_price, 'wt_price': self.wt_price, 'st_price':self.st_price,
-                  'surp_price': 0, 'short_price': 0, 'demand' : 0}
+                  'surp_price': self.surplus_price, 'short_price': self.shortage_price, 'demand' : 0}
 
         with wx.FileDialog(self, "Save simulation", defaultFile='Simulation_output', wildcard='excel files(*.xlsx)|*.xlsx',
                            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as fileDialog:
@@ -907,7 +928,7 @@ class InputDialog(wx.Dialog):
         wx.Frame.__init__(self, parent, title='Inputs')
 
         # Populate locations list for dropdown
-        self.locations = [i.lower().capitalize() for i in pd.read_csv('Data{}locations.csv'.format(os.sep),index_col=0, header=0).NAME.values]
+        self.locations = [i.lower().capitalize() for i in location_names()]
         
         self.years = ['0000'] # placeholder for windows
 
@@ -937,6 +958,8 @@ class InputDialog(wx.Dialog):
         self.generations = 0
         self.poolsize = 0
         self.m_rate = 0
+        self.optimizer = 'GA'
+        self.separate_process = False
 
         # Price variables 
         self.sp_price = 0
@@ -983,7 +1006,7 @@ class InputDialog(wx.Dialog):
         win_input_grid = wx.FlexGridSizer(3, 4, 10, 10)
         self.price_grid = wx.FlexGridSizer(5, 2, 10, 10)
         power_grid = wx.FlexGridSizer(3, 2, 10,10)
-        ga_grid = wx.FlexGridSizer(2, 4, 10, 10)
+        ga_grid = wx.FlexGridSizer(3, 4, 10, 10)
 
         #Choice dropdown for location and year
         self.places = wx.Choice(self, wx.ID_ANY, choices=self.locations)
@@ -1058,10 +1081,16 @@ class InputDialog(wx.Dialog):
         self.poolsize_field = wx.TextCtrl(self, wx.ID_ANY, value=f'{self.poolsize}', name='pool_size')
         m_rate_txt = wx.StaticText(self, wx.ID_ANY, 'Mutation rate ')
         self.m_rate_field = wx.TextCtrl(self, wx.ID_ANY, value=f'{self.m_rate}', name='mutation_rate')
+        optimizer_txt = wx.StaticText(self, wx.ID_ANY, 'Optimizer ')
+        self.optimizer_choice = wx.Choice(self, wx.ID_ANY, choices=list(OPTIMIZERS), name='optimizer')
+        process_txt = wx.StaticText(self, wx.ID_ANY, 'Separate process ')
+        self.process_check = wx.CheckBox(self, wx.ID_ANY, name='separate_process')
 
         ga_grid.AddMany([(demand_txt, 0, wx.ALL, 2), (self.demand_field, 0, wx.ALL, 2), (m_rate_txt, 0, wx.ALL, 2),
                          (self.m_rate_field, 0, wx.ALL, 2), (generations_txt, 0, wx.ALL, 2), (self.generations_field, 0, wx.ALL, 2),
-                         (poolsize_txt, 0, wx.ALL, 2), (self.poolsize_field, 0, wx.ALL, 2)])
+                         (poolsize_txt, 0, wx.ALL, 2), (self.poolsize_field, 0, wx.ALL, 2),
+                         (optimizer_txt, 0, wx.ALL, 2), (self.optimizer_choice, 0, wx.ALL, 2),
+                         (process_txt, 0, wx.ALL, 2), (self.process_check, 0, wx.ALL, 2)])
 
         #Price options. Trainby is to input wether algoritm trains by power output or price of configuration
         trainby_txt = wx.StaticText(self, wx.ID_ANY, 'Train by: ')
@@ -1114,6 +1143,8 @@ class InputDialog(wx.Dialog):
         self.generations_field.Bind(wx.EVT_MOTION, self.on_mouse_over)
         self.poolsize_field.Bind(wx.EVT_MOTION, self.on_mouse_over)
         self.m_rate_field.Bind(wx.EVT_MOTION, self.on_mouse_over)
+        self.optimizer_choice.Bind(wx.EVT_MOTION, self.on_mouse_over)
+        self.process_check.Bind(wx.EVT_MOTION, self.on_mouse_over)
         self.sp_price_field.Bind(wx.EVT_MOTION, self.on_mouse_over)
         self.wt_price_field.Bind(wx.EVT_MOTION, self.on_mouse_over)
         self.st_price_field.Bind(wx.EVT_MOTION, self.on_mouse_over)
@@ -1271,6 +1302,8 @@ class InputDialog(wx.Dialog):
         self.generations_field.SetValue(f'{self.generations}')
         self.poolsize_field.SetValue(f'{self.poolsize}')
         self.m_rate_field.SetValue(f'{self.m_rate}')
+        self.optimizer_choice.SetSelection(self.optimizer_choice.FindString(self.optimizer))
+        self.process_check.SetValue(self.separate_process)
 
         self.sp_price_field.SetValue(f'{self.sp_price}')
         self.wt_price_field.SetValue(f'{self.wt_price}')
@@ -1306,6 +1339,8 @@ class InputDialog(wx.Dialog):
         self.generations = int(self.generations_field.GetValue())
         self.poolsize = int(self.poolsize_field.GetValue())
         self.m_rate = int(self.m_rate_field.GetValue())
+        self.optimizer = self.optimizer_choice.GetString(self.optimizer_choice.GetCurrentSelection())
+        self.separate_process = self.process_check.GetValue()
 
         self.sp_price = int(self.sp_price_field.GetValue())
         self.wt_price = int(self.wt_price_field.GetValue())
@@ -1318,44 +1353,46 @@ class InputDialog(wx.Dialog):
         """ 
             Load defaults from file and update the fields. 
         """
-        defaults = pd.read_csv(f"config{os.sep}defaults{os.sep}train_defaults.csv", header=0)
+        defaults = read_defaults(f"config{os.sep}defaults{os.sep}train_defaults.csv")
 
-        self.places.SetSelection(self.places.FindString(defaults.location_choice.values[0]))
+        self.places.SetSelection(self.places.FindString(defaults['location_choice']))
         self.on_location_picked(None)
-        self.year_choice.SetSelection(self.year_choice.FindString(f"{defaults.year_choice.values[0]}"))
-        self.n_sp_configs_list.SetSelection(self.n_sp_configs_list.FindString(f"{(defaults.n_sp_configs_choice.values[0])}"))
-        self.wt_type_choice.SetSelection(self.wt_type_choice.FindString(defaults.turbine_type.values[0]))
-
-        self.location = defaults.location.values[0]
-        self.year = defaults.year.values[0]
-        self.latitude = defaults.latitude.values[0]
-        self.longitude = defaults.longitude.values[0]
-
-        self.sp_eff = defaults.sp_eff.values[0]
-        self.sp_area_min = defaults.sp_area_min.values[0]
-        self.sp_area_max = defaults.sp_area_max.values[0]
-        self.sp_ang_min = defaults.sp_ang_min.values[0]
-        self.sp_ang_max = defaults.sp_ang_max.values[0]
-        self.sp_or_min = defaults.sp_or_min.values[0]
-        self.sp_or_max = defaults.sp_or_max.values[0]
-        self.n_sp_configs = defaults.n_sp_configs.values[0]
-
-        self.wtn_min = defaults.wtn_min.values[0]
-        self.wtn_max = defaults.wtn_max.values[0]
-        self.turbine_height = defaults.turbine_height.values[0]
-        self.terrain_factor = defaults.terrain_factor.values[0]
-
-        self.demand = defaults.demand.values[0]
-
-        self.generations = defaults.generations.values[0]
-        self.poolsize = defaults.poolsize.values[0]
-        self.m_rate = defaults.m_rate.values[0]
-
-        self.sp_price = defaults.sp_price.values[0]
-        self.wt_price = defaults.wt_price.values[0]
-        self.st_price = defaults.st_price.values[0]
-        self.shortage_price = defaults.shortage_price.values[0]
-        self.n_sp_configs = defaults.n_sp_configs.values[0]
+        self.year_choice.SetSelection(self.year_choice.FindString(f"{defaults['year_choice']}"))
+        self.n_sp_configs_list.SetSelection(self.n_sp_configs_list.FindString(f"{(defaults['n_sp_configs_choice'])}"))
+        self.wt_type_choice.SetSelection(self.wt_type_choice.FindString(defaults['turbine_type']))
+
+        self.location = defaults['location']
+        self.year = defaults['year']
+        self.latitude = defaults['latitude']
+        self.longitude = defaults['longitude']
+
+        self.sp_eff = defaults['sp_eff']
+        self.sp_area_min = defaults['sp_area_min']
+        self.sp_area_max = defaults['sp_area_max']
+        self.sp_ang_min = defaults['sp_ang_min']
+        self.sp_ang_max = defaults['sp_ang_max']
+        self.sp_or_min = defaults['sp_or_min']
+        self.sp_or_max = defaults['sp_or_max']
+        self.n_sp_configs = defaults['n_sp_configs']
+
+        self.wtn_min = defaults['wtn_min']
+        self.wtn_max = defaults['wtn_max']
+        self.turbine_height = defaults['turbine_height']
+        self.terrain_factor = defaults['terrain_factor']
+
+        self.demand = defaults['demand']
+
+        self.generations = defaults['generations']
+        self.poolsize = defaults['poolsize']
+        self.m_rate = defaults['m_rate']
+        self.optimizer = defaults['optimizer'] if 'optimizer' in defaults else 'GA'
+        self.separate_process = defaults['separate_process'] if 'separate_process' in defaults else False
+
+        self.sp_price = defaults['sp_price']
+        self.wt_price = defaults['wt_price']
+        self.st_price = defaults['st_price']
+        self.shortage_price = defaults['shortage_price']
+        self.n_sp_configs = defaults['n_sp_configs']
 
         self.update_fields()
 
@@ -1374,11 +1411,13 @@ class InputDialog(wx.Dialog):
                     'turbine_type': self.wt_type_choice.GetString(self.wt_type_choice.GetCurrentSelection()),
                     'wtn_min': self.wtn_min, 'wtn_max': self.wtn_max,
                     'demand': self.demand, 'generations': self.generations, 
-                    'poolsize': self.poolsize, 'm_rate': self.m_rate, 
+                    'poolsize': self.poolsize, 'm_rate': self.m_rate, 'optimizer': self.optimizer,
+                    'separate_process': self.separate_process,
                     'sp_price': self.sp_price, 'wt_price': self.wt_price, 
                     'st_price': self.st_price, 'shortage_price': self.shortage_price, 'surplus_price': self.surplus_price,
                     'n_config_':self.n_sp_configs,'year_choice':self.year_choice.GetString(self.year_choice.GetCurrentSelection()),
                     'location_choice':self.places.GetString(self.places.GetCurrentSelection()),'n_sp_configs_choice':self.n_sp_configs_list.GetString(self.n_sp_configs_list.GetCurrentSelection())}
+        import pandas as pd
         pd.DataFrame([defaults]).to_csv('config{sep}defaults{sep}train_defaults.csv'.format(sep=os.sep))
 
         file_info = 'Current inputs saved as default.'
@@ -1393,7 +1432,7 @@ class TrainTab(wx.Panel):
         wx.Panel.__init__(self, parent)
 
         # Populate list with locations. 
-        self.locations = [i.lower().capitalize() for i in pd.read_csv('Data/locations.csv',index_col=0,header=0).NAME.values]
+        self.locations = [i.lower().capitalize() for i in location_names()]
         self.years= ['0000'] # Placeholder again
 
         # Dialog for setting all the inputs
@@ -1437,10 +1476,10 @@ class TrainTab(wx.Panel):
 
         self.n_sp_configs = 4
 
-        self.costcalculator = None
         self.simulator = None
 
         self.plot_iter = 0
+        self.plot_data = None # PlotData of the shown result
 
         self.config = None
         self.train_worker = None
@@ -1542,8 +1581,8 @@ class TrainTab(wx.Panel):
 
         # Plot setup
         self.figure = Figure()
-        self.axes = self.figure.add_subplot(111)
         self.canvas = FigureCanvas(self, -1, self.figure)
+        self.result_plot = ResultPlot(self.figure)
 
         graph_button_sizer = wx.BoxSizer(wx.HORIZONTAL)
 
@@ -1648,16 +1687,8 @@ class TrainTab(wx.Panel):
         self.start_button.Disable()
 
         self.progress.SetRange(self.dialog.generations)
-        self.axes.clear()
-
-        turbine = Windturbine(self.dialog.wt_type_choice.GetString(self.dialog.wt_type_choice.GetSelection()))
-        self.simulator = Simulator(Location(self.dialog.location), self.dialog.year_choice.GetString(self.dialog.year_choice.GetSelection()), 
-                                            turbine, latitude=self.dialog.latitude, 
-                                            longitude=self.dialog.longitude, terrain_factor=self.dialog.terrain_factor)
-        self. costcalculator = CostCalculator(self.dialog.sp_price, self.dialog.st_price, 
-                                                       self.dialog.demand, self.dialog.shortage_price, 
-                                                       self.dialog.wt_price, self.dialog.surplus_price, 
-                                                       self.dialog.trainby,turbine)
+        self.plot_data = None
+        self.result_plot.clear()
 
         parameters = {'generations':self.dialog.generations, 'group_size':self.dialog.poolsize, 
                   'n_configs':({0:4, 1:3, 2:2, 3:1}.get(self.dialog.n_sp_configs)), 
@@ -1671,11 +1702,17 @@ class TrainTab(wx.Panel):
                   'shortage_price':self.dialog.shortage_price, 'turbine_price':self.dialog.wt_price, 
                   'surplus_price':self.dialog.surplus_price, 'train_by_price':self.dialog.trainby,
                   'location':self.dialog.location, 'year':self.dialog.year_choice.GetString(self.dialog.year_choice.GetSelection()), 
-                  'latitude':self.dialog.latitude, 'longitude':self.dialog.longitude, 'terrain_factor':self.dialog.terrain_factor
+                  'latitude':self.dialog.latitude, 'longitude':self.dialog.longitude, 'terrain_factor':self.dialog.terrain_factor,
+                  'optimizer':self.dialog.optimizer
         }
 
         try:
-            self.train_worker = TrainWorker(self, parameters)
+            if self.dialog.separate_process:
+                self.train_worker = ProcessTrainWorker(self, parameters)
+            else:
+                self.train_worker = TrainWorker(self, parameters)
+            # the results are calculated by the train worker, its simulator provides the calendar for the graphs
+            self.simulator = self.train_worker.simulator
             self.train_worker.start()
         except:
             wx.MessageBox('Please make sure you enter all inputs.\nIf problem persists contact developer.', 'Train error', wx.OK)
@@ -1688,10 +1725,16 @@ class TrainTab(wx.Panel):
         self.start_button.Enable()
 
     # When generation done event is fired update the variables for outputs
-    # and call the update function and draw function
+    # and call the update function and draw function.
+    # The train worker calculated the results, only the latest generation is shown
     def on_gendone(self, event):
-        self.progress.SetValue(event.data[1]+1)
-        self.config = event.data[0].astype(int)
+        if event.data is not self.train_worker:
+            return
+        latest = event.data.take_latest()
+        if latest is None:
+            return
+        self.config, generation, info, result = latest
+        self.progress.SetValue(generation+1)
         solar_features = self.config[:-1]
         turbines = self.config[-1]
 
@@ -1714,18 +1757,15 @@ class TrainTab(wx.Panel):
         self.n_wt = turbines
         self.wt_height = self.dialog.turbine_height
 
-        self.solar_power, self.solar_energy = self.simulator.calc_solar(Az=orientation_features, 
-                                                              Inc=angle_features, 
-                                                              sp_area=surface_features, 
-                                                              sp_eff=self.dialog.sp_eff)
-        self.wind_power, self.wind_energy = self.simulator.calc_wind([turbines, self.wt_height])
+        self.solar_power = result['solar_power']
+        self.solar_energy = result['solar_energy']
+        self.wind_power = result['wind_power']
+        self.wind_energy = result['wind_energy']
+        self.total_power = result['total_power']
+        self.total_energy = result['total_energy']
+        self.demand = result['demand']
 
-        self.total_power = self.wind_power + self.solar_power
-        self.total_energy = self.wind_energy + self.solar_energy
-
-        self.demand = np.full(len(self.total_energy), self.dialog.demand)
-
-        stats = self.costcalculator.get_stats(self.total_power, np.sum(surface_features), turbines)
+        stats = result['stats']
 
         self.power_surplus = stats['total_surplus']
         self.power_storage = stats['total_storage']
@@ -1737,81 +1777,16 @@ class TrainTab(wx.Panel):
 
         self.update_outputs()
 
+        self.plot_data = PlotData(self.simulator.calendar, self.solar_power, self.wind_power, self.demand,
+                                  self.solar_energy, self.wind_energy, self.power_storage)
         self.draw()
 
     # Draw the graph for the current outputs shown.
     def draw(self):
-
-        # Clear axes first
-        self.axes.clear()
-
-        # Check which graph is selected and draw it.
-        if self.plot_iter == 0:
-            self.axes.plot(np.mean(np.reshape(self.total_power[:8760], (365,24)), axis=1),
-                           color=GREEN, alpha=0.5, label='Total')
-            self.axes.plot(np.mean(np.reshape(self.demand[:8760], (365,24)), axis=1),
-                           color='red', alpha=0.5, label='Demand')
-            self.axes.set_xlabel('Days')
-            self.axes.set_ylabel('kW')
-            self.axes.set_title(f'Power output for {self.dialog.location} {self.dialog.year_choice.GetString(self.dialog.year_choice.GetSelection())}')
-            self.axes.legend(loc='upper left')
-            self.axes.set_frame_on(True)
-            self.axes.axis('tight')
-        if self.plot_iter == 1:
-            self.axes.plot(np.mean(np.reshape(self.solar_power[:8760], (365,24)), axis=1), 
-                           color=ORANGE, alpha=0.5, label='Solar')
-            self.axes.plot(np.mean(np.reshape(self.wind_power[:8760], (365,24)), axis=1), 
-                           color=BLUE, alpha=0.5, label='Wind')
-            self.axes.plot(np.mean(np.reshape(self.demand[:8760], (365,24)), axis=1), 
-                           color='red', alpha=0.5, label='Demand')
-            self.axes.set_xlabel('Days')
-            self.axes.set_ylabel('kW')
-            self.axes.set_title(f'Split power output for {self.dialog.location} {self.dialog.year_choice.GetString(self.dialog.year_choice.GetSelection())}')
-            self.axes.legend(loc='upper left')
-            self.axes.set_frame_on(True)
-            self.axes.axis('tight')
-        if self.plot_iter == 2:
-            labels = 'Solar', 'Wind', 'Storage'
-            sizes =  self.solar_energy[-1], self.wind_energy[-1], self.power_storage
-            self.axes.pie(sizes, labels=labels, autopct='%1.1f%%', colors=[ORANGE, BLUE, GREEN])
-            self.axes.set_title(f'Ratio\'s of power sources {self.dialog.location} {self.dialog.year_choice.GetString(self.dialog.year_choice.GetSelection())}')
-            self.axes.axis('equal')
-            self.axes.set_frame_on(False)
-        if self.plot_iter == 3:
-            self.axes.plot(self.total_energy, color=GREEN, alpha=0.5, label ='Total ')
-            self.axes.plot(self.wind_energy, color=BLUE, alpha=0.5, label='Wind ')
-            self.axes.plot(self.solar_energy, color=ORANGE, alpha=0.5, label='Solar ')
-            self.axes.plot(np.cumsum(self.demand), color='red', alpha=0.5, label='Demand')
-            self.axes.set_xlabel('Hours')
-            self.axes.set_ylabel('kWh')
-            self.axes.set_title(f'Split energy for {self.dialog.location} {self.dialog.year_choice.GetString(self.dialog.year_choice.GetSelection())}')
-            self.axes.legend(loc='upper left')
-            self.axes.set_frame_on(True)
-            self.axes.axis('tight')
-        if self.plot_iter == 4:
-            power =  self.total_power - 6000
-            for x in range(2) :
-                if x == 0 :
-                    batterycharge = [self.power_storage]
-                else:
-                    batterycharge = [batterycharge[-1]]
-                Powershortage = []
-                for I in power :
-                    batterycharge.append(batterycharge[-1] + I)
-                    if self.power_storage < batterycharge[-1]: 
-                        batterycharge[-1] = self.power_storage
-                    elif(0 > batterycharge[-1]) :
-                        batterycharge[-1] = 0
-                        Powershortage.append(len(batterycharge)-1)
-            self.axes.plot(batterycharge, color=GREEN, alpha=0.5, label='Storage')
-            if len(Powershortage) == 0:
-                self.axes.scatter(np.zeros(len(Powershortage)), Powershortage, color='red')
-            self.axes.set_xlabel('Hours')
-            self.axes.set_ylabel('kW')
-            self.axes.set_title(f'Power from storage {self.dialog.location} {self.dialog.year_choice.GetString(self.dialog.year_choice.GetSelection())}')
-            self.axes.set_frame_on(True)
-            self.axes.axis('tight')
-        self.canvas.draw()
+        if self.plot_data is None:
+            return
+        self.result_plot.show(self.plot_iter, self.plot_data,
+                              f'{self.dialog.location} {self.dialog.year_choice.GetString(self.dialog.year_choice.GetSelection())}')
 
     # Open the save dialog when the save button is clicked.
     def on_save_clicked(self, event):
@@ -1854,8 +1829,12 @@ class TrainTab(wx.Panel):
 
     # Let the user know when a training is done.
     def on_training_done(self, evt):
-        
+        from train import ALL_GENERATIONS_DONE
+
         file_info = f'Training done for {self.dialog.location} {self.dialog.year_choice.GetString(self.dialog.year_choice.GetSelection())}'
+        # only a training that stopped early says why
+        if evt.data and evt.data != ALL_GENERATIONS_DONE:
+            file_info += f'\nStopped because: {evt.data}'
         wx.MessageBox(file_info, 'Training done', wx.OK)
 
         self.progress.SetValue(0)
@@ -1899,6 +1878,7 @@ class TurbineDialog(wx.Dialog):
         self.Fit()
 
     def load_turbine(self, ttype):
+        import pandas as pd
         turbine = pd.read_csv(f'config{os.sep}turbines{os.sep}{ttype}.csv', index_col=0)
         self.windcurve = turbine.wind.values.tolist()
         self.powercurve = turbine.power.values.tolist()
@@ -1925,6 +1905,7 @@ class TurbineDialog(wx.Dialog):
         windcurve = list(map(float,self.wind_field.GetValue().split(',')))
         powercurve = list(map(int,self.power_field.GetValue().split(',')))
         # create pandas dataframe and save it
+        import pandas as pd
         dataframe = pd.DataFrame()
         dataframe['power'] = powercurve
         dataframe['wind'] = windcurve
@@ -1986,4 +1967,6 @@ class MainFrame(wx.Frame):
 if __name__ == "__main__":
     app = wx.App(redirect=True, filename='log.txt')
     MainFrame().Show()
+    # load the numba kernels while the user fills in the parameters
+    startup.start_warm_up()
     app.MainLoop()
\ No newline at end of file
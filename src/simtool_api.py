@@ -0,0 +1,310 @@
+"""
+Simulation and training without the GUI.
+
+The functions take the same parameters as the simulate and train tabs of simtool.py and return
+plain dicts, the write functions store those as csv and json files. numpy, numba and the simulator
+are only imported when a function is called, so importing this module (and starting the command
+line interface in simtool_cli.py) stays fast.
+
+    import simtool_api
+    result = simtool_api.simulate(location='schiphol', year='2016', n_turbines=2)
+    simtool_api.write_result(result, 'output/schiphol')
+"""
+
+import contextlib
+import csv
+import itertools
+import json
+import os
+import sys
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+SIM_DEFAULTS_FILE = os.path.join(SOURCE_DIR, 'config', 'defaults', 'sim_defaults.csv')
+TRAIN_DEFAULTS_FILE = os.path.join(SOURCE_DIR, 'config', 'defaults', 'train_defaults.csv')
+
+
+def read_defaults(path):
+    """
+    The row of a defaults file in config/defaults as a dict, with the numbers and booleans converted.
+    The csv module instead of pandas keeps pandas out of the start of the GUI.
+    """
+    with open(path, newline='') as defaults_file:
+        defaults = next(csv.DictReader(defaults_file))
+    for key, value in defaults.items():
+        if value in ('True', 'False'):
+            defaults[key] = value == 'True'
+            continue
+        for convert in (int, float):
+            try:
+                defaults[key] = convert(value)
+                break
+            except ValueError:
+                pass
+    return defaults
+
+
+def simulate_defaults(path=SIM_DEFAULTS_FILE):
+    """Parameters of simulate from the defaults of the simulate tab, the tab has no default location or turbine"""
+    tab = read_defaults(path)
+    return {'location': 'volkel', 'year': '2018', 'latitude': None, 'longitude': None, 'terrain_factor': None,
+            'turbine_type': '3MW', 'n_turbines': tab['n_wt'], 'turbine_height': tab['wt_height'],
+            'solar_features': [tab[f'{name}_{config}'] for config in range(1, 5)
+                               for name in ('sp_area', 'sp_ang', 'sp_or')],
+            'sp_eff': tab['sp_eff'], 'solar_price': tab['sp_price'], 'storage_price': tab['st_price'],
+            'turbine_price': tab['wt_price'], 'shortage_price': tab['shortage_price'],
+            'surplus_price': tab['surplus_price'], 'demand': tab['demand']}
+
+
+# parameters of SimTab.on_simulate_clicked, solar_features holds n_configs * (area, angle, orientation)
+SIMULATE_DEFAULTS = simulate_defaults()
+
+
+def train_defaults(path=TRAIN_DEFAULTS_FILE):
+    """
+    Parameters of train from the defaults of the training input dialog (saved from the GUI), the
+    coordinates and terrain factor follow from the location like for simulate.
+    """
+    dialog = read_defaults(path)
+    return {'generations': dialog['generations'], 'group_size': dialog['poolsize'],
+            'n_configs': dialog['n_sp_configs_choice'], 'surface_min': dialog['sp_area_min'],
+            'surface_max': dialog['sp_area_max'], 'angle_min': dialog['sp_ang_min'], 'angle_max': dialog['sp_ang_max'],
+            'orientation_min': dialog['sp_or_min'], 'orientation_max': dialog['sp_or_max'], 'sp_eff': dialog['sp_eff'],
+            'mutation_percentage': dialog['m_rate'], 'turbines_min': dialog['wtn_min'],
+            'turbines_max': dialog['wtn_max'], 'turbine_height': dialog['turbine_height'],
+            'turbine_type': str(dialog['turbine_type']), 'solar_price': dialog['sp_price'],
+            'storage_price': dialog['st_price'], 'demand': dialog['demand'], 'shortage_price': dialog['shortage_price'],
+            'turbine_price': dialog['wt_price'], 'surplus_price': dialog['surplus_price'], 'train_by_price': True,
+            'location': str(dialog['location']).lower(), 'year': str(dialog['year_choice']), 'latitude': None,
+            'longitude': None, 'terrain_factor': None, 'optimizer': dialog.get('optimizer', 'GA')}
+
+
+# parameters of TrainTab.on_start_clicked (the arguments of Trainer without a default)
+TRAIN_DEFAULTS = train_defaults()
+
+# optional arguments of Trainer, only passed on when given
+TRAIN_OPTIONS = {'workers': int, 'cache_size': int, 'cache_file': str, 'area_resolution': float,
+                 'angle_resolution': float, 'n_islands': int, 'migration_interval': int,
+                 'n_migrants': int, 'patience': int, 'tolerance': float, 'min_diversity': float,
+                 'time_budget': float, 'checkpoint_file': str, 'checkpoint_interval': int, 'resume': bool,
+                 'surrogate_fraction': float, 'surrogate_audit': bool, 'optimize_turbines': bool, 'pareto': bool,
+                 'years': list, 'year_aggregate': str, 'year_percentile': float}
+
+# parameters holding a file name, relative to the directory of the caller
+PATH_PARAMETERS = ('cache_file', 'checkpoint_file')
+
+COMMANDS = ('simulate', 'train')
+
+
+@contextlib.contextmanager
+def source_dir():
+    """The data and config paths of the simulator are relative to the source directory."""
+    previous = os.getcwd()
+    os.chdir(SOURCE_DIR)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def load_parameters(path):
+    """Parameters from a json or yaml file (yaml needs PyYAML)."""
+    with open(path) as parameter_file:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError(f'reading {path} needs PyYAML, use a json file or install pyyaml') from None
+            return yaml.safe_load(parameter_file) or {}
+        return json.load(parameter_file)
+
+
+def absolute_paths(parameters):
+    """Copy of parameters with the file names of PATH_PARAMETERS made absolute."""
+    parameters = dict(parameters)
+    for name in PATH_PARAMETERS:
+        if parameters.get(name):
+            parameters[name] = os.path.abspath(parameters[name])
+    return parameters
+
+
+def _plain(value):
+    """numpy values as python values, for json"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return value
+
+
+def simulate(**parameters):
+    """
+    Simulate one configuration for a year, like the simulate tab.
+    Returns a dict with the parameters, the cost statistics and the hourly 'series' (kW and kWh).
+    """
+    import numpy as np
+    from simulator import Simulator
+    from location import Location
+    from windturbine import Windturbine
+    from costcalculator import CostCalculator
+
+    unknown = set(parameters) - set(SIMULATE_DEFAULTS)
+    if unknown:
+        raise TypeError(f'unknown simulate parameters: {", ".join(sorted(unknown))}')
+    p = dict(SIMULATE_DEFAULTS, **parameters)
+    p['year'] = str(p['year'])
+    solar_features = np.asarray(p['solar_features'], dtype=np.float64)
+    wind_features = [int(p['n_turbines']), int(p['turbine_height'])]
+
+    with source_dir():
+        turbine = Windturbine(p['turbine_type'])
+        simulator = Simulator(Location(p['location']), p['year'], turbine, latitude=p['latitude'],
+                              longitude=p['longitude'], terrain_factor=p['terrain_factor'])
+        solar_power, solar_energy = simulator.calc_solar(Az=solar_features[2::3], Inc=solar_features[1::3],
+                                                         sp_area=solar_features[0::3], sp_eff=p['sp_eff'])
+        wind_power, wind_energy = simulator.calc_wind(wind_features)
+        calculator = CostCalculator(p['solar_price'], p['storage_price'], p['demand'], p['shortage_price'],
+                                    p['turbine_price'], p['surplus_price'], True, windturbine=turbine)
+
+    total_power = solar_power + wind_power
+    demand = np.full(len(total_power), float(p['demand']))
+    stats = calculator.get_stats(total_power, np.sum(solar_features[0::3]), wind_features[0])
+    series = {'P_sp': solar_power, 'E_sp': solar_energy, 'P_wt': wind_power, 'E_wt': wind_energy,
+              'P_tot': total_power, 'E_tot': solar_energy + wind_energy, 'P_dem': demand,
+              'E_dem': np.cumsum(demand)}
+    return {'command': 'simulate', 'parameters': p, 'stats': {name: float(value) for name, value in stats.items()},
+            'series': series, 'calendar': simulator.calendar}
+
+
+class Progress():
+    """Parent of a Trainer that keeps the progress of every generation, optionally printing it."""
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.history = []
+        self.stop_reason = None
+
+    def gendone(self, data):
+        genome, generation, info = data
+        self.history.append(dict({'generation': generation}, **{name: _plain(value) for name, value in info.items()}))
+        if self.verbose:
+            print(f'generation {generation + 1} done', file=sys.stderr, flush=True)
+
+    def traindone(self, reason):
+        self.stop_reason = reason
+
+
+def create_trainer(parameters, parent=None):
+    """Trainer with TRAIN_DEFAULTS updated by parameters, use run_training to train it."""
+    from train import Trainer
+
+    p = absolute_paths(dict(TRAIN_DEFAULTS, **parameters))
+    p['year'] = str(p['year'])
+    with source_dir():
+        return Trainer(parent, **p)
+
+
+def run_training(trainer):
+    """
+    Train and return a dict with the parameters, the best genome, its simulation, the stop reason and
+    the progress of every generation (when the parent of the trainer is a Progress).
+    Stopping the trainer from another thread or a signal handler is allowed.
+    """
+    with source_dir():
+        best = trainer.train()
+    parent = trainer.parent
+    result = {'command': 'train', 'parameters': {name: _plain(value) for name, value in trainer.parameters.items()},
+              'stop_reason': trainer.stop_reason,
+              'history': parent.history if isinstance(parent, Progress) else []}
+    if best is None:
+        return result
+
+    # the best genome holds n_configs * (area, angle, orientation) and the number of turbines
+    p = trainer.parameters
+    genome = best[0]
+    result['best'] = genome.tolist()
+    simulation = simulate(location=p['location'], year=p['year'], latitude=p['latitude'], longitude=p['longitude'],
+                          terrain_factor=p['terrain_factor'], turbine_type=p['turbine_type'],
+                          n_turbines=int(genome[-1]), turbine_height=p['turbine_height'],
+                          solar_features=genome[:-1].tolist(), sp_eff=p['sp_eff'], solar_price=p['solar_price'],
+                          storage_price=p['storage_price'], turbine_price=p['turbine_price'],
+                          shortage_price=p['shortage_price'], surplus_price=p['surplus_price'], demand=p['demand'])
+    result.update(stats=simulation['stats'], series=simulation['series'], calendar=simulation['calendar'])
+    if trainer.pareto_front is not None:
+        result['pareto_front'] = trainer.pareto_front
+    return result
+
+
+def train(parameters, parent=None):
+    """Train with TRAIN_DEFAULTS updated by parameters, see run_training for the result."""
+    return run_training(create_trainer(parameters, parent if parent is not None else Progress()))
+
+
+def sweep(command, parameters, grid, output_dir=None, verbose=False):
+    """
+    Run command ('simulate' or 'train') for every combination of the values in grid ({name: [values]}),
+    on top of parameters. With output_dir every run is written to its own directory and a summary.csv
+    with the grid values and statistics of every run. Returns the summary rows.
+    """
+    if command not in COMMANDS:
+        raise ValueError(f'unknown command {command}, choose from {", ".join(COMMANDS)}')
+    names = list(grid)
+    rows = []
+    for run, values in enumerate(itertools.product(*(grid[name] for name in names))):
+        run_parameters = dict(parameters, **dict(zip(names, values)))
+        if command == 'simulate':
+            result = simulate(**run_parameters)
+        else:
+            result = train(run_parameters, Progress(verbose))
+        row = dict({'run': run}, **dict(zip(names, values)), **result.get('stats', {}))
+        if command == 'train':
+            row['stop_reason'] = result['stop_reason']
+        rows.append(row)
+        if output_dir:
+            write_result(result, os.path.join(output_dir, f'run_{run:03d}'))
+        if verbose:
+            print(f'run {run + 1} done: {dict(zip(names, values))}', file=sys.stderr, flush=True)
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        fields = list(dict.fromkeys(field for row in rows for field in row))
+        with open(os.path.join(output_dir, 'summary.csv'), 'w', newline='') as summary_file:
+            writer = csv.DictWriter(summary_file, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows
+
+
+def write_result(result, output_dir):
+    """
+    Write a simulate or train result into output_dir: result.json (parameters, statistics, best genome),
+    hourly.csv and daily.csv (power and energy series), history.csv (progress of a training)
+    and pareto_front.csv (genomes and objectives of a Pareto training).
+    """
+    import numpy as np
+
+    os.makedirs(output_dir, exist_ok=True)
+    summary = {name: value for name, value in result.items() if name not in ('series', 'calendar', 'pareto_front')}
+    with open(os.path.join(output_dir, 'result.json'), 'w') as result_file:
+        json.dump(summary, result_file, indent=2, default=_plain)
+
+    if 'series' in result:
+        names = list(result['series'])
+        hourly = np.column_stack([result['series'][name] for name in names])
+        np.savetxt(os.path.join(output_dir, 'hourly.csv'), hourly, delimiter=',', header=','.join(names),
+                   comments='')
+        daily = np.column_stack([result['calendar'].daily_mean(result['series'][name]) for name in names])
+        np.savetxt(os.path.join(output_dir, 'daily.csv'), daily, delimiter=',', header=','.join(names),
+                   comments='')
+
+    if result.get('history'):
+        fields = list(dict.fromkeys(field for row in result['history'] for field in row))
+        with open(os.path.join(output_dir, 'history.csv'), 'w', newline='') as history_file:
+            writer = csv.DictWriter(history_file, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows({name: json.dumps(value) if isinstance(value, list) else value
+                              for name, value in row.items()} for row in result['history'])
+
+    if result.get('pareto_front') is not None:
+        from pareto import OBJECTIVES
+        genomes, objectives = result['pareto_front']
+        header = [f'gene_{index}' for index in range(genomes.shape[1] - 1)] + ['n_turbines', *OBJECTIVES]
+        np.savetxt(os.path.join(output_dir, 'pareto_front.csv'), np.column_stack((genomes, objectives)),
+                   delimiter=',', header=','.join(header), comments='')
+
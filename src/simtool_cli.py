@@ -0,0 +1,164 @@
+"""
+Command line interface of the simulation tool, without wxPython.
+
+    python -m simtool_cli simulate --location schiphol --year 2016 --n_turbines 2 --output out/simulation
+    python -m simtool_cli train --config train.yaml --workers 4 --output out/training
+    python -m simtool_cli sweep --config sweep.json --output out/sweep
+
+Parameters come from the defaults in simtool_api, then the --config file (json or yaml), then the flags.
+A sweep config holds {"command": "simulate" or "train", "parameters": {...}, "grid": {name: [values]}},
+--grid name=value,value adds to the grid. A training stops cleanly on SIGINT and SIGTERM, the last
+checkpoint is written when a checkpoint_file is given. --profile-startup prints the import,
+kernel (numba cache or compile) and first result times to stderr.
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+import simtool_api
+
+START = time.perf_counter()
+
+
+def parse_value(text):
+    """A flag value as json (numbers, lists, true/false/null), otherwise as text"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def parse_bool(text):
+    if text.lower() in ('1', 'true', 'yes'):
+        return True
+    if text.lower() in ('0', 'false', 'no'):
+        return False
+    raise argparse.ArgumentTypeError(f'{text} is not a boolean')
+
+
+def parse_list(text):
+    """json list, 'all' or comma separated values"""
+    if text == 'all':
+        return text
+    value = parse_value(text)
+    if isinstance(value, list):
+        return value
+    return [parse_value(item) for item in text.split(',')]
+
+
+def add_parameter_flags(parser, defaults, options=None):
+    """A flag for every parameter, only the given flags end up in the parsed arguments."""
+    group = parser.add_argument_group('parameters')
+    for name, default in defaults.items():
+        if isinstance(default, bool):
+            kind = parse_bool
+        elif isinstance(default, list):
+            kind = parse_list
+        elif default is None:
+            kind = parse_value
+        else:
+            kind = type(default)
+        group.add_argument(f'--{name}', type=kind, default=argparse.SUPPRESS, metavar=name.upper(),
+                           help=f'default {default}')
+    for name, kind in (options or {}).items():
+        kind = {bool: parse_bool, list: parse_list}.get(kind, kind)
+        group.add_argument(f'--{name}', type=kind, default=argparse.SUPPRESS, metavar=name.upper())
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog='simtool_cli', description='Simulate and train without the GUI.')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='print the import, kernel and first result times to stderr')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    simulate = commands.add_parser('simulate', help='simulate one configuration')
+    add_parameter_flags(simulate, simtool_api.SIMULATE_DEFAULTS)
+
+    train = commands.add_parser('train', help='train a configuration')
+    add_parameter_flags(train, simtool_api.TRAIN_DEFAULTS, simtool_api.TRAIN_OPTIONS)
+    train.add_argument('--quiet', action='store_true', help='do not print the progress')
+
+    sweep = commands.add_parser('sweep', help='simulate or train every combination of a parameter grid')
+    sweep.add_argument('--run', choices=simtool_api.COMMANDS, help='command of every run (default simulate)')
+    sweep.add_argument('--grid', action='append', default=[], metavar='NAME=VALUE,VALUE',
+                       help='values of a parameter, can be given more than once')
+    sweep.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                       help='parameter of every run, can be given more than once')
+    sweep.add_argument('--quiet', action='store_true', help='do not print the progress')
+
+    for command in (simulate, train, sweep):
+        command.add_argument('--config', help='json or yaml file with the parameters')
+        command.add_argument('--output', help='directory to write the results to')
+    return parser
+
+
+def split_assignment(text):
+    name, separator, value = text.partition('=')
+    if not separator:
+        raise SystemExit(f'expected NAME=VALUE, got {text}')
+    return name, value
+
+
+def print_profile(times, command, first_result):
+    import startup
+    times = times + [(f'first result ({command})', time.perf_counter() - first_result)]
+    print(startup.format_profile(times, time.perf_counter() - START), file=sys.stderr)
+
+
+def main(argv=None):
+    arguments = vars(make_parser().parse_args(argv))
+    command = arguments.pop('command')
+    config_path = arguments.pop('config')
+    output = arguments.pop('output')
+    quiet = arguments.pop('quiet', False)
+    profile = arguments.pop('profile_startup')
+    if profile:
+        import startup
+        times = startup.time_imports()
+        with simtool_api.source_dir():
+            times += startup.warm_up()
+        first_result = time.perf_counter()
+    config = simtool_api.load_parameters(config_path) if config_path else {}
+    if output:
+        output = os.path.abspath(output)
+
+    if command == 'sweep':
+        parameters = simtool_api.absolute_paths(config.get('parameters', {}))
+        grid = dict(config.get('grid', {}))
+        for text in arguments['set']:
+            name, value = split_assignment(text)
+            parameters[name] = parse_value(value)
+        for text in arguments['grid']:
+            name, value = split_assignment(text)
+            grid[name] = parse_list(value)
+        run = arguments['run'] or config.get('command', 'simulate')
+        rows = simtool_api.sweep(run, parameters, grid, output_dir=output, verbose=not quiet)
+        if profile:
+            print_profile(times, command, first_result)
+        print(json.dumps(rows, indent=2, default=str))
+        return 0
+
+    parameters = simtool_api.absolute_paths(dict(config, **arguments))
+    if command == 'simulate':
+        result = simtool_api.simulate(**parameters)
+    else:
+        trainer = simtool_api.create_trainer(parameters, simtool_api.Progress(verbose=not quiet))
+        # stop after the current generation, so the checkpoint and cache are written
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signal_number, lambda *_: trainer.stop())
+        result = simtool_api.run_training(trainer)
+    if profile:
+        print_profile(times, command, first_result)
+
+    if output:
+        simtool_api.write_result(result, output)
+    print(json.dumps({name: result[name] for name in ('stats', 'best', 'stop_reason') if name in result},
+                     indent=2, default=str))
+    return 0 if result.get('stop_reason') != 'stopped' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,20 +1,19 @@
 import numpy as np
-import pandas as pd
-from datetime import datetime
 from windturbine import Windturbine
 from location import Location
-import os
+import weatherstore
+from yearcalendar import YearCalendar, is_leap_year
+from solar_geometry import SolarGeometry
 
-KAPPA = 1.041  # for calculations in radians
-IO = 1366.1  # solar constant(w/m^2)
-NANO = 1e-9  # for conversion from nanoseconds
-LSM = 15  # local standard time meridian
+BATCH_MEMORY = 4 * 1024 ** 2  # default memory budget of the batched calculations (bytes)
+BATCH_TEMPORARIES = 5  # number of (population, hours) arrays alive at once in a batch calculation
 
 
 class Simulator():
     """Class for calculating irradiation"""
 
-    def __init__(self, Location, year, Windturbine, latitude=None, longitude=None, terrain_factor=None, lsm=15):
+    def __init__(self, Location, year, Windturbine, latitude=None, longitude=None, terrain_factor=None, lsm=15,
+                 batch_memory=BATCH_MEMORY, weather=None):
         # variables from arguments
         self.location = Location
         if latitude:
@@ -30,174 +29,164 @@ class Simulator():
         else:
             self.terrain_factor = self.location.terrain
         self.Windturbine = Windturbine
+        self.year = str(year)
 
-        # variables from data file
-        file_name = f'Data{os.sep}{self.location.name}{os.sep}{year}.csv'
-        self.import_data = pd.read_csv(file_name, index_col=0)
-        self.ghi = self.import_data.iloc[:, 5].values
-        self.dni = self.import_data.iloc[:, 7].values
-        self.dates = self.import_data.iloc[:, 1].values
-
-        if type(self.dates[0]) == str:
-            self.doy = np.array([datetime.strptime(self.dates[i], '%Y-%m-%d').timetuple().tm_yday for i in range(0, len(self.dates))])
+        # variables from data file (binary store, csv as fallback), unless the weather array is given
+        if weather is None:
+            self.import_data = weatherstore.load(self.location.name, year)
         else:
-            self.doy = np.array([datetime.utcfromtimestamp(self.dates[i].astype(int) * NANO).timetuple().tm_yday for i in range(0, len(self.dates))])
-        
-        self.time = self.import_data.iloc[:, 2].values.astype(int)
-        self.wind_speed = (self.import_data.iloc[:, 3].values) / 10
-        self.temperature = (self.import_data.iloc[:, 4].values) / 10
+            self.import_data = weather
+        self.ghi = self.import_data['Q']
+        self.dni = self.import_data['DNI']
+        self.doy = self.import_data['DOY']
+        self.time = self.import_data['HH']
+        self.wind_speed = self.import_data['FH'].astype(np.float64) / 10
+        self.temperature = self.import_data['T'].astype(np.float64) / 10
+
+        # decoded calendar, shared by the calculations and the graphs
+        self.calendar = YearCalendar(self.doy, self.time, is_leap_year(int(year)))
+
+        # single turbine wind power profiles, see wind_profile
+        self._wind_profiles = {}
+
+        # memory budget in bytes for the batched calculations
+        self.batch_memory = batch_memory
+
+        # sun position and sky model, shared between simulators of the same site
+        self.solar_geometry = SolarGeometry.for_site(self.location.name, year, self.latitude, self.longitude,
+                                                     self.doy, self.time, self.ghi, self.dni)
 
     def calc_solar(self, Az=[0, 0, 0, 0], Inc=[15, 15, 15, 15], sp_area=[100, 100, 100, 100], sp_eff=16, gref=0):
-        gamma = np.array(Az)
-        beta = np.array(Inc)
-
-        # calculation of sun positions                         
-        day_angle = 2 * np.pi * (self.doy - 1) / 365
-        decl = 23.442 * np.sin(np.deg2rad((360 / 365) * (self.doy + 284)))
-
-        # equation of time 
-        EQT = 229.18 * (0.0000075 + 0.001868 * np.cos(np.deg2rad(day_angle))
-                        - 0.032077 * np.sin(np.deg2rad(day_angle)) - 0.014615 * np.cos(np.deg2rad(2 * day_angle))
-                        - 0.040849 * np.sin(np.deg2rad(2 * day_angle)))
-
-        # hour angle [deg] 
-        h = 15 * ((self.longitude - LSM) * 4 / 60 + (self.time - 12 - 0.5 + EQT / 60))
-        hai = np.round(np.sin(np.deg2rad(self.latitude)), 4) * np.round(np.sin(np.deg2rad(decl)), 4) + np.round(
-            np.cos(np.deg2rad(self.latitude)), 4) * np.round(np.cos(np.deg2rad(decl)) * np.cos(np.deg2rad(h)), 4)
-
-        # calculating DHI from GHI and DNI
-        DHI = self.ghi - self.dni * hai
-        DHI[DHI < 0] = 0
-
-        sel = np.degrees(np.arcsin(hai))  # sel=solar elevation angle [deg]
-        Zen = np.arccos(hai)  # Zen=solar zenith angle [radians!!]
-
-        # Perez factors for calculation of circumsolar and horizon brightness coefficients
-        f11 = np.array([-0.008, 0.130, 0.330, 0.568, 0.873, 1.132, 1.060, 0.678])
-        f12 = np.array([0.588, 0.683, 0.487, 0.187, -0.392, -1.237, -1.600, -0.327])
-        f13 = np.array([-0.062, -0.151, -0.221, -0.295, -0.362, -0.412, -0.3590, -0.2500])
-        f21 = np.array([-0.0600, -0.0190, 0.0550, 0.1090, 0.2260, 0.2880, 0.2640, 0.1560])
-        f22 = np.array([0.072, 0.066, -0.064, -0.152, -0.462, -0.823, -1.1270, -1.3770])
-        f23 = np.array([-0.022, -0.029, -0.026, -0.014, 0.001, 0.056, 0.131, 0.2510])
-
-        # determination of bin with eps
-        s_bin = np.ones(len(self.time))  # bin 1 is overcast sky , bin 8 is clear sky
-
-        # eps calculation had devide by zero which created runtime warnings. Code below is solution for 
-        # eps = ((DHI + self.dni) / DHI + KAPPA * Zen ** 3) / (1 + KAPPA * Zen ** 3)
-        
-        eps_numerator = np.divide((DHI + self.dni), DHI, out=np.zeros_like(DHI), where=DHI!=0) + KAPPA * Zen ** 3
-        eps_nominator = 1 + KAPPA * Zen ** 3
-        eps = np.divide(eps_numerator, eps_nominator, out=np.zeros_like(eps_nominator), where=eps_numerator!=0)
-
-        s_bin[np.logical_and(eps >= 1.065, eps < 1.23)] = 2
-        s_bin[np.logical_and(eps >= 1.23, eps < 1.5)] = 3
-        s_bin[np.logical_and(eps >= 1.5, eps < 1.95)] = 4
-        s_bin[np.logical_and(eps >= 1.95, eps < 2.8)] = 5
-        s_bin[np.logical_and(eps >= 2.8, eps < 4.5)] = 6
-        s_bin[np.logical_and(eps >= 4.5, eps < 6.2)] = 7
-        s_bin[(eps >= 6.2)] = 8
-
-        # calculation of relative air mass
-        M = 1 / hai
-        M[sel < 2] = 20
-
-        ETR = IO * (1 + 0.033 * np.cos(np.deg2rad(2 * np.pi * self.doy)) / 365)  # [deg]
-
-        Delta = (DHI * M) / ETR
-
-        s_bin_int = s_bin.astype(int)
-
-        F1 = f11[s_bin_int - 1] + Delta * f12[s_bin_int - 1] + Zen * f13[s_bin_int - 1]
-        F1[F1 < 0] = 0
-        F2 = f21[s_bin_int - 1] + Delta * f22[s_bin_int - 1] + Zen * f23[s_bin_int - 1]
-
-        # determination of cos angle of incidence of tilted surface 
-        #  cai= cos angle of incidence of Solar to surface = cos(teta)
-        gamma_dim = gamma[np.newaxis, :]
-        beta_dim = beta[np.newaxis, :]
-        decl_dim = decl[:, np.newaxis]
-        h_dim = h[:, np.newaxis]
-
-        cai = np.array(np.sin(np.deg2rad(decl_dim)) * np.sin(np.deg2rad(self.latitude)) * np.cos(np.deg2rad(beta_dim))
-                       - np.sin(np.deg2rad(decl_dim)) * np.cos(np.deg2rad(self.latitude)) * (
-                               np.sin(np.deg2rad(beta_dim)) * np.cos(np.deg2rad(gamma_dim)))
-                       + (np.cos(np.deg2rad(decl_dim)) * np.cos(np.deg2rad(h_dim))) * np.cos(
-            np.deg2rad(self.latitude)) * np.cos(np.deg2rad(beta_dim))
-                       + (np.cos(np.deg2rad(decl_dim)) * np.cos(np.deg2rad(h_dim))) * np.sin(
-            np.deg2rad(self.latitude)) * (np.sin(np.deg2rad(beta_dim)) * np.cos(np.deg2rad(gamma_dim)))
-                       + np.cos(np.deg2rad(decl_dim)) * np.sin(np.deg2rad(h_dim)) * (
-                               np.sin(np.deg2rad(beta_dim)) * np.sin(np.deg2rad(gamma_dim))))
-
-        # determination of the diffuse radiation on a tilted surface DTI, Perez 1990
-        a = cai
-        a[a < 0] = 0
-
-        b = np.cos(Zen)
-        b[b < 0.087] = 0.087
-
-        # Adjust for broadcast operations
-        b = b[:, np.newaxis]
-        DHI_dim = DHI[:, np.newaxis]
-        F1_dim = F1[:, np.newaxis]
-        F2_dim = F2[:, np.newaxis]
-        DNI_dim = self.dni[:, np.newaxis]
-
-        c = (a / b) * F1_dim
-
-        DTI = DHI_dim * (1 - F1_dim) * (1 + np.cos(np.deg2rad(beta_dim))) / 2 + c + F2_dim * np.sin(
-            np.deg2rad(beta_dim))
-        DTI[DTI < 0] = 0
-
-        DSTI = cai * DNI_dim
-        DSTI[DSTI < 0] = 0
-
-        Rg = 0.5 * gref * (DHI_dim + DNI_dim) * (1 - np.cos(np.deg2rad(beta_dim)))
+        P_out = self.calc_solar_batch(Az=[Az], Inc=[Inc], sp_area=[sp_area], sp_eff=sp_eff, gref=gref)[0]
 
-        GTI = DTI + DSTI + Rg
-
-        individual_output = (GTI * (sp_eff / 100)) * sp_area
+        E_out = np.cumsum(P_out)
 
-        total_output = np.sum(individual_output, axis=1)
+        return P_out, E_out
+
+    def calc_solar_batch(self, Az, Inc, sp_area, sp_eff=16, gref=0):
+        """
+        Solar power of a whole population of configurations in one go.
+        Az, Inc and sp_area are (population, n_configs) arrays, returns a (population, hours) power array.
+        The population is split in chunks so the temporary arrays stay within self.batch_memory bytes.
+        """
+        gamma = np.atleast_2d(np.asarray(Az, dtype=np.float64))
+        beta = np.atleast_2d(np.asarray(Inc, dtype=np.float64))
+        area = np.atleast_2d(np.asarray(sp_area, dtype=np.float64))
+        population = gamma.shape[0]
+        hours = self.solar_geometry.dni.shape[0]
+
+        P_out = np.empty((population, hours))
+        chunk = max(1, int(self.batch_memory // (BATCH_TEMPORARIES * hours * P_out.itemsize)))
+        for start in range(0, population, chunk):
+            stop = min(start + chunk, population)
+            P_out[start:stop] = self._calc_solar_chunk(gamma[start:stop], beta[start:stop], area[start:stop], sp_eff, gref)
+
+        return P_out
+
+    def _calc_solar_chunk(self, gamma, beta, sp_area, sp_eff, gref):
+        # orientation independent part of the calculation, broadcast over the population
+        geometry = self.solar_geometry
+        inc_a = geometry.inc_a[np.newaxis, :]
+        inc_b = geometry.inc_b[np.newaxis, :]
+        inc_c = geometry.inc_c[np.newaxis, :]
+        inc_d = geometry.inc_d[np.newaxis, :]
+        inc_e = geometry.inc_e[np.newaxis, :]
+        b = geometry.cos_zenith[np.newaxis, :]
+        F1_dim = geometry.f1[np.newaxis, :]
+        F2_dim = geometry.f2[np.newaxis, :]
+        DNI_dim = geometry.dni[np.newaxis, :]
+        DHI_iso_dim = geometry.dhi_isotropic[np.newaxis, :]
+        DHI_DNI_dim = geometry.dhi_dni[np.newaxis, :]
+
+        Rg_dim = 0.5 * gref * DHI_DNI_dim
+
+        # work arrays, the calculation below is done in place to limit memory traffic
+        shape = (gamma.shape[0], b.shape[1])
+        total_output = np.zeros(shape)
+        cai = np.empty(shape)
+        GTI = np.empty(shape)
+        tmp = np.empty(shape)
+
+        # loop over the (at most four) configurations, every step handles the whole population
+        for i in range(gamma.shape[1]):
+            cos_beta = np.cos(np.deg2rad(beta[:, i]))[:, np.newaxis]
+            sin_beta = np.sin(np.deg2rad(beta[:, i]))[:, np.newaxis]
+            cos_gamma = np.cos(np.deg2rad(gamma[:, i]))[:, np.newaxis]
+            sin_gamma = np.sin(np.deg2rad(gamma[:, i]))[:, np.newaxis]
+
+            # determination of cos angle of incidence of tilted surface 
+            #  cai= cos angle of incidence of Solar to surface = cos(teta)
+            np.multiply(inc_a, cos_beta, out=cai)
+            cai -= np.multiply(inc_b, sin_beta * cos_gamma, out=tmp)
+            cai += np.multiply(inc_c, cos_beta, out=tmp)
+            cai += np.multiply(inc_d, sin_beta * cos_gamma, out=tmp)
+            cai += np.multiply(inc_e, sin_beta * sin_gamma, out=tmp)
+
+            # determination of the diffuse radiation on a tilted surface DTI, Perez 1990
+            np.maximum(cai, 0, out=cai)
+
+            np.multiply(DHI_iso_dim, 1 + cos_beta, out=GTI)
+            GTI /= 2
+            np.divide(cai, b, out=tmp)
+            GTI += np.multiply(tmp, F1_dim, out=tmp)
+            GTI += np.multiply(F2_dim, sin_beta, out=tmp)
+            np.maximum(GTI, 0, out=GTI)  # DTI
+
+            # direct radiation on the tilted surface DSTI
+            np.multiply(cai, DNI_dim, out=tmp)
+            GTI += np.maximum(tmp, 0, out=tmp)
+
+            # ground reflection Rg
+            GTI += np.multiply(Rg_dim, 1 - cos_beta, out=tmp)
+
+            GTI *= (sp_eff / 100)
+            GTI *= sp_area[:, i, np.newaxis]
+            total_output += GTI
 
         P_out = total_output / 1000  # kW
 
-        e_temp = total_output/1000
-        E_out = np.cumsum(e_temp)
+        return P_out
 
-        return P_out, E_out
+    def wind_profile(self, rotor_height):
+        """
+        Hourly power of a single turbine at the given rotor height.
+        The output of n turbines is n times this profile, so it is calculated once per
+        turbine type, rotor height and terrain factor and kept for later calls.
+        """
+        rotor_height = int(rotor_height)
+        key = (self.Windturbine.name, rotor_height, self.terrain_factor)
+        profile = self._wind_profiles.get(key)
+        if profile is not None:
+            return profile
 
-    def calc_wind(self, wind_features):
-        n_turbines = int(wind_features[0])
-        rotor_height = int(wind_features[1])
         external_factors = (rotor_height / 10) ** self.terrain_factor
 
         in_values = self.wind_speed * external_factors
 
-        excl = self.Windturbine.wind_curve[np.newaxis, :] - in_values[:, np.newaxis]
-        abs_excl = np.abs(excl)
-
-        index_1 = abs_excl.argmin(axis=1)
-        index_2 = index_1 - 1
-        index_2[excl[np.arange(in_values.shape[0]), index_1] < 0] += 2
-
-        a_1 = self.Windturbine.wind_curve[index_1]
-        a_2 = self.Windturbine.wind_curve[index_2]
+        profile = self.Windturbine.get_power(in_values)
+        profile.flags.writeable = False
+        self._wind_profiles[key] = profile
 
-        difference_1 = np.abs(a_1 - in_values)
-        difference_2 = np.abs(a_2 - in_values)
-        difference = difference_1 + difference_2
+        return profile
 
-        value_1 = self.Windturbine.power_curve[index_1]
-        value_2 = self.Windturbine.power_curve[index_2]
+    def calc_wind(self, wind_features):
+        n_turbines = int(wind_features[0])
+        rotor_height = int(wind_features[1])
 
-        P_out_single = (value_1 * difference_2 + value_2 * difference_1) / difference
-        P_out = P_out_single * n_turbines
+        P_out = self.wind_profile(rotor_height) * n_turbines
 
         E_out = np.cumsum(P_out)
 
         return P_out, E_out
 
+    def calc_wind_batch(self, n_turbines, rotor_height):
+        """
+        Wind power for a vector of turbine counts at one rotor height.
+        Returns a (len(n_turbines), hours) power array.
+        """
+        n_turbines = np.asarray(n_turbines).astype(int)
+        return np.multiply.outer(n_turbines, self.wind_profile(rotor_height))
+
     def calc_total_power(self, solar_features, wind_features, sp_eff):
         surface_features = solar_features[0::3]
         angle_features = solar_features[1::3]
@@ -211,7 +200,28 @@ class Simulator():
 
         return total_power, total_energy
 
+    def calc_total_power_batch(self, solar_features, wind_features, sp_eff):
+        """
+        Total power of a population. solar_features is a (population, n_configs * 3) array,
+        wind_features a (population, 2) array with the number of turbines and the rotor height.
+        Returns a (population, hours) power array.
+        """
+        solar_features = np.atleast_2d(np.asarray(solar_features, dtype=np.float64))
+        wind_features = np.atleast_2d(np.asarray(wind_features)).astype(int)
+
+        total_power = self.calc_solar_batch(Az=solar_features[:, 2::3], Inc=solar_features[:, 1::3],
+                                            sp_area=solar_features[:, 0::3], sp_eff=sp_eff)
+
+        # the rotor height is the same for (nearly) the whole population
+        heights = wind_features[:, 1]
+        for rotor_height in np.unique(heights):
+            rows = heights == rotor_height
+            total_power[rows] += self.calc_wind_batch(wind_features[rows, 0], rotor_height)
+
+        return total_power
+
 if __name__ == '__main__':
+    import pandas as pd
 
     my_loc = Location('nen')
     turbine = Windturbine(4)
@@ -0,0 +1,120 @@
+"""
+Solar geometry of a site.
+
+Everything in the irradiation calculation that does not depend on the orientation
+of the solar panels (sun position, DHI, Perez sky model, air mass) is calculated
+once here. The Simulator only does the per orientation incidence and transposition work.
+"""
+
+import numpy as np
+from collections import OrderedDict
+
+KAPPA = 1.041  # for calculations in radians
+IO = 1366.1  # solar constant(w/m^2)
+LSM = 15  # local standard time meridian
+
+# Perez factors for calculation of circumsolar and horizon brightness coefficients
+F11 = np.array([-0.008, 0.130, 0.330, 0.568, 0.873, 1.132, 1.060, 0.678])
+F12 = np.array([0.588, 0.683, 0.487, 0.187, -0.392, -1.237, -1.600, -0.327])
+F13 = np.array([-0.062, -0.151, -0.221, -0.295, -0.362, -0.412, -0.3590, -0.2500])
+F21 = np.array([-0.0600, -0.0190, 0.0550, 0.1090, 0.2260, 0.2880, 0.2640, 0.1560])
+F22 = np.array([0.072, 0.066, -0.064, -0.152, -0.462, -0.823, -1.1270, -1.3770])
+F23 = np.array([-0.022, -0.029, -0.026, -0.014, 0.001, 0.056, 0.131, 0.2510])
+
+MAX_CACHED_SITES = 32
+
+_geometry_cache = OrderedDict()
+
+
+class SolarGeometry():
+    """Class holding the orientation independent part of the irradiation calculation"""
+
+    def __init__(self, latitude, longitude, doy, time, ghi, dni):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.dni = np.asarray(dni, dtype=np.float64)
+
+        # calculation of sun positions
+        day_angle = 2 * np.pi * (doy - 1) / 365
+        self.decl = 23.442 * np.sin(np.deg2rad((360 / 365) * (doy + 284)))
+
+        # equation of time
+        self.eqt = 229.18 * (0.0000075 + 0.001868 * np.cos(np.deg2rad(day_angle))
+                             - 0.032077 * np.sin(np.deg2rad(day_angle)) - 0.014615 * np.cos(np.deg2rad(2 * day_angle))
+                             - 0.040849 * np.sin(np.deg2rad(2 * day_angle)))
+
+        # hour angle [deg]
+        self.h = 15 * ((longitude - LSM) * 4 / 60 + (time - 12 - 0.5 + self.eqt / 60))
+        self.hai = np.round(np.sin(np.deg2rad(latitude)), 4) * np.round(np.sin(np.deg2rad(self.decl)), 4) + np.round(
+            np.cos(np.deg2rad(latitude)), 4) * np.round(np.cos(np.deg2rad(self.decl)) * np.cos(np.deg2rad(self.h)), 4)
+
+        # calculating DHI from GHI and DNI
+        self.dhi = ghi - self.dni * self.hai
+        self.dhi[self.dhi < 0] = 0
+
+        self.sel = np.degrees(np.arcsin(self.hai))  # sel=solar elevation angle [deg]
+        self.zenith = np.arccos(self.hai)  # Zen=solar zenith angle [radians!!]
+
+        # determination of bin with eps
+        s_bin = np.ones(len(time))  # bin 1 is overcast sky , bin 8 is clear sky
+
+        # eps calculation had devide by zero which created runtime warnings. Code below is solution for
+        # eps = ((DHI + self.dni) / DHI + KAPPA * Zen ** 3) / (1 + KAPPA * Zen ** 3)
+        eps_numerator = np.divide((self.dhi + self.dni), self.dhi, out=np.zeros_like(self.dhi), where=self.dhi!=0) + KAPPA * self.zenith ** 3
+        eps_nominator = 1 + KAPPA * self.zenith ** 3
+        eps = np.divide(eps_numerator, eps_nominator, out=np.zeros_like(eps_nominator), where=eps_numerator!=0)
+
+        s_bin[np.logical_and(eps >= 1.065, eps < 1.23)] = 2
+        s_bin[np.logical_and(eps >= 1.23, eps < 1.5)] = 3
+        s_bin[np.logical_and(eps >= 1.5, eps < 1.95)] = 4
+        s_bin[np.logical_and(eps >= 1.95, eps < 2.8)] = 5
+        s_bin[np.logical_and(eps >= 2.8, eps < 4.5)] = 6
+        s_bin[np.logical_and(eps >= 4.5, eps < 6.2)] = 7
+        s_bin[(eps >= 6.2)] = 8
+        self.sky_bin = s_bin.astype(int)
+
+        # calculation of relative air mass
+        self.air_mass = 1 / self.hai
+        self.air_mass[self.sel < 2] = 20
+
+        etr = IO * (1 + 0.033 * np.cos(np.deg2rad(2 * np.pi * doy)) / 365)  # [deg]
+
+        delta = (self.dhi * self.air_mass) / etr
+
+        self.f1 = F11[self.sky_bin - 1] + delta * F12[self.sky_bin - 1] + self.zenith * F13[self.sky_bin - 1]
+        self.f1[self.f1 < 0] = 0
+        self.f2 = F21[self.sky_bin - 1] + delta * F22[self.sky_bin - 1] + self.zenith * F23[self.sky_bin - 1]
+
+        # hourly coefficients of the cos angle of incidence, the orientation is filled in by the Simulator:
+        # cai = inc_a*cos(beta) - inc_b*sin(beta)*cos(gamma) + inc_c*cos(beta) + inc_d*sin(beta)*cos(gamma) + inc_e*sin(beta)*sin(gamma)
+        sin_decl = np.sin(np.deg2rad(self.decl))
+        cos_decl = np.cos(np.deg2rad(self.decl))
+        self.inc_a = sin_decl * np.sin(np.deg2rad(latitude))
+        self.inc_b = sin_decl * np.cos(np.deg2rad(latitude))
+        self.inc_c = (cos_decl * np.cos(np.deg2rad(self.h))) * np.cos(np.deg2rad(latitude))
+        self.inc_d = (cos_decl * np.cos(np.deg2rad(self.h))) * np.sin(np.deg2rad(latitude))
+        self.inc_e = cos_decl * np.sin(np.deg2rad(self.h))
+
+        # cos of the zenith angle used in the Perez transposition
+        self.cos_zenith = np.cos(self.zenith)
+        self.cos_zenith[self.cos_zenith < 0.087] = 0.087
+
+        # isotropic diffuse part and the sum used for ground reflection
+        self.dhi_isotropic = self.dhi * (1 - self.f1)
+        self.dhi_dni = self.dhi + self.dni
+
+    @classmethod
+    def for_site(cls, name, year, latitude, longitude, doy, time, ghi, dni):
+        """
+        Returns the geometry for a station-year and position, reusing an earlier one when available.
+        """
+        key = (name, str(year), float(latitude), float(longitude))
+        geometry = _geometry_cache.get(key)
+        if geometry is None:
+            geometry = cls(latitude, longitude, doy, time, ghi, dni)
+            _geometry_cache[key] = geometry
+            if len(_geometry_cache) > MAX_CACHED_SITES:
+                _geometry_cache.popitem(last=False)
+        else:
+            _geometry_cache.move_to_end(key)
+        return geometry
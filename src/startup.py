@@ -0,0 +1,93 @@
+"""
+Fast start of the tool.
+
+Every numba kernel is compiled with cache=True: the first run compiles it and stores the machine
+code in __pycache__, later runs only load it from there. warm_up loads (or compiles) the kernels of
+a simulation and a training on a tiny input, so the first real result does not wait for them;
+start_warm_up does this in a background thread while the GUI starts. The --profile-startup flag of
+simtool_cli.py prints the import, kernel and first result times measured here.
+
+numba only checks the source file of a cached kernel itself, so a kernel and the kernels it calls
+are kept in one file (the storage kernels are in evaluator.py): changing a file compiles the
+kernels of that file again.
+"""
+
+import importlib
+import sys
+import threading
+import time
+
+# modules a simulation or training needs, in import order
+IMPORTS = ('numpy', 'numba', 'location', 'windturbine', 'simulator', 'costcalculator', 'evaluator', 'train')
+
+
+def time_imports(modules=IMPORTS):
+    """[(name, seconds)] of importing every module, a module that is already imported takes no time"""
+    times = []
+    for name in modules:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        times.append((f'import {name}', time.perf_counter() - start))
+    return times
+
+
+def kernel_source(kernel):
+    """'cache' when the kernel was loaded from the numba cache, 'compiled' otherwise"""
+    return 'cache' if sum(kernel.stats.cache_hits.values()) else 'compiled'
+
+
+def warm_up(location='volkel', year='2018', turbine_type='3MW'):
+    """
+    Load or compile the kernels with the argument types of a real simulation and training.
+    Must run in the source directory (the data paths are relative). Returns [(name, seconds)].
+    """
+    import numpy as np
+    import costcalculator
+    import evaluator
+    import plotting
+    from location import Location
+    from simulator import Simulator
+    from windturbine import Windturbine
+
+    times = []
+    start = time.perf_counter()
+    turbine = Windturbine(turbine_type)
+    simulator = Simulator(Location(location), year, turbine)
+    calculator = costcalculator.CostCalculator(160, 400, 6000, 1000000, 1070, 400, True, windturbine=turbine)
+    population_evaluator = evaluator.PopulationEvaluator(simulator, calculator, 4, 100, 16)
+    population_evaluator.weather()
+    times.append(('load weather', time.perf_counter() - start))
+
+    population = np.zeros((1, 13))
+    storage_trace = plotting.compiled_storage_trace()
+    power = np.full(simulator.dni.shape[0], 2.0 * calculator.target_kw)
+    kernels = ((evaluator.evaluate_population, lambda: population_evaluator.evaluate(population)),
+               (evaluator.evaluate_objectives, lambda: population_evaluator.evaluate_objectives(population)),
+               (evaluator.get_storage_fast, lambda: calculator.get_stats(power, 0, 0)),
+               (storage_trace, lambda: storage_trace(power - calculator.target_kw, 1.0)))
+    for kernel, run in kernels:
+        start = time.perf_counter()
+        run()
+        times.append((f'kernel {kernel.__name__} ({kernel_source(kernel)})', time.perf_counter() - start))
+    return times
+
+
+def start_warm_up(**kwargs):
+    """Run warm_up in a daemon thread, numba makes a caller wait until a kernel being compiled is done."""
+    thread = threading.Thread(target=warm_up, kwargs=kwargs, daemon=True)
+    thread.start()
+    return thread
+
+
+def format_profile(times, total):
+    lines = ['startup profile']
+    lines += [f'  {name:<50} {seconds:8.3f} s' for name, seconds in times]
+    lines.append(f'  {"total":<50} {total:8.3f} s')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    times = time_imports()
+    times += warm_up()
+    print(format_profile(times, time.perf_counter() - start), file=sys.stderr)
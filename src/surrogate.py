@@ -0,0 +1,159 @@
+"""
+Surrogate model for pre-screening a population.
+
+A cubic radial basis function (with a linear tail) is fitted on the genomes that were
+evaluated exactly so far. It ranks a new generation, after which only the most promising
+fraction is simulated. The model is fitted on the logarithm of the cost because the
+shortage price makes the cost span many orders of magnitude.
+"""
+
+import numpy as np
+
+MAX_SAMPLES = 1000  # most recent exact evaluations the model is fitted on
+MIN_SAMPLES = 50  # exact evaluations needed before the model is used
+REGULARIZATION = 1e-8
+
+
+class RBFSurrogate():
+    """Cubic radial basis function interpolation of the cost, on genomes scaled by lowest and highest."""
+    def __init__(self, lowest, highest, max_samples=MAX_SAMPLES):
+        self.offset = np.asarray(lowest, dtype=np.float64)
+        scale = np.asarray(highest, dtype=np.float64) - self.offset
+        self.scale = np.where(scale > 0, scale, 1)
+        self.max_samples = max_samples
+        self.genomes = np.empty((0, self.offset.shape[0]))
+        self.costs = np.empty(0)
+        self.weights = None
+
+    def add(self, genomes, costs):
+        self.genomes = np.concatenate((self.genomes, genomes))[-self.max_samples:]
+        self.costs = np.concatenate((self.costs, costs))[-self.max_samples:]
+        self.weights = None
+
+    def _scaled(self, genomes):
+        return (genomes - self.offset) / self.scale
+
+    def _basis(self, x, centers):
+        distance = np.sqrt(np.sum((x[:, None, :] - centers[None, :, :]) ** 2, axis=2))
+        return np.concatenate((distance ** 3, np.ones((x.shape[0], 1)), x), axis=1)
+
+    def fit(self):
+        centers = self._scaled(self.genomes)
+        n_samples, n_features = centers.shape
+        target = np.log1p(np.maximum(self.costs, 0))
+
+        # interpolation system with the side conditions of the linear tail
+        tail = np.concatenate((np.ones((n_samples, 1)), centers), axis=1)
+        system = np.zeros((n_samples + n_features + 1, n_samples + n_features + 1))
+        system[:n_samples] = self._basis(centers, centers)
+        system[:n_samples, :n_samples] += REGULARIZATION * np.eye(n_samples)
+        system[n_samples:, :n_samples] = tail.T
+        right = np.concatenate((target, np.zeros(n_features + 1)))
+        try:
+            self.weights = np.linalg.solve(system, right)
+        except np.linalg.LinAlgError:
+            self.weights = np.linalg.lstsq(system, right, rcond=None)[0]
+        self.centers = centers
+
+    def predict(self, genomes):
+        if self.weights is None:
+            self.fit()
+        return np.expm1(self._basis(self._scaled(genomes), self.centers) @ self.weights)
+
+
+class SurrogateScreening():
+    """
+    Evaluates a population with the surrogate as pre-screening. The fraction of the population with
+    the lowest predicted cost (and the rows the optimizer kept from the previous population) is evaluated exactly,
+    the other rows get max(predicted cost, highest exact cost of the generation) so they never rank
+    above an exactly evaluated configuration. With audit, the whole population is also evaluated
+    exactly to measure the regret of the screening.
+    """
+    def __init__(self, lowest, highest, fraction, audit=False, min_samples=MIN_SAMPLES):
+        self.model = RBFSurrogate(lowest, highest)
+        self.fraction = fraction
+        self.audit = audit
+        self.min_samples = min_samples
+
+        # accounting of the last generation and of the whole run
+        self.exact = 0
+        self.saved = 0
+        self.regret = 0
+        self.total_exact = 0
+        self.total_saved = 0
+
+    def evaluate(self, group_values, evaluate_exact, kept=()):
+        """
+        evaluate_exact is called with the rows to simulate and returns their cost (None when cancelled),
+        kept holds the rows that are always evaluated exactly
+        """
+        population = group_values.shape[0]
+        if self.model.costs.shape[0] < self.min_samples:
+            selected = np.arange(population)
+        else:
+            predicted = self.model.predict(group_values)
+            n_selected = max(1, int(np.ceil(self.fraction * population)))
+            selected = np.union1d(predicted.argsort()[:n_selected], np.asarray(kept, dtype=int))
+
+        exact_costs = evaluate_exact(group_values[selected])
+        if exact_costs is None:
+            return None
+        self.model.add(group_values[selected], exact_costs)
+
+        if selected.shape[0] == population:
+            cost_array = exact_costs
+        else:
+            cost_array = np.maximum(predicted, np.max(exact_costs))
+            cost_array[selected] = exact_costs
+
+        self.exact = selected.shape[0]
+        self.saved = population - self.exact
+        self.total_exact += self.exact
+        self.total_saved += self.saved
+
+        # relative difference between the best of the screened and the best of the full population
+        if self.audit and self.saved:
+            all_costs = evaluate_exact(group_values)
+            if all_costs is None:
+                return None
+            self.regret = float((np.min(exact_costs) - np.min(all_costs)) / abs(np.min(all_costs)))
+        return cost_array
+
+    def info(self):
+        info = {'exact_evaluations': self.exact, 'saved_evaluations': self.saved}
+        if self.audit:
+            info['regret'] = self.regret
+        return info
+
+    def state(self):
+        return self.model.genomes, self.model.costs
+
+    def restore(self, genomes, costs):
+        self.model.genomes = np.empty((0, self.model.offset.shape[0]))
+        self.model.costs = np.empty(0)
+        self.model.add(genomes, costs)
+
+
+# compare a screened training run with a full run
+if __name__ == '__main__':
+    from train import Trainer
+    import time
+
+    parameters = {'generations': 30, 'group_size': 300, 'n_configs': 4, 'surface_min': 0, 'surface_max': 1000000,
+                  'angle_min': 0, 'angle_max': 90, 'orientation_min': -90, 'orientation_max': 90, 'sp_eff': 16,
+                  'mutation_percentage': 50, 'turbines_min': 0, 'turbines_max': 7, 'turbine_height': 100,
+                  'turbine_type': '3MW', 'solar_price': 160, 'storage_price': 400, 'demand': 6000,
+                  'shortage_price': 10000000, 'turbine_price': 1070, 'surplus_price': 400, 'train_by_price': True,
+                  'location': 'volkel', 'year': '2018', 'latitude': None, 'longitude': None, 'terrain_factor': None}
+
+    results = {}
+    for fraction in [None, 0.3]:
+        np.random.seed(0)
+        trainer = Trainer(None, surrogate_fraction=fraction, **parameters)
+        start = time.time()
+        best = trainer.train()
+        cost = trainer.evaluator.evaluate(best[:1])[0]
+        results[fraction] = cost
+        exact = trainer.surrogate.total_exact if trainer.surrogate else parameters['generations'] * parameters['group_size']
+        print(f'fraction {fraction}: best cost {cost:.6g}, {exact} exact evaluations, {time.time() - start:.1f} s')
+    print(f'regret of the screened run: {(results[0.3] - results[None]) / results[None]:.3%}')
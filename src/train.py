@@ -1,9 +1,20 @@
 import numpy as np
+import time
+import os
 from costcalculator import CostCalculator
 from genetic_algorithm import GeneticAlgorithm
 from windturbine import Windturbine
 from simulator import Simulator
 from location import Location
+from evaluator import PopulationEvaluator, PoolEvaluator
+from fitnesscache import FitnessCache, CACHE_SIZE, AREA_RESOLUTION, ANGLE_RESOLUTION, fingerprint
+import islands
+import checkpoint
+from surrogate import SurrogateScreening
+import optimizers
+import pareto as pareto_training
+
+ALL_GENERATIONS_DONE = 'all generations done'  # stop reason of a training that was not stopped early
 
 class Trainer():
     """
@@ -14,7 +25,20 @@ class Trainer():
                  orientation_max, sp_eff, mutation_percentage, turbines_min, turbines_max, 
                  turbine_height, turbine_type, solar_price, storage_price, demand, 
                  shortage_price, turbine_price, surplus_price, train_by_price,
-                 location, year, latitude, longitude, terrain_factor) :
+                 location, year, latitude, longitude, terrain_factor, workers=None,
+                 cache_size=CACHE_SIZE, cache_file=None, area_resolution=AREA_RESOLUTION,
+                 angle_resolution=ANGLE_RESOLUTION, n_islands=1,
+                 migration_interval=islands.MIGRATION_INTERVAL, n_migrants=islands.N_MIGRANTS,
+                 patience=None, tolerance=0, min_diversity=None, time_budget=None,
+                 checkpoint_file=None, checkpoint_interval=checkpoint.CHECKPOINT_INTERVAL, resume=False,
+                 surrogate_fraction=None, surrogate_audit=False, optimize_turbines=False, optimizer='GA',
+                 pareto=False, years=None, year_aggregate='mean', year_percentile=90) :
+        # arguments to build the trainers of the islands with
+        self.parameters = {name: value for name, value in locals().items() if name not in ('self', 'parent')}
+        if n_islands > 1:
+            islands.check_parameters(self.parameters)
+        if pareto:
+            pareto_training.check_parameters(self.parameters)
         self.parent = parent
         self.generations = generations
         self.group_size = group_size
@@ -31,14 +55,80 @@ class Trainer():
         self.sp_eff = sp_eff
         self.turbine_type = turbine_type
         self.simulator = Simulator(Location(location), year, Windturbine(self.turbine_type), latitude=latitude, longitude=longitude, terrain_factor=terrain_factor)
+        # robust training: evaluate on several weather years ('all' for every year of the location)
+        # and combine the costs with year_aggregate ('mean', 'max' or 'percentile' with year_percentile)
+        if years == 'all':
+            years = Location(location).get_years()
+        self.years = [str(evaluation_year) for evaluation_year in years] if years is not None else [str(year)]
+        simulators = [self.simulator if evaluation_year == str(year) else
+                      Simulator(Location(location), evaluation_year, Windturbine(self.turbine_type), latitude=latitude,
+                                longitude=longitude, terrain_factor=terrain_factor)
+                      for evaluation_year in self.years]
         self.cost_calculator = CostCalculator(solar_price, storage_price, demand, 
                                               shortage_price, turbine_price, 
                                               surplus_price, train_by_price=train_by_price, 
                                               windturbine=Windturbine(self.turbine_type))
+        # with optimize_turbines the evaluator picks the cheapest number of turbines for every configuration
+        self.optimize_turbines = optimize_turbines
+        turbines_range = (turbines_min, turbines_max) if optimize_turbines else None
+        if workers:
+            # evaluate the population on a pool of worker processes
+            self.evaluator = PoolEvaluator(self.simulator,
+                                           (location, year, self.turbine_type, latitude, longitude, terrain_factor),
+                                           (solar_price, storage_price, demand, shortage_price, turbine_price,
+                                            surplus_price, train_by_price),
+                                           n_configs, self.turbine_height, self.sp_eff, workers,
+                                           turbines_range=turbines_range, simulators=simulators,
+                                           aggregate=year_aggregate, percentile=year_percentile)
+        else:
+            self.evaluator = PopulationEvaluator(self.simulator, self.cost_calculator, n_configs,
+                                                 self.turbine_height, self.sp_eff, turbines_range=turbines_range,
+                                                 simulators=simulators, aggregate=year_aggregate,
+                                                 percentile=year_percentile)
+        # costs of earlier evaluated genomes, shared by all generations (and runs when cache_file is given),
+        # genomes within area_resolution (m^2) and angle_resolution (degrees) share one cost
+        robust = {'years': self.years, 'year_aggregate': year_aggregate,
+                  'year_percentile': year_percentile} if years is not None else {}
+        inputs = fingerprint(n_configs=n_configs, sp_eff=sp_eff, turbine_height=turbine_height,
+                             turbine_type=turbine_type, solar_price=solar_price, storage_price=storage_price,
+                             demand=demand, shortage_price=shortage_price, turbine_price=turbine_price,
+                             surplus_price=surplus_price, train_by_price=train_by_price, location=location,
+                             year=year, latitude=latitude, longitude=longitude, terrain_factor=terrain_factor,
+                             **robust)
+        self.fitness_cache = FitnessCache(n_configs, max_size=cache_size, area_resolution=area_resolution,
+                                          angle_resolution=angle_resolution, path=cache_file, fingerprint=inputs)
         self.genetic_algorithm = GeneticAlgorithm(mutation_percentage, 150, 6, 2, 2, True )
+        # name of the optimizer used by train, see optimizers.OPTIMIZERS
+        self.optimizer_name = optimizer
+        self.optimizer = None
+        # train the Pareto front of investment, storage and shortage (NSGA-II) instead of a single cost
+        self.pareto = pareto
+        self.pareto_front = None
+        self.n_islands = n_islands
+        self.migration_interval = migration_interval
+        self.n_migrants = n_migrants
+        # early stopping: generations without relative improvement beyond tolerance,
+        # minimal population diversity and wall clock budget in seconds (None = not used)
+        self.patience = patience
+        self.tolerance = tolerance
+        self.min_diversity = min_diversity
+        self.time_budget = time_budget
+        self.stop_reason = None
+        # checkpoint written every checkpoint_interval generations and when stopped, resume continues from it
+        self.checkpoint_file = checkpoint_file
+        self.checkpoint_interval = checkpoint_interval
+        self.resume = resume
+        # only evaluate the surrogate_fraction of every generation the surrogate model ranks best
+        if surrogate_fraction:
+            lowest_allowed, highest_allowed = self.limits(np.zeros((1, self.n_solar_features + 1)))
+            self.surrogate = SurrogateScreening(lowest_allowed[0], highest_allowed[0], surrogate_fraction,
+                                                audit=surrogate_audit)
+        else:
+            self.surrogate = None
         self.stopped = False
+        self._result = None  # (genome, result) of the last call of result
 
-    def train(self):
+    def random_population(self):
         solar_values = np.random.rand(self.group_size, self.n_solar_features)
         solar_values[:, 0::3] *= (self.surface_max - self.surface_min)
         solar_values[:, 0::3] += self.surface_min
@@ -50,8 +140,10 @@ class Trainer():
         wind_values *= self.turbines_max
         wind_values += self.turbines_min
         group_values = np.concatenate((solar_values, wind_values), axis=1)  # concatenate on features
+        return group_values
 
-        # prepare min and max arrays to truncate values later
+    def limits(self, group_values):
+        """min and max arrays to truncate the values of a population"""
         highest_allowed = np.zeros_like(group_values)
         lowest_allowed = np.zeros_like(group_values)
         highest_allowed[:, 0:self.n_solar_features:3] = self.surface_max
@@ -62,54 +154,172 @@ class Trainer():
         lowest_allowed[:, 2:self.n_solar_features:3] = self.orientation_min
         highest_allowed[:, -1] = self.turbines_max
         lowest_allowed[:, -1] = self.turbines_min
+        return lowest_allowed, highest_allowed
+
+    def train(self):
+        if self.n_islands > 1:
+            return islands.train_islands(self)
+        if self.pareto:
+            return pareto_training.train_pareto(self)
 
+        group_values = self.random_population()
+        lowest_allowed, highest_allowed = self.limits(group_values)
+        self.optimizer = optimizers.create(self.optimizer_name, self.genetic_algorithm, group_values,
+                                           lowest_allowed[0], highest_allowed[0])
 
-        last_generation = self.generations - 1
+        first_generation = 0
         best_gen = 0
         cost_temp = 1e20
+        stalled = 0
+        start = time.perf_counter()
+        state = None
 
-        for generation in range(self.generations):
+        if self.resume and self.checkpoint_file and os.path.exists(self.checkpoint_file):
+            saved = checkpoint.load(self.checkpoint_file, self.parameters)
+            # state stays None: the file already holds this generation, a stop before the next one keeps it
+            np.random.set_state(saved['random_state'])
+            self.fitness_cache.restore(saved['cache_keys'], saved['cache_costs'])
+            if self.surrogate and 'surrogate_genomes' in saved:
+                self.surrogate.restore(saved['surrogate_genomes'], saved['surrogate_costs'])
+            first_generation = saved['generation'] + 1
+            best_gen = saved['best_gen']
+            cost_temp = saved['cost_temp']
+            stalled = saved['stalled']
+            start -= saved['elapsed']
+            self.optimizer.load_state_dict({name[len('optimizer_'):]: value for name, value in saved.items()
+                                            if name.startswith('optimizer_')})
+            self.optimizer.tell(saved['group_values'], saved['cost_array'])
 
-            cost_array = np.zeros(self.group_size)
+        group_values = self.optimizer.ask()
 
-            for i in range(self.group_size):
-                current_row = group_values[i]
-                n_turbines = int(current_row[-1])
+        for generation in range(first_generation, self.generations):
 
-                # run simulator
-                energy_production,_= self.simulator.calc_total_power(current_row[:self.n_solar_features],
-                                                                list([n_turbines, self.turbine_height]),
-                                                                self.sp_eff)
-                # run cost calculator
-                sp_sm = np.sum(current_row[0:self.n_solar_features:3])
-                cost_array[i] = self.cost_calculator.calculate_cost(energy_production, sp_sm, n_turbines)
+            # run simulator and cost calculator for the whole population at once
+            cost_array = self.evaluate(group_values)
 
-                #quit when gui calls stop
-                if self.stopped:
-                    break
             #quit when gui calls stop
             if self.stopped:
+                self.stop_reason = 'stopped'
+                self.evaluator.close()
+                self.fitness_cache.save()
+                # keep the last finished generation
+                if self.checkpoint_file and state is not None:
+                    self.save_checkpoint(state)
                 break
             best = self.genetic_algorithm.get_best(group_values, cost_array)
-            
+
+            # count the generations without improvement of the best cost
+            if np.min(cost_array) < cost_temp - self.tolerance * abs(cost_temp):
+                stalled = 0
+            else:
+                stalled += 1
+
             if np.min(cost_array) < cost_temp:
                 cost_temp = np.min(cost_array)
                 best_gen = best
 
             if self.parent:
-                event_data = [best_gen[0],generation]
+                event_data = [best_gen[0],generation,self.info()]
                 self.parent.gendone(event_data)
 
+            # everything needed to continue after this generation
+            state = {'generation': generation, 'group_values': group_values, 'cost_array': cost_array,
+                     'best_gen': best_gen, 'cost_temp': cost_temp, 'stalled': stalled,
+                     'elapsed': time.perf_counter() - start, 'random_state': np.random.get_state(),
+                     'optimizer': {name: np.copy(value) for name, value in self.optimizer.state_dict().items()}}
+            if self.checkpoint_file:
+                # the cache and surrogate after this generation, a stop during the next generation
+                # must not write the evaluations of that generation into the checkpoint
+                state['cache'] = self.fitness_cache.state()
+                if self.surrogate is not None:
+                    state['surrogate'] = tuple(np.copy(value) for value in self.surrogate.state())
+
             # quit when done
-            if generation == last_generation:
+            self.stop_reason = self.check_stop(generation, stalled, group_values, cost_array, start)
+            if self.stop_reason:
+                self.evaluator.close()
+                self.fitness_cache.save()
+                if self.checkpoint_file:
+                    self.save_checkpoint(state)
                 if self.parent:
-                    self.parent.traindone(None)
+                    self.parent.traindone(self.stop_reason)
                 return best_gen
-            # run genetic algorithm
-            group_values = self.genetic_algorithm.generate_new_population(group_values, cost_array)
-            # remove illegal values
-            group_values = np.minimum(group_values, highest_allowed)
-            group_values = np.maximum(group_values, lowest_allowed)
+
+            if self.checkpoint_file and (generation + 1) % self.checkpoint_interval == 0:
+                self.save_checkpoint(state)
+
+            self.optimizer.tell(group_values, cost_array)
+            group_values = self.optimizer.ask()
+
+    def evaluate(self, group_values):
+        """Cost of every configuration in the population, None when the evaluation was cancelled."""
+        if self.optimize_turbines:
+            # the number of turbines is chosen by the evaluator and written into group_values,
+            # the cache and surrogate only know the cost so they are not used
+            return self.evaluator.evaluate(group_values)
+        if self.surrogate is None:
+            return self.fitness_cache.evaluate(group_values, self.evaluator)
+        return self.surrogate.evaluate(group_values, lambda rows: self.fitness_cache.evaluate(rows, self.evaluator),
+                                       kept=self.optimizer.kept_rows())
+
+    def info(self):
+        """Statistics of the last evaluated generation."""
+        info = self.fitness_cache.info()
+        if self.surrogate is not None:
+            info.update(self.surrogate.info())
+        return info
+
+    def result(self, genome):
+        """
+        Hourly power (kW) and energy (kWh) series and the cost statistics of one genome on the simulated year,
+        for showing the best configuration. The result of the last genome is kept, the best genome often stays
+        the same for several generations.
+        """
+        genome = np.asarray(genome)
+        if self._result is not None and np.array_equal(self._result[0], genome):
+            return self._result[1]
+
+        solar_features = genome[:-1]
+        turbines = int(genome[-1])
+        solar_power, solar_energy = self.simulator.calc_solar(Az=solar_features[2::3], Inc=solar_features[1::3],
+                                                              sp_area=solar_features[0::3], sp_eff=self.sp_eff)
+        wind_power, wind_energy = self.simulator.calc_wind([turbines, self.turbine_height])
+        total_power = solar_power + wind_power
+        result = {'solar_power': solar_power, 'solar_energy': solar_energy,
+                  'wind_power': wind_power, 'wind_energy': wind_energy,
+                  'total_power': total_power, 'total_energy': solar_energy + wind_energy,
+                  'demand': np.full(len(total_power), self.cost_calculator.target_kw),
+                  'stats': self.cost_calculator.get_stats(total_power, np.sum(solar_features[0::3]), turbines)}
+        self._result = (genome.copy(), result)
+        return result
+
+    def save_checkpoint(self, state):
+        cache_keys, cache_costs = state['cache']
+        arrays = {f'optimizer_{name}': value for name, value in state['optimizer'].items()}
+        if self.surrogate is not None:
+            arrays['surrogate_genomes'], arrays['surrogate_costs'] = state['surrogate']
+        checkpoint.save(self.checkpoint_file, self.parameters, state['generation'], state['group_values'],
+                        state['cost_array'], state['best_gen'], state['cost_temp'], state['stalled'],
+                        state['elapsed'], state['random_state'], cache_keys, cache_costs, **arrays)
+
+    def check_stop(self, generation, stalled, group_values, cost_array, start):
+        """Returns the reason to stop the training after this generation, None to continue."""
+        if generation == self.generations - 1:
+            return ALL_GENERATIONS_DONE
+        if self.patience and stalled >= self.patience:
+            return f'no improvement for {stalled} generations'
+        if self.min_diversity is not None:
+            diversity = self.genetic_algorithm.diversity(group_values, cost_array)
+            if diversity < self.min_diversity:
+                return f'population diversity {diversity:.3g} below {self.min_diversity}'
+        if self.time_budget is not None and time.perf_counter() - start >= self.time_budget:
+            return f'time budget of {self.time_budget} s used'
+        return None
+
+    def stop(self):
+        """Stop the training, also cancels a running evaluation."""
+        self.stopped = True
+        self.evaluator.cancel()
 
 if __name__ == '__main__':
     class parent():
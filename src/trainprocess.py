@@ -0,0 +1,90 @@
+"""
+Training in a separate process.
+
+A Trainer in a thread of the GUI process holds the GIL during the Python parts of a generation
+(selection, mating, the fitness cache), which makes the window slow to respond. TrainProcess runs
+the Trainer in its own process: the GUI only polls a queue for the progress and stopping
+terminates the process at once. The process is started with spawn, forking a GUI process with
+running threads (wx, the numba warm-up) is not safe. Thanks to the numba cache the kernels are
+loaded, not compiled, in the new process.
+"""
+
+import multiprocessing
+import queue
+
+
+class QueueParent():
+    """
+    Parent of the Trainer in the training process, sends the progress over messages.
+    Like TrainWorker only the latest generation is kept until the GUI asks for the next one
+    (ready), so a slow GUI does not fill the queue with results.
+    """
+    def __init__(self, messages, ready):
+        self.messages = messages
+        self.ready = ready
+        self.trainer = None
+        self.pending = None
+
+    def gendone(self, data):
+        genome, generation, info = data
+        self.pending = (genome.astype(int), generation, info)
+        if self.ready.is_set():
+            self.send()
+
+    def send(self):
+        """Send the pending generation with the results of its best configuration"""
+        config, generation, info = self.pending
+        self.pending = None
+        self.ready.clear()
+        self.messages.put(('gendone', (config, generation, info, self.trainer.result(config))))
+
+    def traindone(self, reason):
+        # the GUI always gets the last generation
+        if self.pending is not None:
+            self.send()
+        self.messages.put(('traindone', reason))
+
+
+def run_training(parameters, messages, ready):
+    """Train with parameters (the arguments of Trainer), runs in its own process."""
+    from train import Trainer
+
+    parent = QueueParent(messages, ready)
+    parent.trainer = Trainer(parent, **parameters)
+    parent.trainer.train()
+
+
+class TrainProcess():
+    """Trainer in its own process, poll returns the messages of the training."""
+    def __init__(self, parameters):
+        context = multiprocessing.get_context('spawn')
+        self.messages = context.Queue()
+        self.ready = context.Event()
+        self.ready.set()
+        self.process = context.Process(target=run_training, args=(parameters, self.messages, self.ready),
+                                       daemon=True)
+
+    def start(self):
+        self.process.start()
+
+    def poll(self):
+        """[(kind, data)] received since the last poll, kind is 'gendone' or 'traindone'"""
+        received = []
+        while True:
+            try:
+                received.append(self.messages.get_nowait())
+            except queue.Empty:
+                return received
+
+    def next(self):
+        """Ask for the results of the next generation"""
+        self.ready.set()
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def stop(self):
+        """Stop the training immediately, the current generation is lost."""
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
@@ -0,0 +1,87 @@
+"""
+Binary store for the weather data.
+
+Parsing the csv files is slow, so every station-year can be converted once into a
+typed numpy file next to the csv (Data/<STATION>/<year>.npy). The Simulator loads
+these files memory mapped and only falls back to the csv when no converted file exists.
+
+Convert all stations with:
+    python weatherstore.py
+"""
+
+import numpy as np
+import os
+from yearcalendar import decode_dates
+
+# Measurements are stored as float32 so missing values (NaN) survive the conversion.
+# DNI is a derived column that contains values outside of the float32 range, so it stays float64.
+WEATHER_DTYPE = np.dtype([('FH', '<f4'),
+                          ('T', '<f4'),
+                          ('Q', '<f4'),
+                          ('DNI', '<f8'),
+                          ('HH', '<i2'),
+                          ('DOY', '<i2')])
+
+
+def csv_path(station, year):
+    return f'Data{os.sep}{station.upper()}{os.sep}{year}.csv'
+
+
+def store_path(station, year):
+    return f'Data{os.sep}{station.upper()}{os.sep}{year}.npy'
+
+
+def read_csv(station, year):
+    """Parse a weather csv into a structured array with WEATHER_DTYPE."""
+    import pandas as pd
+
+    import_data = pd.read_csv(csv_path(station, year), index_col=0)
+
+    weather = np.empty(len(import_data), dtype=WEATHER_DTYPE)
+    weather['FH'] = import_data.FH.values
+    weather['T'] = import_data['T'].values
+    weather['Q'] = import_data.Q.values
+    weather['DNI'] = import_data.DNI.values
+    weather['HH'] = import_data.HH.values
+    weather['DOY'], _ = decode_dates(import_data.YYYYMMDD.values)
+
+    return weather
+
+
+def convert(station, year):
+    """Convert a single station-year csv into the binary store."""
+    weather = read_csv(station, year)
+    np.save(store_path(station, year), weather)
+    return weather
+
+
+def convert_all():
+    """Convert the csv files of every station in locations.csv."""
+    import pandas as pd
+
+    stations = pd.read_csv(f'Data{os.sep}locations.csv', index_col=0, header=0).NAME.values
+    converted = 0
+    for station in stations:
+        for file_name in sorted(os.listdir(f'Data{os.sep}{station}')):
+            year, extension = os.path.splitext(file_name)
+            if extension == '.csv':
+                convert(station, year)
+                converted += 1
+    return converted
+
+
+def load(station, year):
+    """
+    Load the weather of a station-year.
+    Uses the binary store (memory mapped, no copy) when it is present and up to date,
+    otherwise the csv is parsed.
+    """
+    binary = store_path(station, year)
+    text = csv_path(station, year)
+    if os.path.exists(binary) and (not os.path.exists(text) or os.path.getmtime(binary) >= os.path.getmtime(text)):
+        return np.load(binary, mmap_mode='r')
+    return read_csv(station, year)
+
+
+if __name__ == '__main__':
+    print(f'Converted {convert_all()} files')
@@ -1,13 +1,56 @@
 import numpy as np
-import pandas as pd
 import os
 
+class PowerCurve():
+    """
+    Linear interpolation of a turbine power curve for arrays of wind speeds.
+    The curve is sorted once, every lookup is a binary search (O(log M) per wind speed).
+    Below the cut-in speed, from the cut-out speed on and beyond the end of the curve no power is produced.
+    """
+    def __init__(self, wind_curve, power_curve):
+        order = np.argsort(wind_curve, kind='stable')
+        self.wind = np.asarray(wind_curve, dtype=np.float64)[order]
+        self.power = np.asarray(power_curve, dtype=np.float64)[order]
+
+        # slope of every segment, vertical steps (equal wind speeds) get no slope
+        d_wind = np.diff(self.wind)
+        self.slope = np.divide(np.diff(self.power), d_wind, out=np.zeros_like(d_wind), where=d_wind > 0)
+
+        producing = np.flatnonzero(self.power > 0)
+        if producing.size == 0:
+            self.cut_in = np.inf
+            self.cut_out = np.inf
+        else:
+            # last wind speed without power before the turbine starts producing
+            self.cut_in = self.wind[max(producing[0] - 1, 0)]
+            # first wind speed without power after the turbine stopped producing
+            self.cut_out = self.wind[producing[-1] + 1] if producing[-1] + 1 < self.wind.shape[0] else np.inf
+
+    def __call__(self, wind_speeds):
+        wind_speeds = np.asarray(wind_speeds, dtype=np.float64)
+
+        # index of the segment every wind speed falls in
+        index = np.searchsorted(self.wind, wind_speeds, side='right') - 1
+        np.clip(index, 0, self.slope.shape[0] - 1, out=index)
+
+        power = self.power[index] + (wind_speeds - self.wind[index]) * self.slope[index]
+        power[(wind_speeds < self.cut_in) | (wind_speeds >= self.cut_out) | (wind_speeds > self.wind[-1])] = 0
+
+        return power
+
 class Windturbine():
     def __init__(self, wt_number='5'):
-        self.turbine_properties = pd.read_csv(f'config{os.sep}turbines{os.sep}{wt_number}.csv', index_col=0)
-        self.power_curve = self.turbine_properties.power.values
-        self.wind_curve = self.turbine_properties.wind.values
+        self.name = wt_number
+        # columns index, power, wind (numpy instead of pandas, for a fast start)
+        self.turbine_properties = np.loadtxt(f'config{os.sep}turbines{os.sep}{wt_number}.csv', delimiter=',',
+                                             skiprows=1, ndmin=2)
+        self.power_curve = self.turbine_properties[:, 1]
+        self.wind_curve = self.turbine_properties[:, 2]
+        self.curve = PowerCurve(self.wind_curve, self.power_curve)
 
     def get_max_power(self):
         max_power = self.power_curve.max()
-        return max_power
\ No newline at end of file
+        return max_power
+
+    def get_power(self, wind_speeds):
+        return self.curve(wind_speeds)
@@ -0,0 +1,47 @@
+"""
+Vectorized calendar decoding for the hourly weather data.
+"""
+
+import numpy as np
+
+
+def is_leap_year(year):
+    year = np.asarray(year)
+    return (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+
+
+def decode_dates(dates):
+    """
+    Decode an array of dates (YYYY-MM-DD strings or datetime64 values) in one go.
+    Returns the day of year and a leap year flag for every entry.
+    """
+    days = np.asarray(dates).astype('datetime64[D]')
+    years = days.astype('datetime64[Y]')
+    doy = (days - years).astype(np.int16) + 1
+    leap = is_leap_year(years.astype(int) + 1970)
+    return doy, leap
+
+
+class YearCalendar():
+    """
+    Calendar belonging to a year of hourly data.
+    doy = day of year, hour = hour of the day (1-24), leap = leap year flag per hour.
+    """
+    def __init__(self, doy, hour, leap):
+        self.doy = np.asarray(doy)
+        self.hour = np.asarray(hour)
+        self.leap = np.broadcast_to(np.asarray(leap, dtype=bool), self.doy.shape)
+
+        # index of the day every hour belongs to, starting at 0
+        self.day_index = self.doy.astype(np.intp) - self.doy.min()
+        self.hours_per_day = np.bincount(self.day_index)
+        self.n_days = self.hours_per_day.shape[0]
+
+    @classmethod
+    def from_dates(cls, dates, hour):
+        doy, leap = decode_dates(dates)
+        return cls(doy, hour, leap)
+
+    def daily_mean(self, series):
+        """Mean of an hourly series for every day in the calendar."""
+        return np.bincount(self.day_index, weights=series, minlength=self.n_days) / self.hours_per_day
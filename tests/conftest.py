@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC)
+
+
+@pytest.fixture(autouse=True, scope='session')
+def source_dir():
+    """The data and config paths of the simulator are relative to the source directory."""
+    previous = os.getcwd()
+    os.chdir(SRC)
+    yield
+    os.chdir(previous)
@@ -0,0 +1,53 @@
+import numpy as np
+
+import simtool_api
+from train import Trainer
+
+PARAMETERS = dict(simtool_api.TRAIN_DEFAULTS, generations=8, group_size=60, optimizer='CMA-ES',
+                  surrogate_fraction=0.5)
+STOP_AFTER = 4  # generation after which the first training is stopped
+
+
+class Stopper():
+    """Parent that stops the training after generation STOP_AFTER"""
+    def __init__(self):
+        self.trainer = None
+
+    def gendone(self, data):
+        if data[1] == STOP_AFTER:
+            self.trainer.stop()
+
+    def traindone(self, reason):
+        pass
+
+
+def train(parent=None, **options):
+    np.random.seed(3)
+    trainer = Trainer(parent, **dict(PARAMETERS, **options))
+    if parent is not None:
+        parent.trainer = trainer
+    return trainer.train()
+
+
+def test_resumed_training_matches_uninterrupted_training(tmp_path):
+    path = str(tmp_path / 'checkpoint.npz')
+    uninterrupted = train()
+
+    assert train(Stopper(), checkpoint_file=path) is None
+    resumed = train(checkpoint_file=path, resume=True)
+    assert np.array_equal(resumed, uninterrupted)
+
+
+def test_resumed_training_stopped_at_once_keeps_the_checkpoint(tmp_path):
+    path = str(tmp_path / 'checkpoint.npz')
+    uninterrupted = train()
+    train(Stopper(), checkpoint_file=path)
+
+    # stopped during the first generation after the checkpoint
+    np.random.seed(3)
+    trainer = Trainer(None, **dict(PARAMETERS, checkpoint_file=path, resume=True))
+    trainer.stop()
+    assert trainer.train() is None
+    assert trainer.stop_reason == 'stopped'
+
+    assert np.array_equal(train(checkpoint_file=path, resume=True), uninterrupted)
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from costcalculator import CostCalculator
+from evaluator import PopulationEvaluator
+from location import Location
+from simulator import Simulator
+from windturbine import Windturbine
+
+N_CONFIGS = 4
+TURBINE_HEIGHT = 100
+SP_EFF = 16
+TURBINES_MAX = 7
+
+
+@pytest.fixture(scope='module')
+def simulator():
+    return Simulator(Location('volkel'), '2018', Windturbine('3MW'))
+
+
+def calculator(train_by_price=True):
+    return CostCalculator(160, 400, 6000, 1000000, 1070, 400, train_by_price, windturbine=Windturbine('3MW'))
+
+
+def population(size=20, seed=0):
+    """Random genomes of n_configs * (area, angle, orientation) and a whole number of turbines"""
+    rng = np.random.default_rng(seed)
+    genomes = np.empty((size, N_CONFIGS * 3 + 1))
+    genomes[:, 0:-1:3] = rng.uniform(0, 100000, (size, N_CONFIGS))
+    genomes[:, 1:-1:3] = rng.uniform(0, 90, (size, N_CONFIGS))
+    genomes[:, 2:-1:3] = rng.uniform(-90, 90, (size, N_CONFIGS))
+    genomes[:, -1] = rng.integers(0, TURBINES_MAX + 1, size)
+    return genomes
+
+
+def baseline_cost(simulator, cost_calculator, genome):
+    """Cost of one genome the way the training calculated it before the fused evaluator"""
+    n_turbines = int(genome[-1])
+    power, _ = simulator.calc_total_power(genome[:-1], [n_turbines, TURBINE_HEIGHT], SP_EFF)
+    return cost_calculator.calculate_cost(power, np.sum(genome[0:-1:3]), n_turbines)
+
+
+@pytest.mark.parametrize('train_by_price', [True, False])
+def test_fused_evaluator_matches_baseline(simulator, train_by_price):
+    cost_calculator = calculator(train_by_price)
+    genomes = population()
+    evaluator = PopulationEvaluator(simulator, cost_calculator, N_CONFIGS, TURBINE_HEIGHT, SP_EFF)
+    expected = [baseline_cost(simulator, cost_calculator, genome) for genome in genomes]
+    assert np.allclose(evaluator.evaluate(genomes), expected, rtol=1e-9)
+
+
+def test_exhaustive_turbine_count_is_the_cheapest(simulator):
+    cost_calculator = calculator()
+    genomes = population(seed=1)
+    fixed = PopulationEvaluator(simulator, cost_calculator, N_CONFIGS, TURBINE_HEIGHT, SP_EFF)
+    costs = np.empty((TURBINES_MAX + 1, genomes.shape[0]))
+    for n_turbines in range(TURBINES_MAX + 1):
+        genomes[:, -1] = n_turbines
+        costs[n_turbines] = fixed.evaluate(genomes)
+
+    optimized = PopulationEvaluator(simulator, cost_calculator, N_CONFIGS, TURBINE_HEIGHT, SP_EFF,
+                                    turbines_range=(0, TURBINES_MAX))
+    cost = optimized.evaluate(genomes)
+    assert np.array_equal(cost, costs.min(axis=0))
+    # the chosen number of turbines is written into the genomes
+    assert np.array_equal(costs[genomes[:, -1].astype(int), np.arange(genomes.shape[0])], cost)
+
+
+@pytest.mark.parametrize('aggregate, combine', [('mean', np.mean), ('max', np.max),
+                                                ('percentile', lambda costs, axis: np.percentile(costs, 75, axis=axis))])
+def test_years_are_aggregated(simulator, aggregate, combine):
+    cost_calculator = calculator()
+    genomes = population(size=8, seed=2)
+    simulators = [simulator] + [Simulator(Location('volkel'), year, Windturbine('3MW')) for year in ['2016', '2017']]
+    year_costs = np.array([PopulationEvaluator(year_simulator, cost_calculator, N_CONFIGS, TURBINE_HEIGHT,
+                                               SP_EFF).evaluate(genomes) for year_simulator in simulators])
+    robust = PopulationEvaluator(simulator, cost_calculator, N_CONFIGS, TURBINE_HEIGHT, SP_EFF,
+                                 simulators=simulators, aggregate=aggregate, percentile=75)
+    assert np.allclose(robust.evaluate(genomes), combine(year_costs, axis=0), rtol=1e-9)
+
+
+def test_one_year_is_not_aggregated(simulator):
+    cost_calculator = calculator()
+    genomes = population(size=8, seed=3)
+    single = PopulationEvaluator(simulator, cost_calculator, N_CONFIGS, TURBINE_HEIGHT, SP_EFF)
+    robust = PopulationEvaluator(simulator, cost_calculator, N_CONFIGS, TURBINE_HEIGHT, SP_EFF,
+                                 simulators=[simulator], aggregate='max')
+    assert np.array_equal(robust.evaluate(genomes), single.evaluate(genomes))
@@ -0,0 +1,66 @@
+import numpy as np
+
+from fitnesscache import FitnessCache
+
+
+class CountingEvaluator():
+    """Cost is the sum of the genome, counts the evaluated rows"""
+    def __init__(self):
+        self.evaluated = 0
+
+    def evaluate(self, group_values):
+        self.evaluated += group_values.shape[0]
+        return group_values.sum(axis=1)
+
+
+def genomes(size=10, seed=0):
+    rng = np.random.default_rng(seed)
+    group_values = rng.uniform(0, 90, (size, 7))
+    group_values[:, -1] = rng.integers(0, 8, size)
+    return group_values
+
+
+def test_saved_cache_is_loaded(tmp_path):
+    path = str(tmp_path / 'cache.npz')
+    group_values = genomes()
+    cache = FitnessCache(2, path=path, fingerprint='run')
+    costs = cache.evaluate(group_values, CountingEvaluator())
+    cache.save()
+
+    evaluator = CountingEvaluator()
+    loaded = FitnessCache(2, path=path, fingerprint='run')
+    assert np.array_equal(loaded.evaluate(group_values, evaluator), costs)
+    assert evaluator.evaluated == 0
+    assert loaded.info()['cache_hits'] == group_values.shape[0]
+
+
+def test_cache_of_another_run_is_not_used(tmp_path):
+    path = str(tmp_path / 'cache.npz')
+    cache = FitnessCache(2, path=path, fingerprint='run')
+    cache.evaluate(genomes(), CountingEvaluator())
+    cache.save()
+
+    assert FitnessCache(2, path=path, fingerprint='other run').info()['cache_size'] == 0
+    assert FitnessCache(2, path=path, fingerprint='run', area_resolution=10).info()['cache_size'] == 0
+
+
+def test_state_keeps_the_order_of_the_cache():
+    cache = FitnessCache(2, max_size=5)
+    cache.evaluate(genomes(size=8), CountingEvaluator())
+    keys, costs = cache.state()
+
+    restored = FitnessCache(2, max_size=5)
+    restored.restore(keys, costs)
+    assert list(restored.costs.items()) == list(cache.costs.items())
+
+
+def test_trainer_passes_the_resolution_to_the_cache():
+    import simtool_api
+    from train import Trainer
+
+    trainer = Trainer(None, **dict(simtool_api.TRAIN_DEFAULTS, area_resolution=10, angle_resolution=1))
+    # (area, angle, orientation) * 4 and the turbines, the second genome is within the resolution of the first
+    group_values = np.array([[100, 20, 10] * 4 + [2], [104, 20.4, 9.6] * 4 + [2]], dtype=np.float64)
+    evaluator = CountingEvaluator()
+    trainer.fitness_cache.evaluate(group_values, evaluator)
+    assert evaluator.evaluated == 1
@@ -0,0 +1,14 @@
+import numpy as np
+
+from genetic_algorithm import GeneticAlgorithm
+
+
+def test_keep_best_survives_mutation():
+    np.random.seed(0)
+    population = np.random.rand(50, 13) * 100 + 1
+    cost = np.random.rand(50)
+    # every value is mutated
+    algorithm = GeneticAlgorithm(100, 150, 6, 2, 2, True)
+    new_population = algorithm.generate_new_population(population, cost)
+    assert np.array_equal(new_population[0], population[np.argmin(cost)])
+    assert not np.any(np.all(new_population[1:] == population[np.argmin(cost)], axis=1))
@@ -0,0 +1,56 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+import simtool_api
+from train import Trainer
+
+PARAMETERS = dict(simtool_api.TRAIN_DEFAULTS, generations=6, group_size=40, n_islands=2, migration_interval=2)
+
+
+class Progress():
+    def __init__(self):
+        self.generations = []
+        self.reason = None
+
+    def gendone(self, data):
+        self.generations.append(data)
+
+    def traindone(self, reason):
+        self.reason = reason
+
+
+class Killer(Progress):
+    """Kills an island process after the first generation"""
+    def gendone(self, data):
+        super().gendone(data)
+        if data[1] == 0:
+            multiprocessing.active_children()[0].kill()
+
+
+def test_islands_return_the_best_like_one_population():
+    np.random.seed(0)
+    progress = Progress()
+    best = Trainer(progress, **PARAMETERS).train()
+    assert best.shape == (6, 13)
+    assert [data[1] for data in progress.generations] == list(range(6))
+    assert progress.generations[-1][2]['island_costs'].shape == (2,)
+    assert progress.reason == 'all generations done'
+
+
+@pytest.mark.parametrize('option', [{'patience': 3}, {'min_diversity': 0.1}, {'checkpoint_file': 'x.npz'},
+                                    {'surrogate_fraction': 0.5}])
+def test_unsupported_options_are_rejected(option):
+    with pytest.raises(ValueError):
+        Trainer(None, **dict(PARAMETERS, **option))
+
+
+def test_failed_island_stops_the_training():
+    np.random.seed(0)
+    progress = Killer()
+    trainer = Trainer(progress, **dict(PARAMETERS, generations=20))
+    trainer.train()
+    assert 'failed' in trainer.stop_reason
+    assert progress.reason == trainer.stop_reason
+    assert not multiprocessing.active_children()
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import optimizers
+from genetic_algorithm import GeneticAlgorithm
+
+LOWEST = np.array([0, -90, 10])
+HIGHEST = np.array([100, 90, 10])
+
+
+def sphere(population):
+    return np.sum(((population - LOWEST) / np.array([100, 180, 1]) - 0.3) ** 2, axis=1)
+
+
+def create(name):
+    np.random.seed(0)
+    population = LOWEST + np.random.rand(30, 3) * (HIGHEST - LOWEST)
+    return optimizers.create(name, GeneticAlgorithm(50, 10, 6, 2, 2, True), population, LOWEST, HIGHEST)
+
+
+def test_unknown_optimizer():
+    with pytest.raises(ValueError, match='unknown optimizer'):
+        optimizers.create('PSO', None, np.zeros((4, 3)), LOWEST, HIGHEST)
+
+
+@pytest.mark.parametrize('name', list(optimizers.OPTIMIZERS))
+def test_ask_within_the_limits(name):
+    optimizer = create(name)
+    first_cost = None
+    for _ in range(15):
+        population = optimizer.ask()
+        assert population.shape == (30, 3)
+        assert np.all(population >= LOWEST) and np.all(population <= HIGHEST)
+        cost = sphere(population)
+        first_cost = np.min(cost) if first_cost is None else first_cost
+        optimizer.tell(population, cost)
+    assert np.min(sphere(optimizer.ask())) <= first_cost
+
+
+@pytest.mark.parametrize('name', list(optimizers.OPTIMIZERS))
+def test_state_continues_the_run(name):
+    optimizer = create(name)
+    optimizer.tell(optimizer.ask(), sphere(optimizer.ask()))
+    copy = create(name)
+    copy.load_state_dict({key: np.copy(value) for key, value in optimizer.state_dict().items()})
+    if name == 'GA':
+        # the GA keeps its state in the population it asks
+        copy.population = optimizer.population
+    random_state = np.random.get_state()
+    expected = optimizer.ask()
+    np.random.set_state(random_state)
+    assert np.array_equal(copy.ask(), expected)
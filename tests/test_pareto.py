@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+import pareto
+import simtool_api
+from train import Trainer
+
+PARAMETERS = dict(simtool_api.TRAIN_DEFAULTS, generations=3, group_size=40, pareto=True)
+
+# (investment, storage, shortage): row 3 is dominated by 0, row 4 by everything
+OBJECTIVES = np.array([[1., 5, 0],
+                       [2, 1, 0],
+                       [1, 5, 0],
+                       [3, 5, 0],
+                       [4, 6, 1],
+                       [0, 9, 9]])
+
+
+def test_dominance():
+    dominating = pareto.dominates(OBJECTIVES, np.arange(6))
+    assert not np.any(np.diagonal(dominating))
+    # equal rows do not dominate each other
+    assert not dominating[0, 2] and not dominating[2, 0]
+    assert dominating[0, 3] and not dominating[3, 0]
+    assert np.array_equal(np.flatnonzero(dominating[:, 4]), [0, 1, 2, 3])
+
+
+def test_dominated_count_in_blocks(monkeypatch):
+    np.random.seed(0)
+    objectives = np.random.rand(50, 3)
+    expected = pareto.dominated_count(objectives, np.arange(50))
+    monkeypatch.setattr(pareto, 'DOMINANCE_BLOCK', 7)
+    assert np.array_equal(pareto.dominated_count(objectives, np.arange(50)), expected)
+    assert np.array_equal(expected, np.count_nonzero(pareto.dominates(objectives, np.arange(50)), axis=0))
+
+
+def test_non_dominated_sort_and_crowding():
+    # NaN counts as the worst value, so row 1 dominates the last row
+    objectives = np.concatenate((OBJECTIVES, [[2, np.nan, 1]]))
+    rank = pareto.non_dominated_sort(objectives)
+    assert list(rank) == [0, 0, 0, 1, 2, 0, 1]
+    distance = pareto.crowding_distance(objectives, rank)
+    # the extremes of the investment in the first front
+    assert np.all(np.isinf(distance[[1, 5]]))
+
+
+def test_front_is_non_dominated():
+    np.random.seed(0)
+    trainer = Trainer(None, **PARAMETERS)
+    front = trainer.train()
+    genomes, objectives = trainer.pareto_front
+    assert np.array_equal(front, genomes)
+    assert not np.any(pareto.dominates(objectives, np.arange(objectives.shape[0])))
+    # the first configuration is the cheapest by the price of the training
+    costs = pareto.weighted_cost(objectives, trainer.cost_calculator)
+    assert np.all(np.diff(costs) >= 0)
+    assert np.isclose(Trainer(None, **dict(PARAMETERS, pareto=False)).evaluator.evaluate(genomes[:1].copy())[0],
+                      costs[0])
+
+
+@pytest.mark.parametrize('option', [{'n_islands': 2}, {'optimizer': 'DE'}, {'surrogate_fraction': 0.5},
+                                    {'patience': 3}, {'checkpoint_file': 'x.npz'}, {'optimize_turbines': True}])
+def test_unsupported_options_are_rejected(option):
+    with pytest.raises(ValueError, match='pareto'):
+        Trainer(None, **dict(PARAMETERS, **option))
@@ -0,0 +1,80 @@
+import csv
+import inspect
+import json
+import shutil
+
+import numpy as np
+import pytest
+
+import simtool_api
+import simtool_cli
+from train import Trainer
+
+
+def test_train_defaults_are_arguments_of_trainer():
+    arguments = inspect.signature(Trainer).parameters
+    required = {name for name, argument in arguments.items()
+                if argument.default is inspect.Parameter.empty and name != 'parent'}
+    assert required <= set(simtool_api.TRAIN_DEFAULTS) <= set(arguments)
+    assert set(simtool_api.TRAIN_OPTIONS) <= set(arguments)
+
+
+def test_train_defaults_come_from_the_csv(tmp_path):
+    path = tmp_path / 'train_defaults.csv'
+    shutil.copy(simtool_api.TRAIN_DEFAULTS_FILE, path)
+    with open(path) as defaults_file:
+        rows = list(csv.reader(defaults_file))
+    rows[1][rows[0].index('poolsize')] = '120'
+    rows[1][rows[0].index('year_choice')] = '2016'
+    with open(path, 'w', newline='') as defaults_file:
+        csv.writer(defaults_file).writerows(rows)
+    defaults = simtool_api.train_defaults(str(path))
+    assert defaults['group_size'] == 120 and defaults['year'] == '2016'
+    assert defaults['location'] == simtool_api.TRAIN_DEFAULTS['location']
+
+
+def test_simulate():
+    result = simtool_api.simulate(n_turbines=2, year=2016)
+    series = result['series']
+    assert result['parameters']['year'] == '2016'
+    assert np.array_equal(series['P_tot'], series['P_sp'] + series['P_wt'])
+    assert series['P_tot'].shape == (result['calendar'].doy.shape[0],)
+    assert result['stats']['cost'] > 0
+    with pytest.raises(TypeError, match='n_turbine'):
+        simtool_api.simulate(n_turbine=2)
+
+
+def test_cli_config_and_flags(tmp_path, monkeypatch, capsys):
+    (tmp_path / 'simulate.yaml').write_text('n_turbines: 3\nsp_eff: 20\n')
+    monkeypatch.chdir(tmp_path)
+    assert simtool_cli.main(['simulate', '--config', 'simulate.yaml', '--sp_eff', '18', '--output', 'out']) == 0
+    printed = json.loads(capsys.readouterr().out)
+    with open(tmp_path / 'out' / 'result.json') as result_file:
+        written = json.load(result_file)
+    # the flags override the config file
+    assert written['parameters']['n_turbines'] == 3 and written['parameters']['sp_eff'] == 18
+    assert written['stats'] == printed['stats']
+    assert (tmp_path / 'out' / 'hourly.csv').exists() and (tmp_path / 'out' / 'daily.csv').exists()
+
+
+def test_cli_train(tmp_path, capsys):
+    output = tmp_path / 'training'
+    assert simtool_cli.main(['train', '--generations', '2', '--group_size', '20', '--turbines_max', '3',
+                             '--quiet', '--output', str(output)]) == 0
+    printed = json.loads(capsys.readouterr().out)
+    assert printed['stop_reason'] == 'all generations done'
+    assert len(printed['best']) == 13 and printed['best'][-1] <= 3
+    with open(output / 'history.csv') as history_file:
+        assert [row['generation'] for row in csv.DictReader(history_file)] == ['0', '1']
+
+
+def test_cli_sweep(tmp_path, capsys):
+    assert simtool_cli.main(['sweep', '--grid', 'n_turbines=0,2', '--set', 'year=2017', '--quiet',
+                             '--output', str(tmp_path)]) == 0
+    rows = json.loads(capsys.readouterr().out)
+    assert [row['n_turbines'] for row in rows] == [0, 2]
+    assert (tmp_path / 'run_001' / 'result.json').exists()
+    with open(tmp_path / 'summary.csv') as summary_file:
+        assert len(list(csv.DictReader(summary_file))) == 2
+    with pytest.raises(SystemExit):
+        simtool_cli.main(['sweep', '--grid', 'n_turbines'])
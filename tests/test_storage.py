@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from costcalculator import get_storage, get_storage_linear
+from evaluator import get_storage_fast, get_storage_rotated, get_storage_batch
+
+
+def random_surplus(rng, n_hours):
+    """Surplus of a year with a random trend, so some years end with a shortage and some with a surplus"""
+    return rng.normal(rng.normal(0, 1), 10, n_hours)
+
+
+def rotated_storage(surplus):
+    """Storage as calculated by calculate_cost, with get_storage"""
+    cumulative = np.cumsum(surplus)
+    if cumulative[-1] < 0:
+        return 0
+    below_zero = np.flatnonzero(cumulative < 0)
+    if below_zero.shape[0] > 0:
+        surplus = np.roll(surplus, -(below_zero[-1] + 1))
+        cumulative = np.cumsum(surplus)
+    return get_storage(surplus < 0, 0, cumulative)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_storage_kernels_match_get_storage(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(100):
+        surplus = random_surplus(rng, rng.integers(1, 2000))
+        cumulative = np.cumsum(surplus)
+        declining = surplus < 0
+        expected = get_storage(declining, 0, cumulative.copy())
+        assert get_storage_linear(declining, cumulative) == pytest.approx(expected, rel=1e-9, abs=1e-6)
+        assert get_storage_fast(declining, cumulative) == pytest.approx(expected, rel=1e-9, abs=1e-6)
+
+
+def test_storage_of_a_flat_year_is_zero():
+    surplus = np.zeros(24)
+    assert get_storage_fast(surplus < 0, np.cumsum(surplus)) == 0
+
+
+def test_rotated_and_batch_storage_match_get_storage():
+    rng = np.random.default_rng(0)
+    surplus = np.array([random_surplus(rng, 500) for _ in range(50)])
+    cumulative = np.cumsum(surplus, axis=1)
+    expected = [rotated_storage(row) for row in surplus]
+    rotated = [get_storage_rotated(row, cumulative_row) for row, cumulative_row in zip(surplus, cumulative)]
+    assert np.allclose(rotated, expected, rtol=1e-9, atol=1e-6)
+    assert np.allclose(get_storage_batch(surplus, cumulative), expected, rtol=1e-9, atol=1e-6)
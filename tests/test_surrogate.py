@@ -0,0 +1,52 @@
+import numpy as np
+
+import optimizers
+from genetic_algorithm import GeneticAlgorithm
+from surrogate import SurrogateScreening
+
+
+def screening():
+    """screening with a model of cost = sum of the genome, row 0 of the population predicts the worst"""
+    np.random.seed(0)
+    surrogate = SurrogateScreening(np.zeros(3), np.ones(3), 0.2, min_samples=10)
+    samples = np.random.rand(40, 3)
+    surrogate.model.add(samples, samples.sum(axis=1))
+    population = np.random.rand(20, 3) * 0.5
+    population[0] = 1
+    return surrogate, population
+
+
+def test_only_the_kept_rows_are_always_evaluated():
+    evaluated = []
+
+    def evaluate_exact(rows):
+        evaluated.append(rows)
+        return rows.sum(axis=1)
+
+    surrogate, population = screening()
+    surrogate.evaluate(population, evaluate_exact)
+    assert not np.any(np.all(evaluated[0] == 1, axis=1))
+    assert surrogate.exact == 4
+
+    surrogate, population = screening()
+    surrogate.evaluate(population, evaluate_exact, kept=np.arange(1))
+    assert np.any(np.all(evaluated[1] == 1, axis=1))
+    assert surrogate.exact == 5
+
+
+def test_kept_rows_of_the_optimizers():
+    np.random.seed(0)
+    population = np.random.rand(20, 3)
+    cost = population.sum(axis=1)
+    lowest, highest = np.zeros(3), np.ones(3)
+    for keep_best, expected in [(True, [0]), (False, [])]:
+        genetic_algorithm = GeneticAlgorithm(50, 10, 4, 2, 2, keep_best)
+        optimizer = optimizers.create('GA', genetic_algorithm, population, lowest, highest)
+        assert optimizer.kept_rows().shape[0] == 0
+        optimizer.tell(optimizer.ask(), cost)
+        assert list(optimizer.kept_rows()) == expected
+    for name in ['DE', 'CMA-ES']:
+        optimizer = optimizers.create(name, None, population, lowest, highest)
+        for _ in range(2):
+            optimizer.tell(optimizer.ask(), cost)
+        assert optimizer.kept_rows().shape[0] == 0
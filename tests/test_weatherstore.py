@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+
+import weatherstore
+
+CSV = """,STN,YYYYMMDD,HH,FH,T,Q,P,DNI
+0,375,2016-02-28,23,110,85,0,9974,0.0
+1,375,2016-02-29,1,,84,3,9975,1e300
+2,375,2016-12-31,24,30,-12,7,9975,2.5
+"""
+
+
+def same_weather(first, second):
+    return all(np.array_equal(first[name], second[name], equal_nan=name in ('FH', 'T', 'Q', 'DNI'))
+               for name in weatherstore.WEATHER_DTYPE.names)
+
+
+def write_station(directory):
+    os.makedirs(directory / 'Data' / 'TEST')
+    (directory / 'Data' / 'TEST' / '2016.csv').write_text(CSV)
+
+
+def test_store_round_trip(tmp_path, monkeypatch):
+    write_station(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    converted = weatherstore.convert('test', 2016)
+    loaded = weatherstore.load('test', 2016)
+    assert isinstance(loaded, np.memmap)
+    assert loaded.dtype == weatherstore.WEATHER_DTYPE
+    assert same_weather(loaded, converted)
+    assert np.isnan(loaded['FH'][1])
+    assert loaded['DNI'][1] == 1e300
+    assert list(loaded['DOY']) == [59, 60, 366]
+    assert list(loaded['HH']) == [23, 1, 24]
+
+
+def test_newer_csv_is_parsed(tmp_path, monkeypatch):
+    write_station(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    weatherstore.convert('test', 2016)
+    csv = weatherstore.csv_path('test', 2016)
+    os.utime(csv, (os.path.getmtime(weatherstore.store_path('test', 2016)) + 10,) * 2)
+    assert not isinstance(weatherstore.load('test', 2016), np.memmap)
+
+
+def test_converted_station_matches_csv():
+    assert same_weather(weatherstore.load('volkel', 2018), weatherstore.read_csv('volkel', 2018))
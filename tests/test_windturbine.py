@@ -0,0 +1,24 @@
+import numpy as np
+
+from windturbine import PowerCurve, Windturbine
+
+
+def test_ends_of_the_curve():
+    curve = PowerCurve([0, 3, 12, 25, 25.01], [0, 0, 3000, 3000, 0])
+    assert curve.cut_in == 3 and curve.cut_out == 25.01
+    power = curve(np.array([-1, 0, 2.9, 3, 7.5, 12, 24.99, 25, 25.01, 30, 1000]))
+    assert np.allclose(power, [0, 0, 0, 0, 1500, 3000, 3000, 3000, 0, 0, 0])
+
+
+def test_beyond_the_end_of_a_producing_curve():
+    # unsorted, the last point still produces and 10 m/s is a vertical step up (points keep their order)
+    curve = PowerCurve([20, 0, 3, 10, 5, 10], [400, 0, 0, 400, 100, 600])
+    assert curve.cut_out == np.inf
+    power = curve(np.array([4, 9.5, 10, 15, 20, 20.1]))
+    assert np.allclose(power, [50, 370, 600, 500, 400, 0])
+
+
+def test_matches_interpolation_of_the_turbine():
+    turbine = Windturbine('3MW')
+    wind = np.linspace(0, 25, 1001)
+    assert np.allclose(turbine.get_power(wind), np.interp(wind, turbine.wind_curve, turbine.power_curve))
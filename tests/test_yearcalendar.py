@@ -0,0 +1,19 @@
+import numpy as np
+
+from yearcalendar import YearCalendar, decode_dates
+
+
+def test_decode_dates():
+    doy, leap = decode_dates(np.array(['2018-01-01', '2018-03-01', '2016-03-01', '2016-12-31', '2000-02-29',
+                                       '1900-12-31']))
+    assert list(doy) == [1, 60, 61, 366, 60, 365]
+    assert list(leap) == [False, False, True, True, True, False]
+    doy, leap = decode_dates(np.array(['2020-12-31'], dtype='datetime64[D]'))
+    assert doy[0] == 366 and leap[0]
+
+
+def test_daily_mean():
+    calendar = YearCalendar.from_dates(np.repeat(['2018-01-01', '2018-01-02'], [24, 23]),
+                                       np.concatenate((np.arange(1, 25), np.arange(1, 24))))
+    assert calendar.n_days == 2
+    assert np.allclose(calendar.daily_mean(np.concatenate((np.full(24, 2.0), np.arange(23.0)))), [2, 11])